@@ -0,0 +1,317 @@
+"""Benchmark dei percorsi caldi (motore, serializzazione, rendering).
+
+    python benchmarks/run.py                     # esegue e confronta con baseline.json
+    python benchmarks/run.py --json out.json     # salva anche i risultati
+    python benchmarks/run.py --save-baseline     # aggiorna baseline.json
+    python benchmarks/run.py -k undo --quick     # solo i benchmark che contengono "undo"
+
+Esce con codice 1 se un benchmark è più lento della baseline oltre la tolleranza, o se
+l'import della CLI (`cli.import`) supera `spider.cli.IMPORT_BUDGET_MS`.
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import spider  # noqa: F401
+except ImportError:  # checkout senza installazione
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from spider.game import actions
+from spider.game.deals import new_deal
+from spider.game.serialize import load, save
+from spider.game.state import GameState
+
+HERE = Path(__file__).resolve().parent
+BASELINE = HERE / "baseline.json"
+
+# Un benchmark prepara il suo input (fuori dal tempo misurato) e restituisce
+# (funzione da cronometrare, operazioni eseguite per chiamata).
+Bench = Callable[[], Tuple[Callable[[], object], int]]
+BENCHMARKS: Dict[str, Bench] = {}
+
+def bench(name: str) -> Callable[[Bench], Bench]:
+    def deco(fn: Bench) -> Bench:
+        BENCHMARKS[name] = fn
+        return fn
+    return deco
+
+# ---------------------- workload ----------------------
+
+def played(seed: int, steps: int, undo_tail: int = 0) -> GameState:
+    """Partita `seed` giocata a caso (riproducibile) per `steps` azioni."""
+    s = new_deal(seed)
+    rng = random.Random(seed)
+    for _ in range(steps):
+        moves = actions.list_legal_moves(s)
+        if moves and rng.random() < 0.9:
+            actions.move(s, *rng.choice(moves))
+        elif not actions.deal(s):
+            break
+    for _ in range(undo_tail):
+        actions.undo(s)
+    return s
+
+def long_game(seed: int, steps: int) -> GameState:
+    """Partita di `steps` azioni: mosse a caso (le run vanno e vengono, quindi non si
+    blocca) e un deal ogni `steps // 6` azioni, così la history contiene anche i deal."""
+    s = new_deal(seed)
+    rng = random.Random(seed)
+    every = max(1, steps // 6)
+    for k in range(1, steps + 1):
+        moves = actions.list_legal_moves(s)
+        if (k % every == 0 or not moves) and actions.deal(s):
+            continue
+        if not moves:
+            break
+        actions.move(s, *rng.choice(moves))
+    return s
+
+def crowded() -> GameState:
+    """Metà partita con tutti i deal fatti: colonne alte e molte run."""
+    s = new_deal(7)
+    while actions.deal(s):
+        pass
+    return s
+
+@bench("engine.move_deal")
+def _move_deal():
+    seeds = list(range(20))
+    def run() -> int:
+        n = 0
+        for seed in seeds:
+            s = new_deal(seed)
+            rng = random.Random(seed)
+            for _ in range(100):
+                moves = actions.list_legal_moves(s)
+                if moves and rng.random() < 0.9:
+                    actions.move(s, *rng.choice(moves))
+                elif not actions.deal(s):
+                    break
+                n += 1
+        return n
+    return run, run()  # sequenza deterministica: stesso numero di azioni a ogni chiamata
+
+@bench("engine.undo_redo_cycle")
+def _undo_redo():
+    s = long_game(3, 5000)  # history lunga: i costi O(history) si vedono
+    n = len(s.history)
+    def run() -> None:
+        while actions.undo(s):
+            pass
+        while actions.redo(s):
+            pass
+    return run, 2 * n
+
+@bench("engine.list_legal_moves")
+def _legal_moves():
+    s = crowded()
+    def run() -> None:
+        for _ in range(200):
+            actions.list_legal_moves(s)
+    return run, 200
+
+@bench("engine.hint")
+def _hint():
+    s = crowded()
+    def run() -> None:
+        for _ in range(200):
+            actions.hint(s)
+    return run, 200
+
+@bench("solver.nodes")
+def _solver_nodes():
+    from spider.game.solver import solve
+
+    s = new_deal(1)  # `spider solve --seed 1`: risolta in ~45k nodi
+    nodes = solve(s, max_nodes=None).nodes  # ricerca deterministica: stessi nodi a ogni chiamata
+    return lambda: solve(s, max_nodes=None), nodes
+
+@bench("serialize.json_roundtrip")
+def _json_roundtrip():
+    s = played(5, 300)
+    path = Path(tempfile.mkdtemp()) / "g.json"
+    def run() -> None:
+        for _ in range(20):
+            save(s, path)
+            load(path)
+    return run, 20
+
+@bench("serialize.binary_roundtrip")
+def _binary_roundtrip():
+    s = played(5, 300)
+    path = Path(tempfile.mkdtemp()) / "g.bin"
+    def run() -> None:
+        for _ in range(20):
+            save(s, path, binary=True)
+            load(path)
+    return run, 20
+
+def headless(app, size: Tuple[int, int]) -> Callable[[Callable[[], object]], object]:
+    """Monta `app` con App.run_test in un task che resta vivo fino all'uscita del processo
+    e restituisce `call(fn)`: esegue fn dentro quel task (contesto dell'app attivo)."""
+    import asyncio
+    import atexit
+    loop = asyncio.new_event_loop()
+    jobs: "asyncio.Queue" = asyncio.Queue()  # legata al loop al primo uso (3.10+)
+
+    async def host(ready: "asyncio.Future") -> None:
+        async with app.run_test(size=size):
+            ready.set_result(None)
+            while True:
+                job = await jobs.get()
+                if job is None:
+                    return
+                fn, done = job
+                done.set_result(fn())
+
+    async def submit(fn: Callable[[], object]) -> object:
+        done = loop.create_future()
+        await jobs.put((fn, done))
+        return await done
+
+    ready = loop.create_future()
+    task = loop.create_task(host(ready))
+    loop.run_until_complete(ready)
+
+    def close() -> None:
+        loop.run_until_complete(jobs.put(None))
+        loop.run_until_complete(task)
+        loop.close()
+    atexit.register(close)
+    return lambda fn: loop.run_until_complete(submit(fn))
+
+@bench("ui.render_tall_column")
+def _render_tall_column():
+    from spider.ui.app import ColumnWidget, SpiderApp
+
+    app = SpiderApp()  # senza journal né archivio
+    call = headless(app, (120, 50))
+    state = crowded()
+    tall = max(range(10), key=lambda i: len(state.columns[i]))
+    state.columns[tall] = state.columns[tall] * 4
+    app.state = state
+    w = app.query_one(f"#col{tall}", ColumnWidget)
+    call(w.update_rows)
+    rows = range(len(state.columns[tall]))
+    def paint() -> None:
+        for _ in range(50):  # paint completo della colonna con la line API, una riga alla volta
+            for y in rows:
+                w.render_line(y)
+    return lambda: call(paint), 50
+
+# ---------------------- import della CLI ----------------------
+
+IMPORT_CODE = (
+    "from time import perf_counter; t0 = perf_counter()\n"
+    "import spider.cli, spider.game.actions, spider.ui.plain\n"
+    "print((perf_counter() - t0) * 1000)"
+)
+
+def import_ms(repeat: int) -> float:
+    """Millisecondi d'import di CLI e motore in un interprete nuovo (il minimo su `repeat` avvii)."""
+    import os
+    import subprocess
+    env = dict(os.environ, PYTHONPATH=str(HERE.parent / "src"))
+    runs = [
+        float(subprocess.run([sys.executable, "-c", IMPORT_CODE], env=env, capture_output=True,
+                             text=True, check=True).stdout)
+        for _ in range(repeat)
+    ]
+    return min(runs)
+
+# ---------------------- runner ----------------------
+
+def measure(fn: Callable[[], object], ops: int, repeat: int) -> Dict[str, float]:
+    times: List[float] = []
+    for _ in range(repeat):
+        t0 = perf_counter()
+        fn()
+        times.append(perf_counter() - t0)
+    med = statistics.median(times)
+    return {
+        "ops": ops,
+        "median_s": med,
+        "min_s": min(times),
+        "ops_per_sec": ops / med if med > 0 else 0.0,
+    }
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Benchmark più lenti della baseline di oltre `tolerance` (0.25 = 25%)."""
+    slower = []
+    for name, res in results.items():
+        ref = baseline.get(name)
+        if not ref or not ref.get("ops_per_sec"):
+            continue
+        ratio = res["ops_per_sec"] / ref["ops_per_sec"]
+        if ratio < 1.0 - tolerance:
+            slower.append(f"{name}: {res['ops_per_sec']:.0f} ops/s vs baseline {ref['ops_per_sec']:.0f} ({ratio:.0%})")
+    return slower
+
+def main(argv: Optional[List[str]] = None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument("-k", dest="pattern", default="", help="esegue solo i benchmark il cui nome contiene PATTERN")
+    p.add_argument("--repeat", type=int, default=7)
+    p.add_argument("--quick", action="store_true", help="3 ripetizioni (solo per controlli veloci)")
+    p.add_argument("--json", type=Path, help="scrive i risultati in questo file")
+    p.add_argument("--baseline", type=Path, default=BASELINE)
+    p.add_argument("--save-baseline", action="store_true")
+    p.add_argument("--tolerance", type=float, default=0.25)
+    args = p.parse_args(argv)
+    repeat = 3 if args.quick else args.repeat
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name, setup in BENCHMARKS.items():
+        if args.pattern not in name:
+            continue
+        try:
+            fn, ops = setup()
+        except ImportError as e:  # es. Textual non installato
+            print(f"{name:<28} skipped ({e.name} not installed)")
+            continue
+        fn()  # riscaldamento
+        results[name] = res = measure(fn, ops, repeat)
+        print(f"{name:<28} {res['ops_per_sec']:>12.0f} ops/s   median {res['median_s'] * 1e3:8.2f} ms")
+
+    over_budget = None
+    if args.pattern in "cli.import":
+        from spider.cli import IMPORT_BUDGET_MS
+        ms = import_ms(repeat)
+        results["cli.import"] = {"ops": 1, "median_s": ms / 1000, "min_s": ms / 1000, "ops_per_sec": 1000 / ms}
+        print(f"{'cli.import':<28} {ms:>12.1f} ms      budget {IMPORT_BUDGET_MS} ms")
+        if ms > IMPORT_BUDGET_MS:
+            over_budget = f"cli.import: {ms:.0f} ms over the {IMPORT_BUDGET_MS} ms budget"
+
+    report = {
+        "meta": {"python": platform.python_version(), "machine": platform.machine(), "system": platform.system()},
+        "results": results,
+    }
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+    if over_budget:
+        print("\nREGRESSION: " + over_budget)
+        return 1
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())["results"]
+        slower = compare(results, baseline, args.tolerance)
+        if slower:
+            print("\nREGRESSION (slower than baseline):")
+            for line in slower:
+                print("  " + line)
+            return 1
+        print(f"\nno regressions vs {args.baseline.name} (tolerance {args.tolerance:.0%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
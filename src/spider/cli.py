@@ -0,0 +1,256 @@
+import argparse
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+# Entry point `spider`. Qui si importa solo la libreria standard: motore, Textual e Rich
+# vengono importati dentro i sottocomandi che li usano, così `spider solve`/`replay`/`stats`
+# e gli script che importano il pacchetto partono senza pagare l'import della TUI.
+
+COMMANDS = ("play", "solve", "replay", "stats", "serve", "corpus", "archive", "endgame")
+IMPORT_BUDGET_MS = 150  # import di spider.cli + motore (controllato da benchmarks/run.py)
+
+def _load(path: Optional[Path], seed: Optional[int]):
+    if path is not None:
+        from .game.serialize import load
+        return load(path)
+    from random import randrange
+    from .game.deals import new_deal
+    return new_deal(randrange(2**32) if seed is None else seed)
+
+def cmd_play(args: argparse.Namespace) -> int:
+    if args.endgame is not None:
+        from .game import actions
+        from .game.endgame import EndgameDB
+        db = EndgameDB(args.endgame)
+        actions.set_endgame(db)
+        try:
+            return _play(args)
+        finally:
+            actions.set_endgame(None)
+            db.save()  # le posizioni risolte durante la partita restano per la prossima
+            db.close()
+    return _play(args)
+
+def _play(args: argparse.Namespace) -> int:
+    if args.plain:
+        from .ui.plain import play
+        play(_load(args.game, args.seed), sys.stdin, sys.stdout)
+        return 0
+    archive = args.archive
+    if archive is True:  # --archive senza percorso
+        from .game.archive import default_path
+        archive = default_path()
+    journal = None
+    if not args.no_journal:
+        from .game.journal import default_path as journal_path
+        journal = args.journal or journal_path()
+    from .ui.app import run  # solo qui entra Textual
+    run(args.perf, args.profile, args.perf_out, archive, journal)
+    return 0
+
+def cmd_solve(args: argparse.Namespace) -> int:
+    state = _load(args.game, args.seed)
+    if args.workers > 1:
+        from .game.parallel import parallel_solve
+        r = parallel_solve(state, args.workers, args.max_nodes, args.time_limit)
+    else:
+        from .game.solver import solve
+        r = solve(state, args.max_nodes, args.time_limit)
+    print(f"{r.status}  nodes={r.nodes}  time={r.elapsed:.2f}s  {r.nodes_per_sec:.0f} nodes/s  line={len(r.line)}")
+    return 0 if r.solved else 1
+
+def cmd_replay(args: argparse.Namespace) -> int:
+    from .game.journal import default_path, replay
+    from .ui.plain import render
+    state = replay(args.journal or default_path(), args.upto)
+    print(render(state))
+    return 0
+
+def cmd_stats(args: argparse.Namespace) -> int:
+    from .game import actions
+    from .game.state import column_meta
+    from .perf import history_bytes
+    if args.game is not None:
+        from .game.serialize import load
+        state = load(args.game)
+    else:
+        from .game.journal import default_path, replay
+        state = replay(args.journal or default_path())
+    hidden = sum(column_meta(state, i).hidden for i in range(len(state.columns)))
+    mem = history_bytes(state)
+    print(f"seed         {state.seed}")
+    print(f"moves        {state.moves}")
+    print(f"score        {state.score}")
+    print(f"completed    {state.foundations}/8")
+    print(f"stock rounds {len(state.stock)}")
+    print(f"hidden cards {hidden}")
+    print(f"legal moves  {len(actions.list_legal_moves(state))}")
+    print(f"history      {mem['history']} undo / {mem['future']} redo, {mem['bytes'] / 1024:.1f} KiB")
+    return 0
+
+def cmd_serve(args: argparse.Namespace) -> int:
+    import asyncio
+    from .server import GameServer
+    server = GameServer(args.idle_timeout, args.max_sessions)
+    where = args.socket or f"{args.host}:{args.port}"
+    print(f"spider server on {where}", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def _seed_range(text: str) -> range:
+    a, _, b = text.partition(":")
+    return range(int(a), int(b)) if b else range(int(a), int(a) + 1)
+
+def cmd_corpus(args: argparse.Namespace) -> int:
+    from .game import corpus
+    if args.action == "build":
+        from time import perf_counter
+        t0 = perf_counter()
+        with corpus.build(args.seeds, args.index, args.max_nodes, args.time_limit, args.workers) as c:
+            print(f"{len(c)} deals indexed in {perf_counter() - t0:.1f}s -> {args.index}")
+            for name in corpus.CLASSES:
+                print(f"  {name:<11}{c.size_of(name):>8}")
+        return 0
+    with corpus.Corpus(args.index) as c:
+        if args.action == "info":
+            print(f"{len(c)} deals, node thresholds easy/medium/hard: {'/'.join(map(str, c.thresholds))}")
+            for name in corpus.CLASSES:
+                print(f"  {name:<11}{c.size_of(name):>8}")
+            return 0
+        try:
+            e = c.pick(args.difficulty, args.day)
+        except LookupError as err:
+            print(err, file=sys.stderr)
+            return 1
+        print(f"seed {e.seed}  {e.difficulty}  {e.status}  length={e.length}  nodes={e.nodes}")
+    return 0
+
+def cmd_archive(args: argparse.Namespace) -> int:
+    from .game.archive import Archive, default_path
+    path = args.db or default_path()
+    if not path.exists():
+        print(f"no archive at {path}", file=sys.stderr)
+        return 1
+    with Archive(path) as a:
+        if args.seed is not None:
+            rec = a.best_for(args.seed)
+            if rec is None:
+                print(f"no games for seed {args.seed}")
+                return 1
+            print(f"seed {rec.seed}  best {rec.score}  moves={rec.moves}  time={rec.duration:.0f}s  won={rec.won}")
+            return 0
+        avg = a.average_win_time()
+        print(f"{a.count()} games, win rate {a.win_rate():.0%}, "
+              f"average time to win {'-' if avg is None else f'{avg:.0f}s'}")
+        for d in a.best_scores(args.top):
+            print(f"  seed {d.seed:<12}best {d.score:>6}  games {d.games:>5}  wins {d.wins:>5}")
+    return 0
+
+def cmd_endgame(args: argparse.Namespace) -> int:
+    from .game import endgame
+    if args.action == "build":
+        from time import perf_counter
+        t0 = perf_counter()
+        with endgame.build(endgame.endgame_states(args.seeds, args.solve_nodes), args.db, args.max_nodes) as db:
+            print(f"{len(db)} positions in {perf_counter() - t0:.1f}s -> {args.db}")
+        return 0
+    with endgame.EndgameDB(args.db) as db:
+        print(f"{len(db)} positions, {args.db.stat().st_size / 1024:.0f} KiB")
+    return 0
+
+def parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="spider", description="Spider Solitaire in terminale")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    play = sub.add_parser("play", help="gioca (TUI Textual, o testo con --plain)")
+    play.add_argument("--plain", action="store_true", help="renderer testuale su stdin/stdout, senza Textual")
+    play.add_argument("--seed", type=int, help="distribuzione da giocare (solo --plain)")
+    play.add_argument("--game", type=Path, help="partita salvata da riprendere (solo --plain)")
+    play.add_argument("--perf", action="store_true", help="registra latenze per operazione (overlay [p])")
+    play.add_argument("--profile", action="store_true", help="come --perf, più cProfile e tracemalloc")
+    play.add_argument("--perf-out", type=Path, default=Path("spider-perf.json"),
+                      help="report scritto all'uscita (con --profile anche <file>.prof)")
+    play.add_argument("--archive", type=Path, nargs="?", const=True,
+                      help="registra le partite concluse in un database SQLite (default: ~/.local/share/spider)")
+    play.add_argument("--endgame", type=Path, help="database dei finali per hint e autoplay (aggiornato all'uscita)")
+    jour = play.add_mutually_exclusive_group()
+    jour.add_argument("--journal", type=Path,
+                      help="journal per riprendere la partita (default: $SPIDER_JOURNAL o ~/.local/state/spider)")
+    jour.add_argument("--no-journal", action="store_true", help="non registra la partita su disco")
+    play.set_defaults(func=cmd_play)
+
+    solve = sub.add_parser("solve", help="risolve una partita salvata o un seed")
+    src = solve.add_mutually_exclusive_group(required=True)
+    src.add_argument("game", nargs="?", type=Path, help="partita salvata con serialize.save")
+    src.add_argument("--seed", type=int)
+    solve.add_argument("-j", "--workers", type=int, default=1)
+    solve.add_argument("--max-nodes", type=int, default=1_000_000)
+    solve.add_argument("--time-limit", type=float, default=None)
+    solve.set_defaults(func=cmd_solve)
+
+    replay = sub.add_parser("replay", help="ricostruisce una partita dal journal e la stampa")
+    replay.add_argument("journal", nargs="?", type=Path, help="journal (default: quello della TUI)")
+    replay.add_argument("--upto", type=int, help="si ferma dopo N azioni")
+    replay.set_defaults(func=cmd_replay)
+
+    stats = sub.add_parser("stats", help="riepilogo di una partita salvata o del journal")
+    stats.add_argument("game", nargs="?", type=Path, help="partita salvata (default: il journal)")
+    stats.add_argument("--journal", type=Path)
+    stats.set_defaults(func=cmd_stats)
+
+    serve = sub.add_parser("serve", help="server JSON-lines multi-sessione (TCP o socket Unix)")
+    serve.add_argument("--socket", help="percorso di un socket Unix (al posto di host/porta)")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=7788)
+    serve.add_argument("--idle-timeout", type=float, default=600.0, help="secondi prima di chiudere una sessione inattiva")
+    serve.add_argument("--max-sessions", type=int, default=10_000)
+    serve.set_defaults(func=cmd_serve)
+
+    corp = sub.add_parser("corpus", help="indice di distribuzioni con difficoltà precalcolata")
+    csub = corp.add_subparsers(dest="action", required=True)
+    build = csub.add_parser("build", help="analizza un intervallo di seed e scrive l'indice")
+    build.add_argument("index", type=Path)
+    build.add_argument("--seeds", type=_seed_range, default=range(0, 1000), help="A:B (B escluso)")
+    build.add_argument("-j", "--workers", type=int, default=None)
+    build.add_argument("--max-nodes", type=int, default=200_000)
+    build.add_argument("--time-limit", type=float, default=None)
+    info = csub.add_parser("info", help="numero di deal per classe")
+    info.add_argument("index", type=Path)
+    pick = csub.add_parser("pick", help="seed di un deal della difficoltà scelta")
+    pick.add_argument("index", type=Path)
+    pick.add_argument("--difficulty", default="hard", help="easy, medium, hard, expert, unsolvable, unknown")
+    pick.add_argument("--day", type=int, default=0, help="indice del deal nella classe (es. giorno)")
+    corp.set_defaults(func=cmd_corpus)
+
+    arch = sub.add_parser("archive", help="statistiche dell'archivio delle partite (play --archive)")
+    arch.add_argument("db", nargs="?", type=Path, help="database (default: quello di play --archive)")
+    arch.add_argument("--seed", type=int, help="miglior partita di questo deal")
+    arch.add_argument("--top", type=int, default=10, help="deal con i punteggi migliori da mostrare")
+    arch.set_defaults(func=cmd_archive)
+
+    end = sub.add_parser("endgame", help="database dei finali (stock vuoto, tutto scoperto)")
+    esub = end.add_subparsers(dest="action", required=True)
+    ebuild = esub.add_parser("build", help="risolve i finali delle soluzioni di un intervallo di seed")
+    ebuild.add_argument("db", type=Path)
+    ebuild.add_argument("--seeds", type=_seed_range, default=range(0, 100), help="A:B (B escluso)")
+    ebuild.add_argument("--solve-nodes", type=int, default=200_000, help="budget del solver per deal")
+    ebuild.add_argument("--max-nodes", type=int, default=200_000, help="budget della BFS per finale")
+    einfo = esub.add_parser("info", help="numero di posizioni nel database")
+    einfo.add_argument("db", type=Path)
+    end.set_defaults(func=cmd_endgame)
+    return p
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # `spider` e `spider --perf` senza sottocomando avviano la TUI come prima
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        argv = ["play", *argv]
+    args = parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
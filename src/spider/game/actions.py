@@ -1,21 +1,111 @@
-from typing import Optional, List, Tuple
-from .state import GameState, snapshot
-from .cards import Card
+from time import perf_counter
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, List, Set, Tuple
+from .state import GameState, Move, DEAL, DIRTY_STOCK, DIRTY_FOUNDATIONS, clone, column_meta, pop_round, position_hash, push_round, resync
+from .columns import ColumnMeta
+from .cards import FACE_UP, RANK_MASK
 from . import rules
 
-def complete_sequences(state: GameState, col_idx: int) -> int:
+def _complete(state: GameState, col_idx: int, meta: ColumnMeta) -> List[Tuple[int, int, bytes]]:
     col = state.columns[col_idx]
-    removed = 0
+    removed = []
     while True:
-        win = rules.complete_seq_window(col)
-        if not win:
+        a = meta.full_start
+        if a is None:
             break
-        a, b = win
-        del col[a:b]
+        removed.append((col_idx, a, bytes(col[a:])))
+        del col[a:]
+        resync(state, col_idx, meta, a)
         state.foundations += 1
-        removed += 1
     return removed
 
+def complete_sequences(state: GameState, col_idx: int) -> int:
+    return len(_complete(state, col_idx, column_meta(state, col_idx)))
+
+def apply(state: GameState, m: Move) -> Move:
+    """Esegue `m` sul posto senza controlli di legalità e restituisce il record completo
+    (flip, sequenze completate, facce del giro) da passare a `revert`."""
+    dirty = state.dirty
+    if m.is_deal:
+        round_codes = pop_round(state)
+        faces = 0
+        completed = []
+        for i, col in enumerate(state.columns):
+            code = round_codes[i]
+            if code & FACE_UP:
+                faces |= 1 << i
+            meta = column_meta(state, i)
+            col.append(code | FACE_UP)
+            resync(state, i, meta, len(col) - 1)
+            if meta.tail_len >= 13:
+                completed += _complete(state, i, meta)
+        state.moves += 1
+        dirty.update(range(len(state.columns)))
+        dirty.add(DIRTY_STOCK)
+        if completed:
+            dirty.add(DIRTY_FOUNDATIONS)
+        return Move(DEAL, 0, DEAL, len(state.columns), False, tuple(completed), faces)
+    src, start, dst = m.src, m.start, m.dst
+    scol = state.columns[src]
+    dcol = state.columns[dst]
+    smeta = column_meta(state, src)
+    dmeta = column_meta(state, dst)
+    count = len(scol) - start
+    d_len = len(dcol)
+    dcol += scol[start:]
+    del scol[start:]
+    flipped = False
+    if scol and not scol[-1] & FACE_UP:
+        scol[-1] |= FACE_UP
+        flipped = True
+    resync(state, src, smeta, start - flipped)
+    resync(state, dst, dmeta, d_len)
+    state.moves += 1
+    dirty.add(src)
+    dirty.add(dst)
+    if dmeta.tail_len >= 13:
+        completed = _complete(state, dst, dmeta)
+        if completed:
+            dirty.add(DIRTY_FOUNDATIONS)
+            return Move(src, start, dst, count, flipped, tuple(completed))
+    return Move(src, start, dst, count, flipped)
+
+def revert(state: GameState, m: Move) -> None:
+    """Annulla sul posto un record restituito da `apply`."""
+    dirty = state.dirty
+    if m.completed:
+        for col_idx, a, codes in reversed(m.completed):
+            meta = column_meta(state, col_idx)
+            state.columns[col_idx][a:a] = codes
+            resync(state, col_idx, meta, a)
+            state.foundations -= 1
+        dirty.add(DIRTY_FOUNDATIONS)
+    if m.is_deal:
+        round_codes = bytearray()
+        for i, col in enumerate(state.columns):
+            meta = column_meta(state, i)
+            code = col.pop()
+            round_codes.append(code if m.faces >> i & 1 else code & ~FACE_UP)
+            resync(state, i, meta, len(col))
+        push_round(state, round_codes)
+        dirty.update(range(len(state.columns)))
+        dirty.add(DIRTY_STOCK)
+    else:
+        src, dst, count = m.src, m.dst, m.count
+        scol = state.columns[src]
+        dcol = state.columns[dst]
+        smeta = column_meta(state, src)
+        dmeta = column_meta(state, dst)
+        s_len = len(scol)
+        if m.flipped:
+            scol[-1] &= ~FACE_UP
+        scol += dcol[-count:]
+        del dcol[-count:]
+        resync(state, src, smeta, s_len - m.flipped)
+        resync(state, dst, dmeta, len(dcol))
+        dirty.add(src)
+        dirty.add(dst)
+    state.moves -= 1
+
 def move(state: GameState, src: int, start: int, dst: int) -> bool:
     if src == dst:
         return False
@@ -23,20 +113,13 @@ def move(state: GameState, src: int, start: int, dst: int) -> bool:
         return False
     scol = state.columns[src]
     dcol = state.columns[dst]
-    if not rules.can_take_run(scol, start):
+    if not (column_meta(state, src).run_start <= start < len(scol)):
         return False
-    moving = scol[start:]
-    dst_top: Optional[Card] = dcol[-1] if dcol else None
-    if not rules.can_place(dst_top, moving[0]):
+    dst_top: Optional[int] = dcol[-1] if dcol else None
+    if not rules.can_place(dst_top, scol[start]):
         return False
-    state.history.append(snapshot(state))
+    state.history.append(apply(state, Move(src, start, dst)))
     state.future.clear()
-    dcol.extend(moving)
-    del scol[start:]
-    if scol and not scol[-1].face_up:
-        scol[-1].face_up = True
-    complete_sequences(state, dst)
-    state.moves += 1
     return True
 
 def deal(state: GameState) -> bool:
@@ -44,63 +127,322 @@ def deal(state: GameState) -> bool:
         return False
     if not state.stock:
         return False
-    state.history.append(snapshot(state))
+    state.history.append(apply(state, Move(DEAL, 0, DEAL)))
     state.future.clear()
-    round_cards = state.stock.pop(0)
-    for i, col in enumerate(state.columns):
-        card = round_cards[i]
-        card.face_up = True
-        col.append(card)
-        complete_sequences(state, i)
-    state.moves += 1
     return True
 
 def undo(state: GameState) -> bool:
     if not state.history:
         return False
-    snap = state.history.pop()
-    state.future.append(snapshot(state))
-    from .state import restore
-    restore(state, snap)
+    m = state.history.pop()
+    revert(state, m)
+    state.future.append(m)
     return True
 
 def redo(state: GameState) -> bool:
     if not state.future:
         return False
-    snap = state.future.pop()
-    state.history.append(snapshot(state))
-    from .state import restore
-    restore(state, snap)
+    m = state.future.pop()
+    state.history.append(apply(state, m))
     return True
 
+def _iter_moves(
+    cols: List[bytearray],
+    run_starts: List[int],
+    accepts: List[List[int]],
+    empties: List[int],
+    collapse: bool,
+) -> Iterator[Tuple[int, int, int]]:
+    # la colonna sorgente non compare mai in accepts[rank di una carta della sua run]: la sua
+    # cima è l'ultima carta della run, che ha il rank più basso
+    free: List[int] = []
+    for s_idx, col in enumerate(cols):
+        if empties:
+            free = [e for e in empties if e != s_idx]
+            # a stock vuoto una sola colonna vuota per mossa: le altre darebbero la stessa
+            # posizione a colonne permutate (con lo stock il deal distingue le colonne)
+            if collapse:
+                free = free[:1]
+        for start in range(run_starts[s_idx], len(col)):
+            dsts = accepts[col[start] & RANK_MASK]
+            if free:
+                dsts = sorted(dsts + free)
+            for d_idx in dsts:
+                yield (s_idx, start, d_idx)
+
+def iter_legal_moves(state: GameState) -> Iterator[Tuple[int, int, int]]:
+    """Generatore lazy delle mosse legali (src, start, dst), in ordine di src, start, dst.
+    A stock vuoto le mosse verso colonne vuote equivalenti si riducono alla prima."""
+    cols = state.columns
+    # accepts[r]: colonne che accettano una run che inizia con il rank r
+    accepts: List[List[int]] = [[] for _ in range(14)]
+    empties: List[int] = []
+    run_starts: List[int] = []
+    for i, col in enumerate(cols):
+        run_starts.append(column_meta(state, i).run_start)
+        if not col:
+            empties.append(i)
+            continue
+        top = col[-1]
+        if top & FACE_UP and top & RANK_MASK > 1:
+            accepts[(top & RANK_MASK) - 1].append(i)
+    return _iter_moves(cols, run_starts, accepts, empties, not state.stock)
+
 def list_legal_moves(state: GameState) -> List[Tuple[int, int, int]]:
-    out: List[Tuple[int, int, int]] = []
-    for s_idx, scol in enumerate(state.columns):
-        for start in range(len(scol)):
-            if not rules.can_take_run(scol, start):
-                continue
-            front = scol[start]
-            for d_idx, dcol in enumerate(state.columns):
-                if d_idx == s_idx:
-                    continue
-                top = dcol[-1] if dcol else None
-                if rules.can_place(top, front):
-                    out.append((s_idx, start, d_idx))
-    return out
+    return list(iter_legal_moves(state))
+
+# ---------------------- database dei finali ----------------------
+
+# endgame.EndgameDB attivo: hint, search_hint, autoplay e solver risolvono i finali (stock
+# vuoto, tutto scoperto) con la distanza esatta invece che con l'euristica. None = spento.
+_endgame = None
+
+def set_endgame(db) -> None:
+    """Attiva (o con None disattiva) il database dei finali per tutto il motore."""
+    global _endgame
+    _endgame = db
+
+def endgame_distance(state: GameState) -> Optional[int]:
+    """Mosse alla vittoria secondo il database (endgame.LOST se persa); None se non è un
+    finale, il database è spento o la posizione va oltre il suo budget di ricerca."""
+    if _endgame is None or state.stock:
+        return None
+    return _endgame.distance(state)
+
+def endgame_lookup(state: GameState) -> Optional[int]:
+    """Come `endgame_distance`, ma senza cercare le posizioni non ancora nel database."""
+    if _endgame is None or state.stock:
+        return None
+    return _endgame.lookup(state)
+
+def endgame_move(state: GameState) -> Optional[Tuple[int, int, int]]:
+    if _endgame is None or state.stock:
+        return None
+    return _endgame.best_move(state)
+
+def endgame_line(state: GameState) -> List[Tuple[int, int, int]]:
+    if _endgame is None or state.stock:
+        return []
+    return _endgame.line(state)
 
 def hint(state: GameState) -> Optional[Tuple[int, int, int]]:
+    best = endgame_move(state)
+    if best is not None:
+        return best
     moves = list_legal_moves(state)
     if not moves:
         return None
     moves.sort(key=lambda m: (len(state.columns[m[2]]), -m[1]))
     return moves[0]
 
-def auto_move_one(state: GameState) -> bool:
-    h = hint(state)
-    if not h:
-        return False
-    s, start, d = h
-    return move(state, s, start, d)
+# ---------------------- hint "anytime" ----------------------
+
+class HintResult(NamedTuple):
+    move: Optional[Tuple[int, int, int]]
+    line: Tuple[Tuple[int, int, int], ...] = ()   # variante principale, a partire da `move`
+    value: int = 0                                 # valutazione in fondo alla variante
+    depth: int = 0                                 # ultima profondità completata
+    nodes: int = 0
+    elapsed: float = 0.0
+    complete: bool = False                         # albero esplorato fino a max_depth o esaurito
+
+class _Stop(Exception):
+    pass
+
+def evaluate(state: GameState) -> int:
+    """Valutazione statica: sequenze completate, carte coperte, legami ordinati, colonne vuote."""
+    v = 1000 * state.foundations
+    for i, col in enumerate(state.columns):
+        if not col:
+            v += 60
+            continue
+        meta = column_meta(state, i)
+        links = max(0, meta.tail_len - 1) + sum(b - a for a, b in meta.blocked)
+        v += 8 * links - 25 * meta.hidden
+    return v
+
+def search_hint(
+    state: GameState,
+    budget_ms: float = 250,
+    max_depth: int = 8,
+    cancel: Optional[Callable[[], bool]] = None,
+) -> HintResult:
+    """Hint con approfondimento iterativo entro `budget_ms` millisecondi.
+
+    Ogni iterazione completata aggiorna la mossa migliore, quindi il risultato è sempre
+    utilizzabile ("anytime"); `cancel()` (controllato periodicamente) interrompe la ricerca.
+    La ricerca non guarda oltre una carta girata né oltre un deal: il giocatore non le
+    conosce. `state` non viene modificato.
+    """
+    t0 = perf_counter()
+    deadline = t0 + budget_ms / 1000
+    s = clone(state)
+    root = list_legal_moves(s)
+    if not root:
+        return HintResult(None, (), evaluate(s))
+    line = tuple(endgame_line(s))  # finale noto: la linea ottimale, senza cercare
+    if line:
+        return HintResult(line[0], line, 1000 * 8, len(line), 0, perf_counter() - t0, True)
+    root.sort(key=lambda m: (len(s.columns[m[2]]), -m[1]))  # a parità decide l'ordine di `hint`
+    best = HintResult(root[0], (root[0],))
+    nodes = 0
+    path: Set[int] = {position_hash(s)}
+    # hash -> (profondità, valore, variante), valido per l'iterazione corrente
+    table: Dict[int, Tuple[int, int, List[Tuple[int, int, int]]]] = {}
+    cut = False
+
+    def check() -> None:
+        if perf_counter() > deadline or (cancel is not None and cancel()):
+            raise _Stop
+
+    def child(m: Tuple[int, int, int], depth: int) -> Optional[Tuple[int, List[Tuple[int, int, int]]]]:
+        """Valore della posizione dopo `m` (None se ripete una posizione della variante)."""
+        nonlocal cut
+        rec = apply(s, Move(*m))
+        h = position_hash(s)
+        out: Optional[Tuple[int, List[Tuple[int, int, int]]]] = None
+        if h not in path:
+            if rec.flipped or is_win(s):
+                out = (evaluate(s), [])
+            elif depth == 0:
+                cut = True
+                out = (evaluate(s), [])
+            else:
+                hit = table.get(h)
+                if hit is not None and hit[0] >= depth:
+                    out = (hit[1], hit[2])
+                else:
+                    path.add(h)
+                    out = search(depth)
+                    path.discard(h)
+                    table[h] = (depth, out[0], out[1])
+        revert(s, rec)
+        return out
+
+    def search(depth: int) -> Tuple[int, List[Tuple[int, int, int]]]:
+        nonlocal nodes
+        nodes += 1
+        if nodes & 255 == 0:
+            check()
+        best_v, best_line = evaluate(s), []  # fermarsi qui è sempre possibile
+        for m in list_legal_moves(s):
+            r = child(m, depth - 1)
+            if r is not None and r[0] > best_v:
+                best_v, best_line = r[0], [m] + r[1]
+        return best_v, best_line
+
+    try:
+        for depth in range(1, max_depth + 1):
+            check()
+            table.clear()
+            cut = False
+            found: Optional[Tuple[int, List[Tuple[int, int, int]]]] = None
+            for m in root:
+                r = child(m, depth - 1)
+                if r is not None and (found is None or r[0] > found[0]):
+                    found = (r[0], [m] + r[1])
+            if found is None:
+                break
+            best = HintResult(found[1][0], tuple(found[1]), found[0], depth, nodes, perf_counter() - t0,
+                              depth == max_depth or not cut)
+            # la mossa migliore va esplorata per prima all'iterazione successiva
+            root.remove(best.move)
+            root.insert(0, best.move)
+            if not cut:
+                break  # albero esaurito: più profondità non cambia nulla
+    except _Stop:
+        pass
+    return best._replace(nodes=nodes, elapsed=perf_counter() - t0)
+
+Legal = Callable[[GameState], List[Tuple[int, int, int]]]
+
+def auto_move_one(state: GameState, seen: Optional[Set[int]] = None, legal: Legal = list_legal_moves) -> bool:
+    """Esegue la mossa di `hint`. Con `seen` (position_hash già visitati, aggiornato qui)
+    scarta le mosse che riportano a una posizione vista e prova la successiva in ordine;
+    `legal` sostituisce list_legal_moves (cache.autoplay la prende dalla cache di analisi)."""
+    if seen is None:
+        h = hint(state)
+        if not h:
+            return False
+        s, start, d = h
+        return move(state, s, start, d)
+    moves = legal(state)
+    moves.sort(key=lambda m: (len(state.columns[m[2]]), -m[1]))  # ordine di `hint`
+    best = endgame_move(state)
+    if best is not None:
+        moves.insert(0, best)
+    for m in moves:
+        rec = apply(state, Move(*m))
+        h = position_hash(state)
+        if h in seen:
+            revert(state, rec)
+            continue
+        seen.add(h)
+        state.history.append(rec)
+        state.future.clear()
+        return True
+    return False
+
+WON, STUCK, BLOCKED, STALLED, LOST, MAX_MOVES, TIME_BUDGET = (
+    "won", "stuck", "blocked", "stalled", "lost", "max_moves", "time_budget")
+
+class AutoplayResult(NamedTuple):
+    reason: str      # WON, STUCK (nessuna mossa nuova e stock vuoto), BLOCKED (nessuna mossa
+                     # nuova e deal impossibile per una colonna vuota), STALLED (`patience`
+                     # mosse senza progresso e deal impossibile), LOST (finale perso
+                     # secondo il database dei finali), MAX_MOVES, TIME_BUDGET
+    moves: int       # azioni eseguite, deal inclusi
+    deals: int
+    elapsed: float
+
+def autoplay(
+    state: GameState, max_moves: int = 1000, time_budget: Optional[float] = None, patience: int = 40,
+    legal: Legal = list_legal_moves, value: Callable[[GameState], int] = evaluate,
+) -> AutoplayResult:
+    """Gioca con `hint` senza mai tornare su una posizione già vista. Quando non resta una
+    mossa nuova, o dopo `patience` mosse senza migliorare `evaluate` (run spostate tra
+    colonne vuote: posizioni sempre nuove ma nessun progresso), distribuisce dallo stock.
+    Si ferma alla vittoria, quando serve un deal che non si può fare (stock vuoto o colonna
+    vuota), dopo `max_moves` azioni o `time_budget` secondi. `legal` e `value` sostituiscono
+    list_legal_moves ed evaluate (vedi auto_move_one)."""
+    t0 = perf_counter()
+    seen = {position_hash(state)}
+    done = deals = idle = 0
+    best = value(state)
+    while True:
+        if is_win(state):
+            reason = WON
+            break
+        if done >= max_moves:
+            reason = MAX_MOVES
+            break
+        if time_budget is not None and perf_counter() - t0 >= time_budget:
+            reason = TIME_BUDGET
+            break
+        d = endgame_distance(state)
+        if d is not None:
+            if d < 0:
+                reason = LOST
+                break
+            idle = 0  # il database garantisce il progresso: niente limite di pazienza
+        if idle < patience and auto_move_one(state, seen, legal):
+            v = value(state)
+            if v > best:
+                best, idle = v, 0
+            else:
+                idle += 1
+        elif deal(state):
+            seen.add(position_hash(state))
+            best, idle = value(state), 0
+            deals += 1
+        elif idle >= patience:
+            reason = STALLED  # ci sarebbero ancora mosse nuove, ma nessuna porta avanti
+            break
+        else:
+            reason = BLOCKED if state.stock else STUCK
+            break
+        done += 1
+    return AutoplayResult(reason, done, deals, perf_counter() - t0)
 
 def is_win(state: GameState) -> bool:
     return state.foundations >= 8
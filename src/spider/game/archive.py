@@ -0,0 +1,168 @@
+import os
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+from time import time
+from typing import List, NamedTuple, Optional, Tuple
+
+from .state import GameState
+
+# Archivio SQLite delle partite concluse (vinte o abbandonate), una riga per partita.
+# Le scritture passano da una coda a un thread dedicato che le raggruppa in transazioni
+# (`batch_size` righe o `flush_interval` secondi): `record` non tocca mai il disco e si
+# può chiamare dal thread della UI. Le query usano una connessione propria in lettura
+# (WAL: i lettori non bloccano lo scrittore) e gli indici su (seed, score) e
+# (won, duration), così "miglior punteggio per deal" e "tempo medio di vittoria" non
+# scorrono la tabella.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id          INTEGER PRIMARY KEY,
+    seed        INTEGER,
+    won         INTEGER NOT NULL,
+    score       INTEGER NOT NULL,
+    moves       INTEGER NOT NULL,
+    duration    REAL NOT NULL,
+    foundations INTEGER NOT NULL,
+    finished    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_seed_score ON games (seed, score DESC);
+CREATE INDEX IF NOT EXISTS games_won_duration ON games (won, duration);
+"""
+
+_INSERT = (
+    "INSERT INTO games (seed, won, score, moves, duration, foundations, finished) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+
+class GameRecord(NamedTuple):
+    seed: Optional[int]
+    won: bool
+    score: int        # punti delle mosse più l'eventuale bonus di vittoria
+    moves: int
+    duration: float   # secondi
+    foundations: int
+    finished: float   # time.time() di fine partita
+
+class DealBest(NamedTuple):
+    seed: int
+    score: int
+    games: int
+    wins: int
+
+def default_path() -> Path:
+    base = os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share"
+    return Path(base) / "spider" / "games.sqlite"
+
+def record_for(state: GameState, duration: float, won: Optional[bool] = None) -> GameRecord:
+    if won is None:
+        won = state.foundations >= 8
+    return GameRecord(state.seed, won, state.score, state.moves, duration, state.foundations, time())
+
+def _connect(path: Path) -> sqlite3.Connection:
+    conn = sqlite3.connect(str(path), timeout=30.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+_STOP = object()
+
+class Archive:
+    """Archivio su `path` con scrittore in background; `close` svuota la coda."""
+
+    def __init__(self, path: Path, batch_size: int = 256, flush_interval: float = 1.0) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = _connect(path)
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+        self._read_lock = threading.Lock()
+        self._queue: "queue.Queue[object]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="spider-archive", daemon=True)
+        self._writer.start()
+
+    # ---------- scrittura ----------
+    def record(self, rec: GameRecord) -> None:
+        if not self._writer.is_alive():
+            raise RuntimeError("archive is closed")
+        self._queue.put(rec)
+
+    def record_game(self, state: GameState, duration: float, won: Optional[bool] = None) -> None:
+        self.record(record_for(state, duration, won))
+
+    def flush(self) -> None:
+        """Attende che tutto ciò che è in coda sia scritto."""
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._db.close()
+
+    def __enter__(self) -> "Archive":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def _write_loop(self) -> None:
+        db = _connect(self.path)
+        try:
+            stop = False
+            while not stop:
+                item = self._queue.get()
+                batch: List[object] = [item]
+                # raccoglie quel che arriva entro flush_interval, fino a batch_size righe
+                while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                    try:
+                        batch.append(self._queue.get(timeout=self.flush_interval))
+                    except queue.Empty:
+                        break
+                rows = [tuple(r) for r in batch if r is not _STOP]  # type: ignore[arg-type]
+                stop = len(rows) < len(batch)
+                try:
+                    if rows:
+                        with db:
+                            db.executemany(_INSERT, rows)
+                        self.written += len(rows)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            db.close()
+
+    # ---------- query ----------
+    def _query(self, sql: str, args: Tuple[object, ...] = ()) -> List[Tuple]:
+        with self._read_lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def count(self) -> int:
+        return self._query("SELECT COUNT(*) FROM games")[0][0]
+
+    def best_scores(self, limit: int = 20) -> List[DealBest]:
+        """Deal con il punteggio migliore, dal più alto."""
+        rows = self._query(
+            "SELECT seed, MAX(score), COUNT(*), SUM(won) FROM games WHERE seed IS NOT NULL "
+            "GROUP BY seed ORDER BY MAX(score) DESC, seed LIMIT ?", (limit,))
+        return [DealBest(*r) for r in rows]
+
+    def best_for(self, seed: int) -> Optional[GameRecord]:
+        rows = self._query(
+            "SELECT seed, won, score, moves, duration, foundations, finished FROM games "
+            "WHERE seed = ? ORDER BY score DESC LIMIT 1", (seed,))
+        if not rows:
+            return None
+        seed_, won, *rest = rows[0]
+        return GameRecord(seed_, bool(won), *rest)
+
+    def average_win_time(self) -> Optional[float]:
+        return self._query("SELECT AVG(duration) FROM games WHERE won = 1")[0][0]
+
+    def win_rate(self) -> float:
+        games, wins = self._query("SELECT COUNT(*), COALESCE(SUM(won), 0) FROM games")[0]
+        return wins / games if games else 0.0
@@ -0,0 +1,210 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cards import FACE_UP, RANK_MASK
+from .state import GameState
+
+COLS = 10
+DEPTH = 128      # altezza massima di una colonna (104 carte + margine)
+MAX_RUN = 13     # una run discendente non supera K→A
+
+_K = np.arange(MAX_RUN)
+_C = np.arange(COLS)
+_SEQ = (FACE_UP | (13 - _K)).astype(np.uint8)  # K→A scoperte, seme ignorato
+_RANK_FACE = np.uint8(FACE_UP | RANK_MASK)
+
+class BatchState:
+    """B partite in array NumPy, con le stesse regole di `spider.game.actions`.
+
+    - cols:        (B, COLS, DEPTH) codici carta (cards.encode), 0 = slot vuoto
+    - heights:     (B, COLS) altezza di ogni colonna
+    - stock:       (B, R, COLS) giri di stock, consumati dal primo
+    - stock_pos:   (B,) prossimo giro da distribuire
+    - stock_len:   (B,) giri totali di ogni partita
+    - foundations: (B,) sequenze completate; moves: (B,) azioni eseguite
+
+    Le mosse sono indicizzate come (src, k, dst), con start = heights[src] - 1 - k:
+    k è la distanza dalla cima, quindi una mossa sta in una maschera (B, COLS, 13, COLS).
+    """
+
+    def __init__(self, batch: int, rounds: int = 5) -> None:
+        self.cols = np.zeros((batch, COLS, DEPTH), dtype=np.uint8)
+        self.heights = np.zeros((batch, COLS), dtype=np.int16)
+        self.stock = np.zeros((batch, rounds, COLS), dtype=np.uint8)
+        self.stock_pos = np.zeros(batch, dtype=np.int16)
+        self.stock_len = np.zeros(batch, dtype=np.int16)
+        self.foundations = np.zeros(batch, dtype=np.int16)
+        self.moves = np.zeros(batch, dtype=np.int32)
+
+    @property
+    def size(self) -> int:
+        return self.cols.shape[0]
+
+    # ---------------------- conversione ----------------------
+
+    @classmethod
+    def from_states(cls, states: Sequence[GameState]) -> "BatchState":
+        rounds = max((len(s.stock) for s in states), default=0)
+        bs = cls(len(states), rounds)
+        for b, s in enumerate(states):
+            if len(s.columns) != COLS:
+                raise ValueError(f"batch engine needs {COLS} columns, got {len(s.columns)}")
+            for c, col in enumerate(s.columns):
+                bs.cols[b, c, :len(col)] = np.frombuffer(col, dtype=np.uint8)
+                bs.heights[b, c] = len(col)
+            for r, pile in enumerate(s.stock):
+                bs.stock[b, r, :len(pile)] = np.frombuffer(pile, dtype=np.uint8)
+            bs.stock_len[b] = len(s.stock)
+            bs.foundations[b] = s.foundations
+            bs.moves[b] = s.moves
+        return bs
+
+    def to_state(self, b: int) -> GameState:
+        s = GameState()
+        s.columns = [bytearray(self.cols[b, c, :self.heights[b, c]].tobytes()) for c in range(COLS)]
+        s.stock = [bytearray(self.stock[b, r].tobytes()) for r in range(self.stock_pos[b], self.stock_len[b])]
+        s.foundations = int(self.foundations[b])
+        s.moves = int(self.moves[b])
+        return s
+
+    # ---------------------- analisi ----------------------
+
+    def tops(self) -> np.ndarray:
+        h = self.heights.astype(np.intp)
+        top = np.take_along_axis(self.cols, np.maximum(h - 1, 0)[..., None], axis=2)[..., 0]
+        return np.where(h > 0, top, 0).astype(np.uint8)
+
+    def top_window(self) -> np.ndarray:
+        """(B, COLS, 13): le 13 carte in cima a ogni colonna, k = 0 è la cima (0 se assente)."""
+        pos = self.heights.astype(np.intp)[..., None] - 1 - _K
+        win = np.take_along_axis(self.cols, np.maximum(pos, 0), axis=2)
+        return np.where(pos >= 0, win, 0).astype(np.uint8)
+
+    def tail_lengths(self) -> np.ndarray:
+        """(B, COLS) lunghezza della run discendente scoperta in coda (al più 13 carte)."""
+        win = self.top_window()
+        r = win & RANK_MASK
+        up = (win & FACE_UP) != 0
+        links = up[..., :-1] & up[..., 1:] & (r[..., 1:] == r[..., :-1] + 1)
+        return np.where(up[..., 0], 1 + np.cumprod(links, axis=2).sum(axis=2), 0).astype(np.int16)
+
+    def legal_mask(self, collapse_empty: bool = True) -> np.ndarray:
+        """(B, COLS, 13, COLS): True se la run lunga k+1 in cima a src può andare su dst.
+        Con `collapse_empty`, nelle partite a stock finito si tiene solo la prima colonna vuota
+        != src, come `list_legal_moves` (con lo stock le colonne vuote non sono equivalenti)."""
+        h = self.heights
+        tops = self.tops()
+        top_rank = (tops & RANK_MASK).astype(np.int16)
+        top_up = ((tops & FACE_UP) != 0) & (h > 0)
+        can_take = _K[None, None, :] < self.tail_lengths()[..., None]            # (B, S, K)
+        front = top_rank[..., None] + _K[None, None, :]                          # (B, S, K)
+        onto = top_up[:, None, None, :] & (top_rank[:, None, None, :] == front[..., None] + 1)
+        empty = h == 0
+        if collapse_empty:
+            order = np.sort(np.where(empty, _C, COLS), axis=1)
+            first = np.where(order[:, :1] == _C[None, :], order[:, 1:2], order[:, :1])  # (B, S)
+            collapsed = (_C[None, None, :] == first[..., None])[:, :, None, :]
+            no_stock = (self.stock_pos >= self.stock_len)[:, None, None, None]
+            to_empty = np.where(no_stock, collapsed, empty[:, None, None, :])
+        else:
+            to_empty = empty[:, None, None, :]
+        not_self = _C[:, None] != _C[None, :]
+        return can_take[..., None] & (onto | to_empty) & not_self[None, :, None, :]
+
+    def can_deal(self) -> np.ndarray:
+        return (self.heights > 0).all(axis=1) & (self.stock_pos < self.stock_len)
+
+    def is_win(self) -> np.ndarray:
+        return self.foundations >= 8
+
+    def move_list(self, b: int, mask: Optional[np.ndarray] = None) -> List[Tuple[int, int, int]]:
+        """Mosse legali della partita b come (src, start, dst), nell'ordine di `list_legal_moves`."""
+        mask = self.legal_mask() if mask is None else mask
+        out = [(int(s), int(self.heights[b, s]) - 1 - int(k), int(d)) for s, k, d in zip(*np.nonzero(mask[b]))]
+        out.sort()
+        return out
+
+    # ---------------------- azioni ----------------------
+
+    def _complete(self, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+        """Rimuove le sequenze K→A in coda alle colonne (b, c); restituisce quante per partita."""
+        removed = np.zeros(len(b), dtype=np.int16)
+        while len(b):
+            h = self.heights[b, c].astype(np.intp)
+            pos = np.maximum(h - MAX_RUN, 0)[:, None] + _K[None, :]
+            window = self.cols[b[:, None], c[:, None], pos] & _RANK_FACE
+            ok = (h >= MAX_RUN) & (window == _SEQ[None, :]).all(axis=1)
+            if not ok.any():
+                break
+            bb, cc, pp = b[ok], c[ok], pos[ok]
+            self.cols[bb[:, None], cc[:, None], pp] = 0
+            self.heights[bb, cc] -= MAX_RUN
+            np.add.at(self.foundations, bb, 1)
+            removed[ok] += 1
+        return removed
+
+    def apply_moves(self, src: np.ndarray, k: np.ndarray, dst: np.ndarray, active: np.ndarray) -> None:
+        """Esegue la mossa (src[b], k[b], dst[b]) su ogni partita con active[b]. Non controlla
+        la legalità: le mosse vanno prese da `legal_mask`."""
+        b = np.nonzero(active)[0]
+        if not len(b):
+            return
+        s, d = src[b].astype(np.intp), dst[b].astype(np.intp)
+        cnt = k[b].astype(np.intp) + 1
+        hs = self.heights[b, s].astype(np.intp)
+        hd = self.heights[b, d].astype(np.intp)
+        start = hs - cnt
+        for j in range(MAX_RUN):
+            m = j < cnt
+            if not m.any():
+                break
+            bb, ss, dd = b[m], s[m], d[m]
+            self.cols[bb, dd, hd[m] + j] = self.cols[bb, ss, start[m] + j]
+            self.cols[bb, ss, start[m] + j] = 0
+        self.heights[b, s] = start
+        self.heights[b, d] = hd + cnt
+        flip = start > 0
+        self.cols[b[flip], s[flip], start[flip] - 1] |= FACE_UP
+        self._complete(b, d)
+        self.moves[b] += 1
+
+    def deal(self, active: np.ndarray) -> np.ndarray:
+        """Distribuisce un giro sulle partite attive dove è lecito; restituisce chi ha distribuito."""
+        dealt = active & self.can_deal()
+        b = np.nonzero(dealt)[0]
+        if not len(b):
+            return dealt
+        cards = self.stock[b, self.stock_pos[b]] | FACE_UP                   # (n, COLS)
+        h = self.heights[b].astype(np.intp)
+        self.cols[b[:, None], _C[None, :], h] = cards
+        self.heights[b] += 1
+        self.stock_pos[b] += 1
+        for c in range(COLS):
+            self._complete(b, np.full(len(b), c, dtype=np.intp))
+        self.moves[b] += 1
+        return dealt
+
+    # ---------------------- rollout ----------------------
+
+    def random_step(self, rng: np.random.Generator, active: Optional[np.ndarray] = None) -> np.ndarray:
+        """Una mossa legale a caso per ogni partita attiva non vinta (deal se non ce ne sono).
+        Restituisce le partite che hanno effettivamente giocato."""
+        active = ~self.is_win() if active is None else active & ~self.is_win()
+        mask = self.legal_mask()
+        flat = mask.reshape(self.size, -1)
+        has_move = flat.any(axis=1) & active
+        choice = np.argmax(rng.random(flat.shape, dtype=np.float32) * flat, axis=1)
+        src, k, dst = np.unravel_index(choice, mask.shape[1:])
+        self.apply_moves(src, k, dst, has_move)
+        dealt = self.deal(active & ~has_move)
+        return has_move | dealt
+
+    def rollout(self, rng: np.random.Generator, max_steps: int = 500) -> np.ndarray:
+        """Gioca a caso fino a vittoria, blocco o `max_steps`; restituisce is_win()."""
+        active = np.ones(self.size, dtype=bool)
+        for _ in range(max_steps):
+            active = self.random_step(rng, active)
+            if not active.any():
+                break
+        return self.is_win()
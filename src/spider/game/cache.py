@@ -0,0 +1,122 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from . import actions
+from .state import GameState, position_hash
+
+# Cache LRU dei risultati di analisi (mosse legali, ricerche di hint, valutazioni) per
+# posizione, limitata in byte. La chiave è position_hash (Zobrist, O(colonne)): con undo/redo
+# o avanti e indietro nella partita le posizioni già viste rispondono subito. Thread-safe,
+# così la stessa istanza (SHARED) serve la TUI, i worker thread e il server.
+
+LEGAL, SEARCH, EVAL = "legal", "search", "eval"
+
+def sizeof(obj: Any) -> int:
+    """Byte occupati da `obj` e dai contenitori annidati (tuple, liste, dict)."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (tuple, list)):
+        size += sum(sizeof(x) for x in obj)
+    elif isinstance(obj, dict):
+        size += sum(sizeof(k) + sizeof(v) for k, v in obj.items())
+    return size
+
+class AnalysisCache:
+    def __init__(self, max_bytes: int = 32 << 20) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Tuple[str, Hashable], Tuple[Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, kind: str, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get((kind, key))
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end((kind, key))
+            self.hits += 1
+            return item[0]
+
+    def put(self, kind: str, key: Hashable, value: Any) -> None:
+        size = sizeof(value) + 64  # + chiave e nodo dell'OrderedDict, circa
+        with self._lock:
+            old = self._data.pop((kind, key), None)
+            if old is not None:
+                self.bytes -= old[1]
+            if size > self.max_bytes:
+                return
+            self._data[(kind, key)] = (value, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, s) = self._data.popitem(last=False)
+                self.bytes -= s
+                self.evictions += 1
+
+    def get_or_compute(self, kind: str, key: Hashable, fn: Callable[[], Any]) -> Any:
+        value = self.get(kind, key)
+        if value is None:
+            value = fn()
+            self.put(kind, key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._data), "bytes": self.bytes, "max_bytes": self.max_bytes,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+        }
+
+SHARED = AnalysisCache()
+
+# ---------------------- analisi con cache ----------------------
+
+def legal_moves(state: GameState, cache: AnalysisCache = SHARED) -> List[Tuple[int, int, int]]:
+    moves = cache.get_or_compute(LEGAL, position_hash(state), lambda: tuple(actions.list_legal_moves(state)))
+    return list(moves)
+
+def evaluate(state: GameState, cache: AnalysisCache = SHARED) -> int:
+    return cache.get_or_compute(EVAL, position_hash(state), lambda: actions.evaluate(state))
+
+def autoplay(
+    state: GameState,
+    max_moves: int = 1000,
+    time_budget: Optional[float] = None,
+    patience: int = 40,
+    cache: AnalysisCache = SHARED,
+) -> actions.AutoplayResult:
+    """Come `actions.autoplay`, con mosse legali e valutazioni prese dalla cache: dopo un undo
+    le posizioni già giocate rispondono subito."""
+    return actions.autoplay(
+        state, max_moves, time_budget, patience,
+        legal=lambda s: legal_moves(s, cache), value=lambda s: evaluate(s, cache),
+    )
+
+def search_hint(
+    state: GameState,
+    budget_ms: float = 250,
+    cache: AnalysisCache = SHARED,
+    **kwargs: Any,
+) -> actions.HintResult:
+    """Come `actions.search_hint`; la ricerca già fatta su questa posizione viene riusata se
+    ha esplorato tutto l'albero o ha avuto almeno lo stesso tempo."""
+    key = position_hash(state)
+    hit: Optional[actions.HintResult] = cache.get(SEARCH, key)
+    if hit is not None and (hit.complete or hit.elapsed * 1000 >= budget_ms * 0.9):
+        return hit
+    res = actions.search_hint(state, budget_ms, **kwargs)
+    if hit is None or res.depth >= hit.depth:
+        cache.put(SEARCH, key, res)
+        return res
+    return hit
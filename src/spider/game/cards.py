@@ -1,7 +1,50 @@
 from dataclasses import dataclass
+from typing import Iterable, List
 
-@dataclass
+# codifica compatta: 1 byte per carta -> rank (bit 0-3), seme (bit 4-5), scoperta (bit 7).
+# Il motore tiene colonne e giri di stock come bytearray di codici; Card è la vista per la
+# UI, i test e il JSON (pack/unpack ai bordi).
+SUITS = ("♠", "♥", "♦", "♣")
+RANK_MASK = 0x0F
+SUIT_SHIFT = 4
+SUIT_MASK = 0x30
+FACE_UP = 0x80
+
+_SUIT_CODES = {s: i for i, s in enumerate(SUITS)}
+
+@dataclass(slots=True)
 class Card:
     rank: int
     suit: str = "♠"
     face_up: bool = True
+
+    @property
+    def code(self) -> int:
+        return encode(self)
+
+    @classmethod
+    def from_code(cls, code: int) -> "Card":
+        return decode(code)
+
+def encode(card: Card) -> int:
+    try:
+        code = card.rank | (_SUIT_CODES[card.suit] << SUIT_SHIFT)
+    except (KeyError, TypeError):
+        raise ValueError(f"unknown suit {card.suit!r}") from None
+    return code | FACE_UP if card.face_up else code
+
+def decode(code: int) -> Card:
+    return Card(code & RANK_MASK, SUITS[(code & SUIT_MASK) >> SUIT_SHIFT], bool(code & FACE_UP))
+
+def pack(cards: Iterable[Card]) -> bytearray:
+    """Colonna (o giro di stock) compatta dalle carte."""
+    return bytearray(encode(c) for c in cards)
+
+def unpack(codes: Iterable[int]) -> List[Card]:
+    return [decode(c) for c in codes]
+
+def rank_of(code: int) -> int:
+    return code & RANK_MASK
+
+def is_face_up(code: int) -> bool:
+    return bool(code & FACE_UP)
@@ -0,0 +1,97 @@
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+from .cards import FACE_UP, RANK_MASK
+from .zobrist import card_key, mix64
+
+@dataclass(slots=True)
+class ColumnMeta:
+    """Metadati di una colonna, aggiornati in modo incrementale dalle azioni.
+
+    - run_start: inizio della run discendente scoperta in coda (== length se non c'è)
+    - hidden: numero di carte coperte in fondo alla colonna
+    - blocked: run discendenti (a, b) di almeno 2 carte che NON arrivano in coda
+    - prefix: prefix[k] è l'hash Zobrist delle prime k carte (zhash == prefix[length])
+    - mix: mix64(zhash), il contributo della colonna a position_hash / canonical_hash
+    """
+    column: bytearray
+    length: int = 0
+    run_start: int = 0
+    hidden: int = 0
+    blocked: List[Tuple[int, int]] = field(default_factory=list)
+    prefix: List[int] = field(default_factory=lambda: [0])
+    mix: int = 0
+
+    @property
+    def tail_len(self) -> int:
+        return self.length - self.run_start
+
+    @property
+    def zhash(self) -> int:
+        return self.prefix[self.length]
+
+    @property
+    def full_start(self) -> Optional[int]:
+        """Indice della sequenza completa K→A in coda, se presente."""
+        if self.tail_len >= 13 and self.column[self.length - 13] & RANK_MASK == 13:
+            return self.length - 13
+        return None
+
+    def is_valid_for(self, column: bytearray) -> bool:
+        return self.column is column and self.length == len(column)
+
+def scan(column: bytearray) -> ColumnMeta:
+    meta = ColumnMeta(column)
+    sync(meta, column, 0)
+    return meta
+
+def sync(meta: ColumnMeta, column: bytearray, keep: int) -> None:
+    """Riallinea `meta` dopo una modifica di `column` che ha lasciato intatte le prime `keep`
+    carte: costa O(carte rimosse + carte aggiunte), non O(colonna)."""
+    n = len(column)
+    if keep > meta.length:
+        keep = meta.length
+    if keep > n:
+        keep = n
+    if keep < 0:
+        keep = 0
+    blocked = meta.blocked
+    # --- taglia il prefisso intatto ---
+    if blocked:
+        while blocked and blocked[-1][0] >= keep:
+            blocked.pop()
+        if blocked and blocked[-1][1] >= keep:
+            a = blocked.pop()[0]
+            if keep - a >= 2:
+                blocked.append((a, keep - 1))
+    if meta.column is column and meta.run_start < keep:
+        run_start = meta.run_start
+    elif blocked and blocked[-1][1] == keep - 1:
+        run_start = blocked.pop()[0]
+    elif keep and column[keep - 1] & FACE_UP:
+        run_start = keep - 1
+    else:
+        run_start = keep
+    hidden = meta.hidden if meta.hidden < keep else keep
+    prefix = meta.prefix
+    del prefix[keep + 1:]
+    # --- accoda le carte nuove ---
+    h = prefix[-1]
+    for k in range(keep, n):
+        c = column[k]
+        h ^= card_key(k, c)
+        prefix.append(h)
+        if not c & FACE_UP:
+            if hidden == k:
+                hidden += 1
+        elif run_start < k:
+            p = column[k - 1]
+            if p & FACE_UP and (p & RANK_MASK) == (c & RANK_MASK) + 1:
+                continue
+        if k - run_start >= 2:
+            blocked.append((run_start, k - 1))
+        run_start = k if c & FACE_UP else k + 1
+    meta.column = column
+    meta.length = n
+    meta.run_start = run_start if run_start < n else n
+    meta.hidden = hidden
+    meta.mix = mix64(h)
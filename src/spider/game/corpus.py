@@ -0,0 +1,168 @@
+import mmap
+import os
+import struct
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from .deals import new_deal
+from .solver import BUDGET, SOLVED, UNSOLVABLE, solve
+
+# Corpus di distribuzioni con seed e statistiche del solver, in un indice a record fissi
+# letto con mmap. Layout (little endian):
+#
+#   header   magic "SPDX", versione, n. classi, dimensione record, n. record
+#   classi   per ogni classe (inizio, quanti) nell'array dei record
+#   soglie   nodi massimi di easy / medium / hard (quartili dei deal risolti)
+#   record   ordinati per (classe, seed): seed, classe, esito, lunghezza soluzione, nodi, ms
+#
+# Scegliere "un deal hard risolvibile" è quindi un accesso diretto: classe -> intervallo
+# -> record k. La ricerca per seed usa una bisezione sui seed (ordinati) di ogni classe.
+
+MAGIC = b"SPDX"
+VERSION = 1
+CLASSES = ("easy", "medium", "hard", "expert", "unsolvable", "unknown")
+EASY, MEDIUM, HARD, EXPERT, UNSOLVED, UNKNOWN = range(len(CLASSES))
+STATUS_CODES = {SOLVED: 1, UNSOLVABLE: 2, BUDGET: 3}
+STATUSES = {v: k for k, v in STATUS_CODES.items()}
+
+_HEADER = struct.Struct("<4sBBHI")
+_CLASS = struct.Struct("<II")
+_THRESHOLDS = struct.Struct("<III")
+_RECORD = struct.Struct("<QBBHIf")   # seed, classe, esito, lunghezza, nodi, ms
+_TABLE = _HEADER.size + len(CLASSES) * _CLASS.size + _THRESHOLDS.size
+
+class DealStats(NamedTuple):
+    seed: int
+    status: str
+    length: int     # azioni nella soluzione (0 se non risolto)
+    nodes: int      # nodi espansi dal solver
+    ms: float
+
+class Entry(NamedTuple):
+    seed: int
+    difficulty: str
+    status: str
+    length: int
+    nodes: int
+    ms: float
+
+# ---------------------- analisi ----------------------
+
+def analyse(seed: int, max_nodes: int = 200_000, time_limit: Optional[float] = None) -> DealStats:
+    r = solve(new_deal(seed), max_nodes, time_limit)
+    return DealStats(seed, r.status, min(len(r.line), 0xFFFF), min(r.nodes, 0xFFFFFFFF), r.elapsed * 1000)
+
+def _analyse(args: Tuple[int, int, Optional[float]]) -> DealStats:
+    return analyse(*args)
+
+def analyse_many(
+    seeds: Iterable[int], max_nodes: int = 200_000, time_limit: Optional[float] = None,
+    workers: Optional[int] = None,
+) -> List[DealStats]:
+    jobs = [(seed, max_nodes, time_limit) for seed in seeds]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [_analyse(j) for j in jobs]
+    with Pool(workers) as pool:
+        return list(pool.imap_unordered(_analyse, jobs, chunksize=max(1, len(jobs) // (workers * 8))))
+
+def thresholds(stats: List[DealStats]) -> Tuple[int, int, int]:
+    """Quartili dei nodi dei deal risolti: limiti superiori di easy, medium e hard."""
+    nodes = sorted(s.nodes for s in stats if s.status == SOLVED)
+    if not nodes:
+        return (0, 0, 0)
+    a, b, c = (nodes[min(len(nodes) - 1, int(f * len(nodes)))] for f in (0.25, 0.5, 0.75))
+    return (a, b, c)
+
+def classify(s: DealStats, limits: Tuple[int, int, int]) -> int:
+    if s.status == UNSOLVABLE:
+        return UNSOLVED
+    if s.status != SOLVED:
+        return UNKNOWN
+    for cls, limit in enumerate(limits):
+        if s.nodes <= limit:
+            return cls
+    return EXPERT
+
+# ---------------------- indice ----------------------
+
+def write_index(stats: List[DealStats], path: Path) -> None:
+    limits = thresholds(stats)
+    rows = sorted((classify(s, limits), s.seed, s) for s in stats)
+    counts = [0] * len(CLASSES)
+    for cls, _, _ in rows:
+        counts[cls] += 1
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, len(CLASSES), _RECORD.size, len(rows)))
+    start = 0
+    for n in counts:
+        out += _CLASS.pack(start, n)
+        start += n
+    out += _THRESHOLDS.pack(*limits)
+    for cls, seed, s in rows:
+        out += _RECORD.pack(seed, cls, STATUS_CODES[s.status], s.length, s.nodes, s.ms)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(out)
+    os.replace(tmp, path)
+
+class Corpus:
+    """Indice su disco aperto in mmap: nessun caricamento, letture O(1) per classe."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, ncls, rsize, self.count = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError("not a spider deal index")
+        if version > VERSION or ncls != len(CLASSES) or rsize != _RECORD.size:
+            raise ValueError(f"unsupported deal index version {version}")
+        self.classes = [_CLASS.unpack_from(self._mm, _HEADER.size + i * _CLASS.size) for i in range(ncls)]
+        self.thresholds = _THRESHOLDS.unpack_from(self._mm, _HEADER.size + ncls * _CLASS.size)
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def __enter__(self) -> "Corpus":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def record(self, i: int) -> Entry:
+        seed, cls, status, length, nodes, ms = _RECORD.unpack_from(self._mm, _TABLE + i * _RECORD.size)
+        return Entry(seed, CLASSES[cls], STATUSES[status], length, nodes, ms)
+
+    def size_of(self, difficulty: str) -> int:
+        return self.classes[CLASSES.index(difficulty)][1]
+
+    def pick(self, difficulty: str, k: int) -> Entry:
+        """Il k-esimo deal (modulo la dimensione) della classe: es. k = giorno per il deal del giorno."""
+        start, n = self.classes[CLASSES.index(difficulty)]
+        if not n:
+            raise LookupError(f"no {difficulty} deals in {self.path}")
+        return self.record(start + k % n)
+
+    def find(self, seed: int) -> Optional[Entry]:
+        for start, n in self.classes:
+            lo, hi = start, start + n
+            while lo < hi:
+                mid = (lo + hi) // 2
+                (s,) = struct.unpack_from("<Q", self._mm, _TABLE + mid * _RECORD.size)
+                if s < seed:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo < start + n and self.record(lo).seed == seed:
+                return self.record(lo)
+        return None
+
+def build(
+    seeds: Iterable[int], path: Path, max_nodes: int = 200_000,
+    time_limit: Optional[float] = None, workers: Optional[int] = None,
+) -> Corpus:
+    write_index(analyse_many(seeds, max_nodes, time_limit, workers), path)
+    return Corpus(path)
@@ -0,0 +1,26 @@
+from random import Random
+from typing import List, Optional
+from .cards import FACE_UP
+from .state import GameState
+
+def new_deal(seed: Optional[int] = None) -> GameState:
+    """Partita Spider 1 seme: 104 carte, 54 sul tavolo (6 nelle prime 4 colonne, 5 nelle
+    altre, solo l'ultima scoperta) e 5 giri da 10 nello stock. Stesso seed -> stessa partita."""
+    rng = Random(seed)
+    deck: List[int] = [r for _ in range(8) for r in range(1, 14)]  # codici di ♠ coperte
+    rng.shuffle(deck)
+
+    s = GameState()
+    s.seed = seed
+    for i in range(4):
+        for _ in range(6):
+            s.columns[i].append(deck.pop())
+    for i in range(4, 10):
+        for _ in range(5):
+            s.columns[i].append(deck.pop())
+    for i in range(10):
+        s.columns[i][-1] |= FACE_UP
+
+    for _ in range(5):
+        s.stock.append(bytearray(deck.pop() for _ in range(10)))
+    return s
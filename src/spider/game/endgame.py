@@ -0,0 +1,310 @@
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from . import actions
+from .cards import RANK_MASK
+from .rules import packed_complete_seq_window, packed_run_start
+from .state import GameState, Move, canonical_hash, clone, column_meta
+from .zobrist import FOUNDATIONS, MASK64, card_key, mix64
+
+# Database dei finali: con lo stock vuoto e tutte le carte scoperte la partita è a
+# informazione perfetta, e la distanza esatta dalla vittoria (in mosse) si calcola una
+# volta per tutte. Le posizioni sono indicizzate da `canonical_hash` (a stock vuoto le
+# colonne sono interscambiabili), quindi la ricerca gira su colonne compatte ordinate;
+# ogni voce porta anche un'impronta indipendente della codifica canonica (`node_check`),
+# verificata a ogni lettura: una collisione dei 64 bit di hash dà "sconosciuta", mai la
+# distanza di un'altra posizione.
+#
+# `distance` riempie il database in modo lazy con una BFS dalla posizione (fino a
+# `max_nodes` nodi): la prima vittoria trovata dà la distanza esatta di ogni nodo della
+# linea più corta; se il grafo raggiungibile si esaurisce senza vittorie, tutti i suoi nodi
+# sono persi (LOST). Le posizioni oltre il budget restano sconosciute. Su disco (little endian):
+#
+#   header   magic "SPEG", versione, dimensione record, n. record
+#   record   ordinati per hash: canonical_hash u64, impronta u64, distanza u16 (0xFFFF = persa)
+#
+# letto con mmap e interrogato per bisezione; le nuove voci restano in memoria fino a `save`.
+
+MAGIC = b"SPEG"
+VERSION = 2
+LOST = -1                 # nessuna vittoria raggiungibile
+_LOST_CODE = 0xFFFF
+
+_HEADER = struct.Struct("<4sBxHI")
+_RECORD = struct.Struct("<QQH")
+
+Node = Tuple[Tuple[bytes, ...], int]   # colonne ordinate, sequenze completate
+Entry = Tuple[int, int]                 # impronta, distanza
+
+# ---------------------- posizioni compatte ----------------------
+
+def is_endgame(state: GameState) -> bool:
+    return not state.stock and not any(column_meta(state, i).hidden for i in range(len(state.columns)))
+
+def node_of(state: GameState) -> Node:
+    return tuple(sorted(bytes(col) for col in state.columns)), state.foundations
+
+def node_hash(node: Node) -> int:
+    """`canonical_hash` della posizione, calcolato sulle colonne compatte."""
+    cols, foundations = node
+    h = 0
+    for col in cols:
+        z = 0
+        for k, code in enumerate(col):
+            z ^= card_key(k, code)
+        h += mix64(z)
+    return (h & MASK64) ^ FOUNDATIONS[foundations & 15]
+
+def node_check(node: Node) -> int:
+    """Impronta a 64 bit della codifica canonica (colonne ordinate separate da 0, poi le
+    sequenze completate), indipendente da `node_hash`."""
+    cols, foundations = node
+    key = b"\0".join(cols) + bytes((0, foundations))
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+def ident(state: GameState) -> Tuple[int, int]:
+    """(canonical_hash, impronta) di un finale."""
+    return canonical_hash(state), node_check(node_of(state))
+
+def successors(node: Node) -> List[Node]:
+    """Posizioni raggiungibili con una mossa (sequenze complete già rimosse), senza
+    duplicati per colonne vuote equivalenti né spostamenti di una colonna intera nel vuoto."""
+    cols, foundations = node
+    out: List[Node] = []
+    empty = cols.index(b"") if b"" in cols else None
+    for s_idx, src in enumerate(cols):
+        if not src:
+            continue
+        for start in range(packed_run_start(src), len(src)):  # type: ignore[arg-type]
+            front = src[start] & RANK_MASK
+            for d_idx, dst in enumerate(cols):
+                if d_idx == s_idx:
+                    continue
+                if dst:
+                    if (dst[-1] & RANK_MASK) != front + 1:
+                        continue
+                elif d_idx != empty or start == 0:
+                    continue
+                moved = bytearray(dst + src[start:])
+                f = foundations
+                window = packed_complete_seq_window(moved)
+                if window is not None:
+                    del moved[window[0]:]
+                    f += 1
+                new = list(cols)
+                new[s_idx] = src[:start]
+                new[d_idx] = bytes(moved)
+                out.append((tuple(sorted(new)), f))
+    return out
+
+def _won(node: Node) -> bool:
+    return not any(node[0])
+
+def _entry(node: Node, d: int) -> Tuple[int, Entry]:
+    return node_hash(node), (node_check(node), d)
+
+def solve_distances(state: GameState, max_nodes: int = 200_000) -> Dict[int, Entry]:
+    """Distanze esatte (hash -> (impronta, mosse alla vittoria o LOST)) ricavabili da una
+    BFS su `state`; dizionario vuoto se il budget finisce prima di trovare una vittoria."""
+    root = node_of(state)
+    if _won(root):
+        return dict([_entry(root, 0)])
+    index: Dict[Node, int] = {root: 0}
+    nodes: List[Node] = [root]
+    parent: List[int] = [-1]
+    queue: Deque[int] = deque([0])
+    while queue:
+        i = queue.popleft()
+        for child in successors(nodes[i]):
+            if child in index:
+                continue
+            index[child] = len(nodes)
+            nodes.append(child)
+            parent.append(i)
+            if _won(child):
+                # la prima vittoria della BFS è alla distanza minima dalla radice, quindi
+                # ogni nodo della sua linea è alla distanza minima dalla vittoria
+                line = [len(nodes) - 1]
+                while parent[line[-1]] >= 0:
+                    line.append(parent[line[-1]])
+                return dict(_entry(nodes[j], k) for k, j in enumerate(line))
+            queue.append(index[child])
+        if len(nodes) >= max_nodes:
+            return {}
+    # grafo esaurito senza vittorie: ogni posizione raggiungibile è persa
+    return dict(_entry(n, LOST) for n in nodes)
+
+# ---------------------- database ----------------------
+
+def write_db(entries: Dict[int, Entry], path: Path) -> None:
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, _RECORD.size, len(entries)))
+    for h in sorted(entries):
+        check, d = entries[h]
+        out += _RECORD.pack(h, check, _LOST_CODE if d == LOST else d)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_bytes(out)
+    os.replace(tmp, path)
+
+class EndgameDB:
+    """Distanze esatte dei finali: file in mmap (se c'è) più le voci calcolate dopo l'apertura."""
+
+    def __init__(self, path: Optional[Path] = None, max_nodes: int = 20_000) -> None:
+        self.path = path
+        self.max_nodes = max_nodes   # budget della BFS per le posizioni non ancora note
+        self.count = 0
+        self.new: Dict[int, Entry] = {}
+        self.unknown: Set[Tuple[int, int]] = set()   # oltre il budget di ricerca: non si riprova
+        self._mm: Optional[mmap.mmap] = None
+        self._lock = threading.Lock()
+        if path is not None and path.exists() and path.stat().st_size:
+            self._open(path)
+
+    def _open(self, path: Path) -> None:
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, rsize, count = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC:
+            mm.close()
+            raise ValueError("not a spider endgame database")
+        if version != VERSION or rsize != _RECORD.size:
+            mm.close()
+            raise ValueError(f"unsupported endgame database version {version}")
+        self._mm, self.count = mm, count
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+    def __enter__(self) -> "EndgameDB":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count + len(self.new)
+
+    def _stored(self, key: Tuple[int, int]) -> Optional[int]:
+        """Distanza della voce con questo (hash, impronta); None se manca o se l'hash
+        appartiene a un'altra posizione."""
+        h, check = key
+        entry = self.new.get(h)
+        if entry is None and self._mm is not None:
+            lo, hi = 0, self.count
+            while lo < hi:
+                mid = (lo + hi) // 2
+                k, c, d = _RECORD.unpack_from(self._mm, _HEADER.size + mid * _RECORD.size)
+                if k < h:
+                    lo = mid + 1
+                elif k > h:
+                    hi = mid
+                else:
+                    entry = c, LOST if d == _LOST_CODE else d
+                    break
+        if entry is None or entry[0] != check:
+            return None
+        return entry[1]
+
+    def save(self, path: Optional[Path] = None) -> None:
+        """Riscrive il file (atomicamente) con le voci su disco più quelle nuove, e lo riapre."""
+        path = path or self.path
+        if path is None:
+            raise ValueError("no path for the endgame database")
+        with self._lock:
+            entries: Dict[int, Entry] = {}
+            if self._mm is not None:
+                for i in range(self.count):
+                    h, c, d = _RECORD.unpack_from(self._mm, _HEADER.size + i * _RECORD.size)
+                    entries[h] = c, LOST if d == _LOST_CODE else d
+            entries.update(self.new)
+            self.close()
+            write_db(entries, path)
+            self.path, self.new = path, {}
+            self._open(path)
+
+    # ---------- interrogazione ----------
+    def lookup(self, state: GameState) -> Optional[int]:
+        """Distanza nota (mosse alla vittoria o LOST), senza cercare; None se non è un finale
+        o non è (ancora) nel database."""
+        if not is_endgame(state):
+            return None
+        key = ident(state)
+        with self._lock:
+            return self._stored(key)
+
+    def distance(self, state: GameState) -> Optional[int]:
+        """Come `lookup`, ma una posizione mancante viene risolta e aggiunta (con tutte
+        quelle incontrate di cui la ricerca stabilisce la distanza)."""
+        if not is_endgame(state):
+            return None
+        key = ident(state)
+        with self._lock:
+            d = self._stored(key)
+        if d is not None or key in self.unknown:
+            return d
+        found = solve_distances(state, self.max_nodes)
+        with self._lock:
+            self.new.update(found)
+            d = self._stored(key)
+            if d is None:
+                self.unknown.add(key)
+        return d
+
+    def best_move(self, state: GameState) -> Optional[Tuple[int, int, int]]:
+        """Una mossa che avvicina alla vittoria (distanza - 1); None se persa o sconosciuta."""
+        d = self.distance(state)
+        if d is None or d <= 0:
+            return None
+        s = clone(state)
+        for m in actions.list_legal_moves(s):
+            rec = actions.apply(s, Move(*m))
+            key = ident(s)
+            with self._lock:
+                child = self._stored(key)
+            actions.revert(s, rec)
+            if child == d - 1:
+                return m
+        return None
+
+    def line(self, state: GameState) -> List[Tuple[int, int, int]]:
+        """Linea ottimale fino alla vittoria ([] se la posizione non ha distanza nota)."""
+        d = self.distance(state)
+        if d is None or d == LOST:
+            return []
+        s = clone(state)
+        out: List[Tuple[int, int, int]] = []
+        for _ in range(d):
+            m = self.best_move(s)
+            if m is None:
+                return []
+            actions.apply(s, Move(*m))
+            out.append(m)
+        return out
+
+def build(states: Iterable[GameState], path: Path, max_nodes: int = 200_000) -> EndgameDB:
+    """Risolve i finali di `states` (quelli che non lo sono vengono ignorati) e salva."""
+    db = EndgameDB(path, max_nodes)
+    for state in states:
+        db.distance(state)
+    db.save()
+    return db
+
+def endgame_states(seeds: Iterable[int], max_nodes: int = 200_000) -> Iterable[GameState]:
+    """Il primo finale lungo la soluzione del solver di ogni deal risolto: materiale per `build`."""
+    from .deals import new_deal
+    from .solver import solve
+    for seed in seeds:
+        s = new_deal(seed)
+        r = solve(s, max_nodes)
+        for rec in r.line:
+            actions.apply(s, Move(rec.src, rec.start, rec.dst))
+            if is_endgame(s) and not actions.is_win(s):
+                yield s
+                break
@@ -0,0 +1,298 @@
+import os
+import struct
+import threading
+from pathlib import Path
+from time import monotonic
+from typing import BinaryIO, List, NamedTuple, Optional, Tuple
+from . import actions
+from .serialize import from_bytes, moves_from_bytes, moves_to_bytes, to_bytes
+from .state import Move
+from .state import GameState
+
+# Journal append-only di una partita: un record START con il tavolo iniziale, poi un
+# record per ogni move/deal/undo/redo e ogni tanto un DELTA con la posizione, il tempo di
+# gioco trascorso e la history cambiata dal checkpoint precedente: quante voci di history
+# e future sono rimaste intatte e le voci nuove. Il file cresce quindi in modo lineare
+# con la partita. Ogni record è <tipo u8><lunghezza u32><payload>; un record troncato in
+# coda (crash durante la scrittura) viene ignorato. Il file è `$SPIDER_JOURNAL` o quello
+# sotto XDG_STATE_HOME; un Journal senza percorso non scrive niente. I CHECKPOINT con la
+# history completa dei journal precedenti si leggono ancora.
+
+START, MOVE, DEAL, UNDO, REDO, CHECKPOINT, DELTA = range(1, 8)
+
+_REC = struct.Struct("<BI")
+_MOVE = struct.Struct("<BBBi")        # src, start, dst, score dopo la mossa
+_SCORE = struct.Struct("<i")
+_CHECKPOINT = struct.Struct("<Id")   # azioni fatte, secondi di gioco
+_DELTA = struct.Struct("<IdIII")     # come _CHECKPOINT + voci intatte di history e future, byte della posizione
+
+def default_path() -> Path:
+    env = os.environ.get("SPIDER_JOURNAL")
+    if env:
+        return Path(env)
+    base = os.environ.get("XDG_STATE_HOME") or Path.home() / ".local" / "state"
+    return Path(base) / "spider" / "journal.bin"
+
+class Record(NamedTuple):
+    kind: int
+    offset: int   # offset del payload
+    size: int
+
+class Recovered(NamedTuple):
+    state: GameState
+    actions: int     # azioni riapplicate
+    valid_end: int   # offset di fine dell'ultimo record valido
+    elapsed: float   # secondi di gioco all'ultimo checkpoint
+    intact: Tuple[int, int] = (0, 0)  # voci di history/future ancora uguali all'ultimo checkpoint
+
+class Journal:
+    """Scrittore del journal: I/O bufferizzato, fsync ogni `sync_every` record o
+    `sync_interval` secondi in un thread di sfondo (il chiamante, cioè la UI, non aspetta
+    il disco), checkpoint ogni `checkpoint_every` azioni. Con `path` None (journal
+    disattivato) tutte le operazioni sono no-op."""
+
+    def __init__(
+        self,
+        path: Optional[Path],
+        sync_every: int = 32,
+        sync_interval: float = 1.0,
+        checkpoint_every: int = 200,
+    ) -> None:
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.checkpoint_every = checkpoint_every
+        self.actions = 0
+        self._f: Optional[BinaryIO] = None
+        self._pending = 0
+        self._last_sync = monotonic()
+        self._clock = monotonic()  # tempo di gioco = _elapsed + (adesso - _clock)
+        self._elapsed = 0.0
+        # voci di history/future intatte dall'ultimo checkpoint (minimo delle lunghezze)
+        self._intact = [0, 0]
+        self._wake = threading.Event()
+        self._syncer: Optional[threading.Thread] = None
+
+    def elapsed(self) -> float:
+        """Secondi di gioco della partita corrente (riprese incluse)."""
+        return self._elapsed + monotonic() - self._clock
+
+    # ---------- apertura ----------
+    def start(self, state: GameState) -> None:
+        """Inizia una nuova partita (il file precedente viene sostituito)."""
+        self.close()
+        self.actions = 0
+        self._clock, self._elapsed = monotonic(), 0.0
+        self._intact = [0, 0]
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._open(open(self.path, "wb", buffering=1 << 16))
+        self._write(START, to_bytes(state, history=False))
+        self._request_sync()
+
+    def resume(self, found: Recovered) -> None:
+        """Riprende a scrivere dopo `recover`, scartando un eventuale record troncato;
+        il tempo di gioco riparte da quello salvato."""
+        self.close()
+        self.actions = found.actions
+        self._clock, self._elapsed = monotonic(), found.elapsed
+        self._intact = list(found.intact)
+        if self.path is None:
+            return
+        with open(self.path, "r+b") as f:
+            f.truncate(found.valid_end)
+        self._open(open(self.path, "ab", buffering=1 << 16))
+
+    # ---------- record ----------
+    def move(self, state: GameState, src: int, start: int, dst: int) -> None:
+        self._action(MOVE, _MOVE.pack(src, start, dst, state.score), state)
+
+    def deal(self, state: GameState) -> None:
+        self._action(DEAL, _SCORE.pack(state.score), state)
+
+    def undo(self, state: GameState) -> None:
+        self._action(UNDO, _SCORE.pack(state.score), state)
+
+    def redo(self, state: GameState) -> None:
+        self._action(REDO, _SCORE.pack(state.score), state)
+
+    def checkpoint(self, state: GameState) -> None:
+        past, future = state.history, state.future
+        keep_past, keep_future = min(self._intact[0], len(past)), min(self._intact[1], len(future))
+        pos = to_bytes(state, history=False)
+        self._write(DELTA, b"".join((
+            _DELTA.pack(self.actions, self.elapsed(), keep_past, keep_future, len(pos)), pos,
+            moves_to_bytes(past[keep_past:]), moves_to_bytes(future[keep_future:]),
+        )))
+        self._intact = [len(past), len(future)]
+        self._request_sync()
+
+    # ---------- I/O ----------
+    def _action(self, kind: int, payload: bytes, state: GameState) -> None:
+        self._write(kind, payload)
+        self.actions += 1
+        intact = self._intact
+        intact[0] = min(intact[0], len(state.history))
+        intact[1] = min(intact[1], len(state.future))
+        if self.checkpoint_every and self.actions % self.checkpoint_every == 0:
+            self.checkpoint(state)
+
+    def _write(self, kind: int, payload: bytes) -> None:
+        if self._f is None:
+            return
+        self._f.write(_REC.pack(kind, len(payload)))
+        self._f.write(payload)
+        self._pending += 1
+        if self._pending >= self.sync_every or monotonic() - self._last_sync >= self.sync_interval:
+            self._request_sync()
+
+    def _open(self, f: BinaryIO) -> None:
+        self._f = f
+        self._syncer = threading.Thread(target=self._sync_loop, args=(f,), name="journal-sync", daemon=True)
+        self._syncer.start()
+
+    def _request_sync(self) -> None:
+        """Chiede un fsync al thread di sfondo (senza aspettarlo)."""
+        if self._f is None or not self._pending:
+            return
+        self._pending = 0
+        self._last_sync = monotonic()
+        self._wake.set()
+
+    def _sync_loop(self, f: BinaryIO) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            if f.closed or self._f is not f:
+                return
+            self.sync(f)
+
+    def sync(self, f: Optional[BinaryIO] = None) -> None:
+        """flush + fsync del file (nel thread di sfondo, o alla chiusura)."""
+        f = f or self._f
+        if f is None:
+            return
+        f.flush()
+        os.fsync(f.fileno())
+
+    def close(self) -> None:
+        if self._f is None:
+            return
+        f, self._f = self._f, None
+        self._wake.set()
+        if self._syncer is not None:
+            self._syncer.join()
+            self._syncer = None
+        self._wake.clear()
+        self.sync(f)
+        f.close()
+        self._pending = 0
+
+# ---------------------- lettura & replay ----------------------
+
+def scan(data: bytes) -> Tuple[List[Record], int]:
+    """Record completi dell'ultima partita nel journal e offset di fine dell'ultimo valido."""
+    records: List[Record] = []
+    pos = 0
+    end = len(data)
+    while pos + _REC.size <= end:
+        kind, size = _REC.unpack_from(data, pos)
+        if pos + _REC.size + size > end:
+            break
+        if kind == START:
+            records.clear()
+        records.append(Record(kind, pos + _REC.size, size))
+        pos += _REC.size + size
+    return records, pos
+
+def _apply(state: GameState, rec: Record, data: bytes) -> None:
+    if rec.kind == MOVE:
+        src, start, dst, score = _MOVE.unpack_from(data, rec.offset)
+        actions.move(state, src, start, dst)
+    else:
+        (score,) = _SCORE.unpack_from(data, rec.offset)
+        if rec.kind == DEAL:
+            actions.deal(state)
+        elif rec.kind == UNDO:
+            actions.undo(state)
+        else:
+            actions.redo(state)
+    state.score = score
+
+def _replay(data: bytes, upto: Optional[int]) -> Tuple[GameState, int, float, Tuple[int, int]]:
+    records, _ = scan(data)
+    if not records or records[0].kind != START:
+        raise ValueError("journal has no START record")
+    # checkpoint utilizzabile più vicino, ricostruendo la history dai DELTA man mano
+    base = records[0]
+    base_done = 0
+    elapsed = 0.0
+    past: List[Move] = []
+    future: List[Move] = []
+    done = 0
+    for rec in records[1:]:
+        if rec.kind not in (CHECKPOINT, DELTA):
+            done += 1
+            continue
+        n, secs = _CHECKPOINT.unpack_from(data, rec.offset)
+        if upto is not None and n > upto:
+            continue
+        base, base_done, elapsed = rec, n, secs
+        if rec.kind == CHECKPOINT:
+            old = from_bytes(data[rec.offset + _CHECKPOINT.size:rec.offset + rec.size])
+            past, future = old.history, old.future
+            continue
+        _, _, keep_past, keep_future, size = _DELTA.unpack_from(data, rec.offset)
+        if keep_past > len(past) or keep_future > len(future):
+            raise ValueError("corrupt journal checkpoint")
+        view = memoryview(data)[:rec.offset + rec.size]
+        new_past, pos = moves_from_bytes(view, rec.offset + _DELTA.size + size)
+        new_future, _ = moves_from_bytes(view, pos)
+        del past[keep_past:]
+        past += new_past
+        del future[keep_future:]
+        future += new_future
+    target = done if upto is None else min(upto, done)
+    if base.kind == START:
+        state = from_bytes(data[base.offset:base.offset + base.size])
+    elif base.kind == CHECKPOINT:
+        state = from_bytes(data[base.offset + _CHECKPOINT.size:base.offset + base.size])
+    else:
+        size = _DELTA.unpack_from(data, base.offset)[4]
+        state = from_bytes(data[base.offset + _DELTA.size:base.offset + _DELTA.size + size])
+        state.history, state.future = past, future
+    intact = [len(state.history), len(state.future)]
+    applied = base_done
+    start_idx = records.index(base) + 1
+    for rec in records[start_idx:]:
+        if applied >= target:
+            break
+        if rec.kind in (CHECKPOINT, DELTA):
+            continue
+        _apply(state, rec, data)
+        applied += 1
+        intact[0] = min(intact[0], len(state.history))
+        intact[1] = min(intact[1], len(state.future))
+    return state, applied, elapsed, (intact[0], intact[1])
+
+def replay_bytes(data: bytes, upto: Optional[int] = None) -> Tuple[GameState, int, float]:
+    """Stato dopo `upto` azioni (tutte se None): parte dal checkpoint più vicino e
+    riapplica solo le azioni successive. Restituisce (stato, azioni applicate, secondi
+    di gioco del checkpoint di partenza)."""
+    return _replay(data, upto)[:3]
+
+def replay(path: Path, upto: Optional[int] = None) -> GameState:
+    return replay_bytes(path.read_bytes(), upto)[0]
+
+def recover(path: Path) -> Optional[Recovered]:
+    """Ultima partita del journal, o None se non c'è (o è illeggibile)."""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    try:
+        state, applied, elapsed, intact = _replay(data, None)
+    except (ValueError, struct.error):
+        return None
+    return Recovered(state, applied, scan(data)[1], elapsed, intact)
@@ -0,0 +1,168 @@
+import os
+from math import sqrt
+from multiprocessing import Pool
+from random import Random
+from time import perf_counter
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from . import actions
+from .cards import FACE_UP
+from .solver import can_deal
+from .state import DEAL, GameState, Move, clone
+
+# Hint "onesto" per determinizzazione: le carte coperte e lo stock vengono rimescolati
+# tra loro (il giocatore conosce il multiinsieme delle carte mancanti, non la loro
+# posizione), da ogni mossa candidata si gioca un rollout veloce e si aggregano gli esiti.
+# I campioni sono distribuiti su un pool di processi a round; la ricerca si ferma appena
+# la mossa migliore è separata dalle altre di `z` errori standard.
+#
+# Con NumPy installato i rollout di un intero blocco (campioni x mosse) girano insieme su
+# spider.game.batch; senza, un rollout Python a mosse casuali.
+
+DEAL_MOVE = (DEAL, 0, DEAL)
+MoveKey = Tuple[int, int, int]
+
+class MoveEstimate(NamedTuple):
+    move: MoveKey
+    samples: int
+    wins: int
+    progress: float   # somma delle sequenze completate / 8 (1.0 per partita vinta)
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.samples if self.samples else 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.progress / self.samples if self.samples else 0.0
+
+class MCResult(NamedTuple):
+    move: Optional[MoveKey]             # DEAL_MOVE se conviene distribuire
+    estimates: Tuple[MoveEstimate, ...]  # dalla migliore
+    samples: int                        # determinizzazioni per mossa
+    stopped_early: bool
+    elapsed: float
+
+    @property
+    def win_probability(self) -> float:
+        return self.estimates[0].win_rate if self.estimates else 0.0
+
+def candidate_moves(state: GameState) -> List[MoveKey]:
+    moves = actions.list_legal_moves(state)
+    if can_deal(state):
+        moves.append(DEAL_MOVE)
+    return moves
+
+def determinize(state: GameState, rng: Random) -> GameState:
+    """Copia di `state` con carte coperte e stock rimescolati tra le stesse posizioni."""
+    s = clone(state)
+    slots: List[Tuple[bytearray, int]] = [
+        (col, i) for col in s.columns for i, c in enumerate(col) if not c & FACE_UP
+    ]
+    slots += [(pile, i) for pile in s.stock for i in range(len(pile))]
+    codes = [pile[i] & ~FACE_UP for pile, i in slots]
+    rng.shuffle(codes)
+    for (pile, i), c in zip(slots, codes):
+        pile[i] = c | (pile[i] & FACE_UP)
+    return s
+
+def _play(state: GameState, m: MoveKey) -> GameState:
+    s = clone(state)
+    if m == DEAL_MOVE:
+        actions.apply(s, Move(DEAL, 0, DEAL))
+    else:
+        actions.apply(s, Move(*m))
+    return s
+
+def _py_rollout(s: GameState, rng: Random, max_steps: int) -> Tuple[bool, int]:
+    for _ in range(max_steps):
+        if actions.is_win(s):
+            break
+        moves = actions.list_legal_moves(s)
+        if moves:
+            actions.apply(s, Move(*rng.choice(moves)))
+        elif can_deal(s):
+            actions.apply(s, Move(DEAL, 0, DEAL))
+        else:
+            break
+    return actions.is_win(s), s.foundations
+
+def _chunk(args: Tuple[GameState, Sequence[MoveKey], int, int, int]) -> List[Tuple[int, float]]:
+    """`n` determinizzazioni x tutte le mosse: per mossa (vittorie, somma progressi)."""
+    state, moves, n, seed, max_steps = args
+    rng = Random(seed)
+    children = [_play(determinize(state, rng), m) for _ in range(n) for m in moves]
+    try:
+        import numpy as np
+        from .batch import BatchState
+    except ImportError:
+        results = [_py_rollout(c, rng, max_steps) for c in children]
+    else:
+        bs = BatchState.from_states(children)
+        won = bs.rollout(np.random.default_rng(seed), max_steps)
+        results = list(zip(won.tolist(), bs.foundations.tolist()))
+    out = [(0, 0.0)] * len(moves)
+    for k, (win, found) in enumerate(results):
+        w, p = out[k % len(moves)]
+        out[k % len(moves)] = (w + bool(win), p + (1.0 if win else found / 8))
+    return out
+
+def _separated(est: List[MoveEstimate], z: float) -> bool:
+    """La migliore stima supera le altre oltre `z` errori standard (progresso in [0, 1])."""
+    def bounds(e: MoveEstimate) -> Tuple[float, float]:
+        m = e.mean
+        se = sqrt(max(m * (1 - m), 1e-4) / e.samples)
+        return m - z * se, m + z * se
+    ranked = sorted(est, key=lambda e: -e.mean)
+    return bounds(ranked[0])[0] > max(bounds(e)[1] for e in ranked[1:])
+
+def mc_hint(
+    state: GameState,
+    samples: int = 256,
+    workers: Optional[int] = None,
+    chunk: int = 32,
+    max_steps: int = 200,
+    z: float = 2.0,
+    time_limit: Optional[float] = None,
+    seed: Optional[int] = None,
+) -> MCResult:
+    """Stima per ogni mossa candidata (deal incluso) la probabilità di vittoria e il
+    progresso medio su fino a `samples` determinizzazioni. `state` non viene modificato."""
+    t0 = perf_counter()
+    moves = candidate_moves(state)
+    if not moves:
+        return MCResult(None, (), 0, False, 0.0)
+    if len(moves) == 1:
+        return MCResult(moves[0], (MoveEstimate(moves[0], 0, 0, 0.0),), 0, True, perf_counter() - t0)
+    rng = Random(seed)
+    base = clone(state)
+    workers = workers or os.cpu_count() or 1
+    totals = [(0, 0.0)] * len(moves)
+    done = 0
+    stopped = False
+    pool = Pool(workers) if workers > 1 else None
+    try:
+        while done < samples:
+            jobs = []
+            for _ in range(workers):
+                n = min(chunk, samples - done - sum(j[2] for j in jobs))
+                if n <= 0:
+                    break
+                jobs.append((base, moves, n, rng.getrandbits(32), max_steps))
+            parts = pool.map(_chunk, jobs) if pool is not None else [_chunk(j) for j in jobs]
+            for part in parts:
+                totals = [(w + pw, p + pp) for (w, p), (pw, pp) in zip(totals, part)]
+            done += sum(j[2] for j in jobs)
+            est = [MoveEstimate(m, done, w, p) for m, (w, p) in zip(moves, totals)]
+            if _separated(est, z):
+                stopped = done < samples
+                break
+            if time_limit is not None and perf_counter() - t0 >= time_limit:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    est = [MoveEstimate(m, done, w, p) for m, (w, p) in zip(moves, totals)]
+    est.sort(key=lambda e: (-e.mean, -e.wins))
+    return MCResult(est[0].move, tuple(est), done, stopped, perf_counter() - t0)
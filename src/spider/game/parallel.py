@@ -0,0 +1,246 @@
+import argparse
+import os
+from dataclasses import dataclass
+from multiprocessing import Queue, get_context
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.sharedctypes import Synchronized
+from pathlib import Path
+from time import perf_counter
+from typing import List, Optional, Tuple
+from .state import GameState, Move, canonical_hash, canonical_hash_after, clone
+from .actions import apply, is_win
+from .solver import SolveResult, SOLVED, UNSOLVABLE, BUDGET, solve, ordered_moves, replay
+
+PROBES = 8
+
+class SharedTable:
+    """Insieme di hash Zobrist (64 bit, != 0) in memoria condivisa (indirizzamento aperto, con perdita).
+
+    Usato come `seen` da `solver.solve`: se i PROBES slot di una chiave sono pieni la chiave
+    non viene registrata, e la posizione potrà solo essere riesplorata. Le scritture non sono
+    sincronizzate: una corsa tra due worker costa al più un'espansione doppia.
+    """
+
+    def __init__(self, slots: int = 1 << 22, name: Optional[str] = None) -> None:
+        if slots & (slots - 1):
+            raise ValueError("slots must be a power of two")
+        self.slots = slots
+        self._mask = slots - 1
+        self._owner = name is None
+        self.shm = SharedMemory(name=name, create=self._owner, size=slots * 8)
+        self._table = self.shm.buf.cast("Q")  # un segmento nuovo è già azzerato
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __contains__(self, h: int) -> bool:
+        t = self._table
+        i = h & self._mask
+        for _ in range(PROBES):
+            v = t[i]
+            if v == h:
+                return True
+            if v == 0:
+                return False
+            i = (i + 1) & self._mask
+        return False
+
+    def add(self, h: int) -> None:
+        t = self._table
+        i = h & self._mask
+        for _ in range(PROBES):
+            v = t[i]
+            if v == h:
+                return
+            if v == 0:
+                t[i] = h
+                return
+            i = (i + 1) & self._mask
+
+    def __len__(self) -> int:
+        return self.slots - self._table.tolist().count(0)
+
+    def close(self) -> None:
+        self._table.release()
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+@dataclass
+class ParallelResult(SolveResult):
+    workers: int = 1
+    tasks: int = 0        # sottoalberi eseguiti, iniziali più quelli donati durante la ricerca
+
+# ---------------------- worker ----------------------
+
+def _fingerprint(state: GameState) -> int:
+    return canonical_hash(state) or 1  # 0 marca gli slot vuoti
+
+def _fingerprint_after(state: GameState, src: int, start: int, dst: int) -> Optional[int]:
+    h = canonical_hash_after(state, src, start, dst)
+    return None if h is None else h or 1
+
+Task = Tuple[List[Move], Optional[float]]   # prefisso dalla radice, deadline (perf_counter)
+
+def _worker(
+    state: GameState, name: str, slots: int, tasks: "Queue[Optional[Task]]",
+    results: "Queue[Tuple[List[Move], SolveResult, int]]", idle: Synchronized, spent: Synchronized,
+    max_nodes: Optional[int], workers: int,
+) -> None:
+    """Prende sottoalberi dalla coda finché non riceve None. Mentre cerca, se un altro worker
+    è fermo e la coda è vuota, rimette in coda i rami non ancora esplorati (vedi solve)."""
+    table = SharedTable(slots, name)
+    try:
+        while True:
+            with idle.get_lock():
+                idle.value += 1
+            item = tasks.get()
+            with idle.get_lock():
+                idle.value -= 1
+            if item is None:
+                break
+            prefix, deadline = item
+            given = 0
+
+            def donate(local: List[Move]) -> None:
+                nonlocal given
+                tasks.put((prefix + local, deadline))
+                given += 1
+
+            budget = None
+            if max_nodes is not None:
+                budget = max(1, (max_nodes - spent.value) // workers)
+            time_limit = None if deadline is None else max(0.0, deadline - perf_counter())
+            r = solve(
+                replay(state, prefix), budget, time_limit, key=_fingerprint, key_after=_fingerprint_after, seen=table,
+                wanted=lambda: idle.value > 0 and tasks.empty(), donate=donate,
+            )
+            with spent.get_lock():
+                spent.value += r.nodes
+            # le donazioni sono già in coda: il coordinatore non vede mai zero task pendenti per errore
+            results.put((prefix, r, given))
+    finally:
+        table.close()
+
+# ---------------------- split & solve ----------------------
+
+def split(state: GameState, min_tasks: int, max_depth: int = 4) -> List[List[Move]]:
+    """Espande la radice in ampiezza finché non ci sono almeno `min_tasks` sottoalberi."""
+    frontier: List[List[Move]] = [[]]
+    for _ in range(max_depth):
+        if len(frontier) >= min_tasks:
+            break
+        grown: List[List[Move]] = []
+        for prefix in frontier:
+            s = replay(state, prefix)
+            children = ordered_moves(s)
+            if not children:
+                continue
+            for m in children:
+                grown.append(prefix + [apply(clone(s), m)])
+        if not grown:
+            break
+        frontier = grown
+    return frontier
+
+def parallel_solve(
+    state: GameState,
+    workers: Optional[int] = None,
+    max_nodes: Optional[int] = 1_000_000,
+    time_limit: Optional[float] = None,
+    table_slots: int = 1 << 22,
+    tasks_per_worker: int = 2,
+) -> ParallelResult:
+    """Ricerca su un gruppo di processi che condividono la tabella delle posizioni visitate.
+
+    La radice viene divisa in pochi sottoalberi iniziali; poi il lavoro si ridistribuisce
+    da solo: un worker occupato rimette in una coda comune i rami non esplorati più vicini
+    alla sua radice appena un altro resta senza lavoro. Il budget di nodi è globale (ogni
+    sottoalbero riceve la sua parte di quanto resta)."""
+    t0 = perf_counter()
+    workers = workers or os.cpu_count() or 1
+    base = clone(state)
+    if is_win(base):
+        return ParallelResult(SOLVED, workers=workers)
+    prefixes = split(base, workers * tasks_per_worker)
+    for prefix in prefixes:
+        if prefix and is_win(replay(base, prefix)):
+            return ParallelResult(SOLVED, prefix, 0, perf_counter() - t0, workers, len(prefixes))
+    deadline = None if time_limit is None else t0 + time_limit
+    ctx = get_context()
+    tasks = ctx.Queue()
+    results = ctx.Queue()
+    idle = ctx.Value("i", 0)
+    spent = ctx.Value("q", 0)
+    table = SharedTable(table_slots)
+    procs = [
+        ctx.Process(
+            target=_worker, daemon=True,
+            args=(base, table.name, table_slots, tasks, results, idle, spent, max_nodes, workers),
+        )
+        for _ in range(workers)
+    ]
+    status = UNSOLVABLE
+    line: List[Move] = []
+    nodes = 0
+    total = pending = len(prefixes)
+    try:
+        for prefix in prefixes:
+            tasks.put((prefix, deadline))
+        for p in procs:
+            p.start()
+        while pending:
+            prefix, r, given = results.get()
+            pending += given - 1
+            total += given
+            nodes += r.nodes
+            if r.status == SOLVED:
+                status, line = SOLVED, prefix + r.line
+                break
+            if r.status == BUDGET:
+                status = BUDGET
+    finally:
+        if status == SOLVED:
+            for p in procs:
+                p.terminate()
+        else:
+            for _ in procs:
+                tasks.put(None)
+        for p in procs:
+            p.join()
+        table.close()
+    return ParallelResult(status, line, nodes, perf_counter() - t0, workers, total)
+
+# ---------------------- CLI ----------------------
+
+def _report(label: str, r: SolveResult) -> None:
+    print(f"{label:>10}: {r.status:<10} nodes={r.nodes:<9} time={r.elapsed:7.2f}s  {r.nodes_per_sec:10.0f} nodes/s  line={len(r.line)}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    p = argparse.ArgumentParser(prog="spider-solve", description="Risolve una partita salvata con un pool di processi.")
+    p.add_argument("game", type=Path, help="partita salvata con serialize.save")
+    p.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--max-nodes", type=int, default=1_000_000)
+    p.add_argument("--time-limit", type=float, default=None)
+    p.add_argument("--compare", action="store_true",
+                   help="esegue anche il solver seriale (tabella esatta) e riporta il rapporto dei tempi")
+    args = p.parse_args(argv)
+
+    from .serialize import load
+    state = load(args.game)
+    single = None
+    if args.compare:
+        single = solve(state, args.max_nodes, args.time_limit)
+        _report("serial", single)
+    r = parallel_solve(state, args.workers, args.max_nodes, args.time_limit)
+    _report(f"{r.workers} workers", r)
+    print(f"{'':>10}  {r.tasks} subtrees (dynamic split)")
+    if single is not None and r.elapsed > 0:
+        # non è uno speedup a parità di lavoro: la tabella condivisa è con perdita (e le corse
+        # tra worker ripetono posizioni), quindi i nodi espansi differiscono dal seriale
+        print(f"time ratio: {single.elapsed / r.elapsed:.2f}x wall ({single.nodes} vs {r.nodes} nodes: "
+              "serial uses an exact table, workers a lossy shared one)")
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,61 @@
-from .cards import Card
+from .cards import FACE_UP, RANK_MASK
+from .columns import scan
 
-def is_descending_run(cards: list[Card]) -> bool:
-    if not cards:
+# Le colonne sono bytearray di codici carta (cards.encode): rank nei bit 0-3, FACE_UP.
+
+def links(a: int, b: int) -> bool:
+    """`b` può stare sopra `a` nella stessa run: entrambe scoperte, rank consecutivi."""
+    return bool(a & b & FACE_UP) and (a & RANK_MASK) == (b & RANK_MASK) + 1
+
+def is_descending_run(codes: bytes) -> bool:
+    if not codes:
         return False
-    for a, b in zip(cards, cards[1:]):
-        if not (a.face_up and b.face_up and a.rank == b.rank + 1):
+    for a, b in zip(codes, codes[1:]):
+        if not links(a, b):
             return False
     return True
 
-def can_take_run(column: list[Card], start: int) -> bool:
+def can_take_run(column: bytearray, start: int) -> bool:
     if start < 0 or start >= len(column):
         return False
-    if not column[start].face_up:
+    if not column[start] & FACE_UP:
         return False
     return is_descending_run(column[start:])
 
-def can_place(dst_top: Card | None, moving_front: Card) -> bool:
+def run_start(column: bytearray) -> int:
+    """Indice d'inizio della run discendente scoperta in coda (len(column) se non ce n'è)."""
+    return scan(column).run_start
+
+def can_place(dst_top: int | None, moving_front: int) -> bool:
     if dst_top is None:
         return True
-    if not dst_top.face_up:
+    if not dst_top & FACE_UP:
         return False
-    return dst_top.rank == moving_front.rank + 1
+    return (dst_top & RANK_MASK) == (moving_front & RANK_MASK) + 1
+
+def complete_seq_window(column: bytearray) -> tuple[int, int] | None:
+    """Finestra (inizio, fine) della sequenza K→A scoperta in coda, se presente."""
+    start = scan(column).full_start
+    return None if start is None else (start, len(column))
+
+# ---------------------- senza ColumnMeta (ricerca dei finali) ----------------------
+
+def packed_run_start(column: bytes) -> int:
+    n = len(column)
+    if not n or not column[-1] & FACE_UP:
+        return n
+    i = n - 1
+    while i > 0 and links(column[i - 1], column[i]):
+        i -= 1
+    return i
 
-def complete_seq_window(column: list[Card]) -> tuple[int, int] | None:
-    if len(column) < 13:
+def packed_complete_seq_window(column: bytes) -> tuple[int, int] | None:
+    n = len(column)
+    if n < 13:
         return None
-    i = len(column) - 13
-    window = column[i:]
-    need = list(range(13, 0, -1))
-    for k, c in enumerate(window):
-        if not c.face_up or c.rank != need[k]:
+    i = n - 13
+    for k in range(13):
+        c = column[i + k]
+        if not c & FACE_UP or (c & RANK_MASK) != 13 - k:
             return None
-    return i, len(column)
+    return i, n
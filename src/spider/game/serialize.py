@@ -1,32 +1,200 @@
 import json
+import struct
+import zlib
 from pathlib import Path
-from typing import Dict, Any, List
-from .state import GameState
-from .cards import Card
+from typing import Dict, Any, List, Optional, Tuple
+from .state import GameState, Move
+from .cards import Card, SUITS, RANK_MASK, SUIT_MASK, SUIT_SHIFT, FACE_UP, encode
+
+# carta JSON per codice: {"r": rank, "s": seme, "u": scoperta}
+_JSON_FIELDS = [(c & RANK_MASK, SUITS[(c & SUIT_MASK) >> SUIT_SHIFT], bool(c & FACE_UP)) for c in range(256)]
+
+def _json_cards(codes: bytes) -> List[Dict[str, Any]]:
+    f = _JSON_FIELDS
+    return [{"r": f[c][0], "s": f[c][1], "u": f[c][2]} for c in codes]
 
 def to_dict(state: GameState) -> Dict[str, Any]:
     return {
-        "columns": [[{"r": c.rank, "s": c.suit, "u": c.face_up} for c in col] for col in state.columns],
-        "stock": [[{"r": c.rank, "s": c.suit, "u": c.face_up} for c in pile] for pile in state.stock],
+        "columns": [_json_cards(col) for col in state.columns],
+        "stock": [_json_cards(pile) for pile in state.stock],
         "foundations": state.foundations,
         "moves": state.moves,
         "score": state.score,
+        "seed": state.seed,
     }
 
+def _code(c: Dict[str, Any], face_up: bool) -> int:
+    """Codice di una carta JSON, validata: un file con rank o seme sconosciuti è rifiutato
+    al caricamento."""
+    card = Card(c["r"], c.get("s", "♠"), c.get("u", face_up))
+    if isinstance(card.rank, bool) or not isinstance(card.rank, int) or not 1 <= card.rank <= 13:
+        raise ValueError(f"bad rank {card.rank!r}")
+    if not isinstance(card.face_up, bool):
+        raise ValueError(f"bad face-up flag {card.face_up!r}")
+    return encode(card)  # seme sconosciuto -> ValueError
+
 def from_dict(data: Dict[str, Any]) -> GameState:
     s = GameState()
-    s.columns = [[Card(c["r"], c.get("s", "♠"), c.get("u", True)) for c in col] for col in data.get("columns", [[] for _ in range(10)])]
-    s.stock = [[Card(c["r"], c.get("s", "♠"), c.get("u", False)) for c in pile] for pile in data.get("stock", [])]
+    s.columns = [bytearray(_code(c, True) for c in col) for col in data.get("columns", [[] for _ in range(10)])]
+    s.stock = [bytearray(_code(c, False) for c in pile) for pile in data.get("stock", [])]
     s.foundations = int(data.get("foundations", 0))
     s.moves = int(data.get("moves", 0))
     s.score = int(data.get("score", 0))
+    s.seed = data.get("seed")
     s.history.clear()
     s.future.clear()
     return s
 
-def save(state: GameState, path: Path) -> None:
-    path.write_text(json.dumps(to_dict(state)))
+def save(state: GameState, path: Path, binary: bool = False, history: bool = True) -> None:
+    if binary:
+        path.write_bytes(to_bytes(state, history))
+    else:
+        path.write_text(json.dumps(to_dict(state)))
 
 def load(path: Path) -> GameState:
-    data = json.loads(path.read_text())
-    return from_dict(data)
+    """Carica una partita JSON o binaria (riconosciuta dal magic)."""
+    raw = path.read_bytes()
+    if raw.startswith(MAGIC):
+        return from_bytes(raw)
+    return from_dict(json.loads(raw))
+
+# ---------------------- formato binario ----------------------
+#
+# header (little endian): magic "SPDR", versione, flag, seed, score, moves,
+# fondazioni, n. colonne, n. giri di stock; poi per ogni colonna e giro un byte di
+# lunghezza seguito dai codici carta (cards.encode). Con FLAG_HISTORY segue un blob
+# zlib (u32 di lunghezza) con history e future come record Move compatti.
+
+MAGIC = b"SPDR"
+VERSION = 1
+FLAG_SEED = 0x01
+FLAG_HISTORY = 0x02
+
+_HEADER = struct.Struct("<4sBBqiiBBB")
+_MOVE = struct.Struct("<bBbBBHB")          # src, start, dst, count, flipped, faces, n. completate
+_COMPLETED = struct.Struct("<BB13s")       # colonna, indice, 13 codici
+_U32 = struct.Struct("<I")
+
+# codici ammessi: rank 1-13, qualsiasi seme, scoperta o no
+_VALID_CODES = bytes(c for c in range(256) if 1 <= c & RANK_MASK <= 13 and not c & ~(RANK_MASK | SUIT_MASK | FACE_UP))
+
+def _pack_piles(out: bytearray, piles: List[bytes]) -> None:
+    for p in piles:
+        out.append(len(p))
+        out += p
+
+def _need(data: bytes, pos: int, size: int) -> None:
+    if pos + size > len(data):
+        raise ValueError("truncated save")
+
+def _unpack_piles(data: bytes, pos: int, n: int) -> Tuple[List[bytes], int]:
+    piles = []
+    for _ in range(n):
+        _need(data, pos, 1)
+        size = data[pos]
+        _need(data, pos + 1, size)
+        pile = data[pos + 1:pos + 1 + size]
+        if pile.translate(None, _VALID_CODES):
+            raise ValueError("corrupt save: bad card code")
+        piles.append(pile)
+        pos += 1 + size
+    return piles, pos
+
+def _pack_moves(out: bytearray, moves: List[Move]) -> None:
+    out += _U32.pack(len(moves))
+    for m in moves:
+        out += _MOVE.pack(m.src, m.start, m.dst, m.count, m.flipped, m.faces, len(m.completed))
+        for col, idx, codes in m.completed:
+            out += _COMPLETED.pack(col, idx, codes)
+
+def _unpack_moves(data: bytes, pos: int) -> Tuple[List[Move], int]:
+    _need(data, pos, _U32.size)
+    (n,) = _U32.unpack_from(data, pos)
+    pos += _U32.size
+    moves = []
+    for _ in range(n):
+        _need(data, pos, _MOVE.size)
+        src, start, dst, count, flipped, faces, ncomp = _MOVE.unpack_from(data, pos)
+        pos += _MOVE.size
+        completed = []
+        for _ in range(ncomp):
+            _need(data, pos, _COMPLETED.size)
+            col, idx, codes = _COMPLETED.unpack_from(data, pos)
+            pos += _COMPLETED.size
+            if codes.translate(None, _VALID_CODES):
+                raise ValueError("corrupt save: bad card code")
+            completed.append((col, idx, codes))
+        moves.append(Move(src, start, dst, count, bool(flipped), tuple(completed), faces))
+    return moves, pos
+
+def moves_to_bytes(moves: List[Move]) -> bytes:
+    """Record Move compatti (come nella history dei salvataggi binari), senza compressione."""
+    out = bytearray()
+    _pack_moves(out, moves)
+    return bytes(out)
+
+def moves_from_bytes(data: bytes, pos: int = 0) -> Tuple[List[Move], int]:
+    """Inverso di moves_to_bytes a partire da `pos`; restituisce anche l'offset finale."""
+    return _unpack_moves(data, pos)
+
+def _pack(
+    columns: List[bytes], stock: List[bytes], foundations: int, moves: int, score: int,
+    seed: Optional[int], history: Optional[Tuple[List[Move], List[Move]]] = None,
+) -> bytes:
+    flags = (FLAG_SEED if seed is not None else 0) | (FLAG_HISTORY if history is not None else 0)
+    out = bytearray(_HEADER.pack(MAGIC, VERSION, flags, seed or 0, score, moves, foundations, len(columns), len(stock)))
+    _pack_piles(out, columns)
+    _pack_piles(out, stock)
+    if history is not None:
+        blob = bytearray()
+        _pack_moves(blob, history[0])
+        _pack_moves(blob, history[1])
+        z = zlib.compress(bytes(blob))
+        out += _U32.pack(len(z)) + z
+    return bytes(out)
+
+def _unpack(data: bytes) -> Tuple[tuple, List[bytes], List[bytes], Optional[Tuple[List[Move], List[Move]]]]:
+    _need(data, 0, _HEADER.size)
+    magic, version, flags, seed, score, moves, foundations, ncols, nrounds = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a spider binary save")
+    if version > VERSION:
+        raise ValueError(f"unsupported save version {version}")
+    columns, pos = _unpack_piles(data, _HEADER.size, ncols)
+    stock, pos = _unpack_piles(data, pos, nrounds)
+    history = None
+    if flags & FLAG_HISTORY:
+        _need(data, pos, _U32.size)
+        (size,) = _U32.unpack_from(data, pos)
+        pos += _U32.size
+        _need(data, pos, size)
+        try:
+            blob = zlib.decompress(data[pos:pos + size])
+        except zlib.error:
+            raise ValueError("corrupt save: bad history blob") from None
+        past, p = _unpack_moves(blob, 0)
+        future, _ = _unpack_moves(blob, p)
+        history = (past, future)
+    header = (seed if flags & FLAG_SEED else None, score, moves, foundations)
+    return header, columns, stock, history
+
+def to_bytes(state: GameState, history: bool = True) -> bytes:
+    return _pack(
+        state.columns,
+        state.stock,
+        state.foundations, state.moves, state.score, state.seed,
+        (state.history, state.future) if history else None,
+    )
+
+def from_bytes(data: bytes) -> GameState:
+    (seed, score, moves, foundations), columns, stock, history = _unpack(data)
+    s = GameState()
+    s.columns = [bytearray(col) for col in columns]
+    s.stock = [bytearray(pile) for pile in stock]
+    s.foundations = foundations
+    s.moves = moves
+    s.score = score
+    s.seed = seed
+    if history is not None:
+        s.history, s.future = history
+    return s
@@ -0,0 +1,169 @@
+from dataclasses import dataclass, field
+from operator import itemgetter
+from time import perf_counter
+from typing import Callable, Hashable, List, Optional, Set, Tuple
+from .cards import FACE_UP, RANK_MASK
+from .state import GameState, Move, DEAL, canonical_hash, canonical_hash_after, clone, column_meta
+from . import actions
+from .actions import apply, revert, iter_legal_moves, is_win
+
+SOLVED = "solved"
+UNSOLVABLE = "unsolvable"
+BUDGET = "budget"
+
+@dataclass
+class SolveResult:
+    status: str
+    line: List[Move] = field(default_factory=list)
+    nodes: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def solved(self) -> bool:
+        return self.status == SOLVED
+
+    @property
+    def nodes_per_sec(self) -> float:
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+def can_deal(state: GameState) -> bool:
+    return bool(state.stock) and all(state.columns)
+
+Triple = Tuple[int, int, int]
+
+def ordered_moves(state: GameState) -> List[Move]:
+    """Mosse candidate in ordine di promessa; a stock vuoto scarta gli spostamenti di
+    un'intera colonna su una colonna vuota (stessa posizione a colonne permutate)."""
+    return [Move(*t) for t in _candidates(state)]
+
+def _candidates(state: GameState) -> List[Triple]:
+    # come ordered_moves, ma (src, start, dst): `solve` crea il Move solo per le mosse che
+    # prova davvero, una frazione di quelle generate
+    cols = state.columns
+    permutable = not state.stock
+    # premio della destinazione: la sua run in coda se è occupata, -10 se è vuota
+    bonus = [20 + len(col) - column_meta(state, i).run_start if col else -10 for i, col in enumerate(cols)]
+    scored: List[Tuple[int, Triple]] = []
+    for mv in iter_legal_moves(state):
+        s_idx, start, d_idx = mv
+        scol = cols[s_idx]
+        count = len(scol) - start
+        if not start:
+            if permutable and not cols[d_idx]:
+                continue
+            score = 60
+        else:
+            below = scol[start - 1]
+            if not below & FACE_UP:
+                score = 80
+            elif (below & RANK_MASK) == (scol[start] & RANK_MASK) + 1:
+                score = -20  # spezza una run: utile solo in casi particolari
+            else:
+                score = 30
+        b = bonus[d_idx]
+        scored.append((score + b + count if b > 0 else score + b - count, mv))
+    scored.sort(key=itemgetter(0), reverse=True)  # stabile anche con reverse
+    moves = [mv for _, mv in scored]
+    if can_deal(state):
+        moves.append((DEAL, 0, DEAL))
+    return moves
+
+def solve(
+    state: GameState,
+    max_nodes: Optional[int] = 1_000_000,
+    time_limit: Optional[float] = None,
+    key: Callable[[GameState], Hashable] = canonical_hash,
+    seen: Optional[Set[Hashable]] = None,
+    wanted: Optional[Callable[[], bool]] = None,
+    donate: Optional[Callable[[List[Move]], None]] = None,
+    key_after: Optional[Callable[[GameState, int, int, int], Optional[Hashable]]] = None,
+) -> SolveResult:
+    """Ricerca in profondità (stack esplicito) con tabella di trasposizione.
+
+    Ogni posizione viene espansa una sola volta: se la ricerca si esaurisce senza
+    vittoria la partita è irrisolvibile, altrimenti si ferma a `max_nodes`/`time_limit`
+    secondi con esito BUDGET. Con il database dei finali attivo (actions.set_endgame) i
+    finali già noti chiudono la linea o vengono scartati senza espanderli (le distanze
+    nuove le calcola solo `hint`/`autoplay`). `state` non viene modificato.
+
+    Divisione dinamica del lavoro (parallel): ogni 1024 nodi, se `wanted()` è vero, le mosse
+    non ancora provate del livello più vicino alla radice passano a `donate` come prefissi
+    (da `state`) e questa ricerca non le esplora più.
+
+    `key_after(state, src, start, dst)` è la `key` della posizione dopo la mossa calcolata
+    senza eseguirla (None = va eseguita): le posizioni già viste si scartano senza apply.
+    Di default è `canonical_hash_after` se `key` è `canonical_hash`, altrimenti non si usa.
+    """
+    t0 = perf_counter()
+    s = clone(state)
+    if is_win(s):
+        return SolveResult(SOLVED)
+    seen = set() if seen is None else seen
+    seen.add(key(s))
+    if key_after is None and key is canonical_hash:
+        key_after = canonical_hash_after
+    # frame: [mosse candidate, prossimo indice, record che ha portato qui]
+    stack: List[list] = [[_candidates(s), 0, None]]
+    nodes = 0
+    next_share = 1024
+    while stack:
+        frame = stack[-1]
+        moves, i, _ = frame
+        if i >= len(moves):
+            stack.pop()
+            if frame[2] is not None:
+                revert(s, frame[2])
+            continue
+        frame[1] = i + 1
+        k = None if key_after is None else key_after(s, *moves[i])
+        rec = None if k is not None and k in seen else apply(s, Move(*moves[i]))
+        nodes += 1
+        if rec is not None and is_win(s):
+            line = [f[2] for f in stack[1:]] + [rec]
+            return SolveResult(SOLVED, line, nodes, perf_counter() - t0)
+        # budget prima della tabella: anche le posizioni già viste contano come nodi
+        if max_nodes is not None and nodes >= max_nodes:
+            return SolveResult(BUDGET, [], nodes, perf_counter() - t0)
+        if time_limit is not None and not nodes & 1023 and perf_counter() - t0 >= time_limit:
+            return SolveResult(BUDGET, [], nodes, perf_counter() - t0)
+        if rec is None:
+            continue
+        if k is None:
+            k = key(s)
+            if k in seen:
+                revert(s, rec)
+                continue
+        seen.add(k)
+        d = actions.endgame_lookup(s)
+        if d is not None and d < 0:
+            revert(s, rec)
+            continue
+        if d is not None:
+            tail = actions.endgame_line(s)
+            if len(tail) == d:
+                line = [f[2] for f in stack[1:]] + [rec]
+                line += [apply(s, Move(*m)) for m in tail]
+                return SolveResult(SOLVED, line, nodes, perf_counter() - t0)
+        if donate is not None and wanted is not None and nodes >= next_share:
+            next_share = nodes + 1024
+            if wanted():
+                _give_away(stack, donate)
+        stack.append([_candidates(s), 0, rec])
+    return SolveResult(UNSOLVABLE, [], nodes, perf_counter() - t0)
+
+def _give_away(stack: List[list], donate: Callable[[List[Move]], None]) -> None:
+    for k, frame in enumerate(stack):
+        moves, i, _ = frame
+        if i < len(moves):
+            head = [f[2] for f in stack[1:k + 1]]
+            for m in moves[i:]:
+                donate(head + [Move(*m)])
+            del moves[i:]
+            return
+
+def replay(state: GameState, line: List[Move]) -> GameState:
+    """Applica una linea restituita da `solve` a una copia di `state`."""
+    s = clone(state)
+    for m in line:
+        apply(s, m)
+    return s
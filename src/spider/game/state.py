@@ -1,25 +1,184 @@
 from dataclasses import dataclass, field
-from typing import List, Tuple
-from .cards import Card
+from typing import List, NamedTuple, Optional, Set, Tuple
+from .cards import FACE_UP
+from .columns import ColumnMeta, scan, sync
+from .zobrist import COLUMN, FOUNDATIONS, MASK64, ROUND, card_key, mix64
+
+DEAL = -1
+
+# voci di GameState.dirty oltre agli indici di colonna
+DIRTY_STOCK = -1
+DIRTY_FOUNDATIONS = -2
+
+class Move(NamedTuple):
+    """Record reversibile di un'azione: per un deal src == dst == DEAL e `faces` conserva
+    i bit face_up originali del giro di stock; `completed` elenca (colonna, indice, codici)
+    di ogni sequenza K→A rimossa, nell'ordine in cui è stata rimossa."""
+    src: int
+    start: int
+    dst: int
+    count: int = 0
+    flipped: bool = False
+    completed: Tuple[Tuple[int, int, bytes], ...] = ()
+    faces: int = 0
+
+    @property
+    def is_deal(self) -> bool:
+        return self.src == DEAL
 
 @dataclass
 class GameState:
-    columns: List[List[Card]] = field(default_factory=lambda: [[] for _ in range(10)])
-    stock: List[List[Card]] = field(default_factory=list)
+    """Colonne e giri di stock sono bytearray di codici carta (cards.encode), il giro
+    successivo è stock[0]; cards.unpack li trasforma in Card per chi li vuole leggibili."""
+    columns: List[bytearray] = field(default_factory=lambda: [bytearray() for _ in range(10)])
+    stock: List[bytearray] = field(default_factory=list)
     foundations: int = 0
     moves: int = 0
-    history: List[Tuple] = field(default_factory=list)
-    future: List[Tuple] = field(default_factory=list)
+    history: List[Move] = field(default_factory=list)
+    future: List[Move] = field(default_factory=list)
     score: int = 0
+    seed: Optional[int] = None
+    meta: List[Optional[ColumnMeta]] = field(default_factory=list, repr=False, compare=False)
+    stock_meta: Optional[Tuple[list, int, int]] = field(default=None, repr=False, compare=False)
+    dirty: Set[int] = field(default_factory=set, repr=False, compare=False)
+    # [somma dei ColumnMeta.mix, xor dei contributi posizionali], aggiornati da `resync`
+    hashes: Optional[List[int]] = field(default=None, repr=False, compare=False)
+
+def take_dirty(state: GameState) -> Set[int]:
+    """Colonne (e DIRTY_STOCK / DIRTY_FOUNDATIONS) cambiate dall'ultima chiamata."""
+    out = state.dirty
+    state.dirty = set()
+    return out
+
+def column_meta(state: GameState, idx: int) -> ColumnMeta:
+    """Metadati in cache della colonna `idx`; ricalcolati solo se la colonna è stata
+    sostituita o modificata fuori da `actions`."""
+    col = state.columns[idx]
+    try:
+        m = state.meta[idx]
+        if m.column is col and m.length == len(col):
+            return m
+    except (IndexError, AttributeError):
+        pass
+    metas = state.meta
+    if len(metas) != len(state.columns):
+        metas[:] = [None] * len(state.columns)
+    m = metas[idx] = scan(col)
+    state.hashes = None
+    return m
+
+def resync(state: GameState, idx: int, meta: ColumnMeta, keep: int) -> None:
+    """`columns.sync` della colonna `idx` (`meta` è il suo column_meta preso prima della
+    modifica) che tiene aggiornati anche gli hash di colonna di `state`."""
+    old = meta.mix
+    sync(meta, state.columns[idx], keep)
+    hs = state.hashes
+    if hs is not None:
+        k = COLUMN[idx & 15] | 1
+        hs[0] = (hs[0] + meta.mix - old) & MASK64
+        hs[1] ^= (old * k ^ meta.mix * k) & MASK64
+
+# ---------------------- hash di posizione ----------------------
+
+def round_hash(pile: bytes, r: int) -> int:
+    """Hash di un giro di stock; `r` conta i giri dal fondo dello stock, così `pop(0)` non
+    cambia l'indice dei giri rimasti."""
+    h = ROUND[r & 15]
+    for j, c in enumerate(pile):
+        h ^= card_key(j, c)
+    return mix64(h)
+
+def stock_hash(state: GameState) -> int:
+    sm = state.stock_meta
+    stock = state.stock
+    if sm is None or sm[0] is not stock or sm[1] != len(stock):
+        n = len(stock)
+        h = 0
+        for i, pile in enumerate(stock):
+            h ^= round_hash(pile, n - 1 - i)
+        sm = state.stock_meta = (stock, n, h)
+    return sm[2]
+
+def pop_round(state: GameState) -> bytearray:
+    h = stock_hash(state)
+    pile = state.stock.pop(0)
+    n = len(state.stock)
+    state.stock_meta = (state.stock, n, h ^ round_hash(pile, n))
+    return pile
+
+def push_round(state: GameState, pile: bytearray) -> None:
+    h = stock_hash(state)
+    state.stock.insert(0, pile)
+    n = len(state.stock)
+    state.stock_meta = (state.stock, n, h ^ round_hash(pile, n - 1))
+
+def _column_hashes(state: GameState) -> List[int]:
+    hs = state.hashes
+    cols = state.columns
+    if hs is not None and len(state.meta) == len(cols):
+        for m, col in zip(state.meta, cols):
+            if m.column is not col or m.length != len(col):
+                break
+        else:
+            return hs
+    total = pos = 0
+    for i in range(len(cols)):
+        mix = column_meta(state, i).mix
+        total += mix
+        pos ^= mix * (COLUMN[i & 15] | 1) & MASK64
+    hs = state.hashes = [total & MASK64, pos]
+    return hs
+
+def position_hash(state: GameState) -> int:
+    """Hash Zobrist a 64 bit della posizione (colonne nell'ordine, stock, fondazioni).
+    Gli hash di colonna e stock sono mantenuti da `actions`: qui si combinano 3 valori."""
+    return FOUNDATIONS[state.foundations & 15] ^ stock_hash(state) ^ _column_hashes(state)[1]
+
+def canonical_hash(state: GameState) -> int:
+    """Come `position_hash`, ma a stock vuoto le colonne sono interscambiabili: due posizioni
+    che differiscono solo per una permutazione delle colonne hanno lo stesso hash.
+    (Con lo stock non vuoto l'ordine conta, perché il deal dà la carta i alla colonna i.)"""
+    if state.stock:
+        return position_hash(state)
+    return _column_hashes(state)[0] ^ FOUNDATIONS[state.foundations & 15]
+
+def canonical_hash_after(state: GameState, src: int, start: int, dst: int) -> Optional[int]:
+    """`canonical_hash` della posizione dopo la mossa legale (src, start, dst), senza eseguirla:
+    la ricerca scarta così le trasposizioni senza apply/revert. None per un deal o se la mossa
+    può completare una sequenza (cambiano fondazioni e colonne): allora va eseguita."""
+    if src == DEAL:
+        return None
+    hs = _column_hashes(state)
+    smeta = state.meta[src]
+    dmeta = state.meta[dst]
+    scol = state.columns[src]
+    if dmeta.tail_len + len(scol) - start >= 13:
+        return None
+    hs_src = smeta.prefix[start]
+    if start and not scol[start - 1] & FACE_UP:
+        c = scol[start - 1]
+        hs_src ^= card_key(start - 1, c) ^ card_key(start - 1, c | FACE_UP)
+    hs_dst = dmeta.zhash
+    pos = dmeta.length - start
+    for k in range(start, len(scol)):
+        hs_dst ^= card_key(pos + k, scol[k])
+    mix_src = mix64(hs_src)
+    mix_dst = mix64(hs_dst)
+    if state.stock:
+        ks = COLUMN[src & 15] | 1
+        kd = COLUMN[dst & 15] | 1
+        h = hs[1] ^ (smeta.mix * ks ^ mix_src * ks ^ dmeta.mix * kd ^ mix_dst * kd) & MASK64
+        return FOUNDATIONS[state.foundations & 15] ^ stock_hash(state) ^ h
+    h = hs[0] - smeta.mix - dmeta.mix + mix_src + mix_dst
+    return (h & MASK64) ^ FOUNDATIONS[state.foundations & 15]
 
-def snapshot(state: GameState) -> Tuple:
-    cols = [[Card(c.rank, c.suit, c.face_up) for c in col] for col in state.columns]
-    stock = [[Card(c.rank, c.suit, c.face_up) for c in pile] for pile in state.stock]
-    return (cols, stock, state.foundations, state.moves)
-
-def restore(state: GameState, snap: Tuple) -> None:
-    cols, stock, foundations, moves = snap
-    state.columns = [[Card(c.rank, c.suit, c.face_up) for c in col] for col in cols]
-    state.stock = [[Card(c.rank, c.suit, c.face_up) for c in pile] for pile in stock]
-    state.foundations = foundations
-    state.moves = moves
+def clone(state: GameState) -> GameState:
+    """Copia indipendente di colonne, stock e contatori (senza history/future)."""
+    s = GameState()
+    s.columns = [bytearray(col) for col in state.columns]
+    s.stock = [bytearray(pile) for pile in state.stock]
+    s.foundations = state.foundations
+    s.moves = state.moves
+    s.score = state.score
+    s.seed = state.seed
+    return s
@@ -0,0 +1,29 @@
+from random import Random
+from typing import List
+
+# Tabelle Zobrist deterministiche (stesso seme in ogni processo: gli hash sono confrontabili
+# tra worker, file e sessioni diverse).
+MAX_DEPTH = 128
+CODES = 0xC0     # codici carta possibili (cards.encode: il massimo è 0x80 | 3 << 4 | 13 = 0xBD)
+MASK64 = (1 << 64) - 1
+
+_rng = Random(0x5B1DE2)
+
+def _keys(n: int) -> List[int]:
+    # una sola randbytes invece di n getrandbits: la tabella si costruisce a ogni import
+    return memoryview(_rng.randbytes(n * 8)).cast("Q").tolist()
+
+CARD: List[List[int]] = [_keys(CODES) for _ in range(MAX_DEPTH)]
+COLUMN: List[int] = _keys(16)
+ROUND: List[int] = _keys(16)
+FOUNDATIONS: List[int] = _keys(16)
+del _rng
+
+def card_key(pos: int, code: int) -> int:
+    return CARD[pos & (MAX_DEPTH - 1)][code]
+
+def mix64(h: int) -> int:
+    """Finalizzatore splitmix64: rende indipendenti hash che differiscono per pochi bit."""
+    h = (h ^ (h >> 30)) * 0xBF58476D1CE4E5B9 & MASK64
+    h = (h ^ (h >> 27)) * 0x94D049BB133111EB & MASK64
+    return h ^ (h >> 31)
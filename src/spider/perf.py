@@ -0,0 +1,157 @@
+import json
+import sys
+from functools import wraps
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .game.state import GameState
+
+# Strumentazione opzionale: `install` sostituisce le funzioni indicate con versioni
+# cronometrate che registrano conteggio e istogramma delle latenze in RECORDER.
+# Senza `install` il codice gira senza alcun costo aggiuntivo.
+
+BUCKETS = 32  # bucket i: latenze in [2^(i-1), 2^i) µs (0 = sotto 1 µs)
+
+class Histogram:
+    __slots__ = ("count", "total", "max", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * BUCKETS
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(BUCKETS - 1, int(seconds * 1e6).bit_length())] += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Limite superiore (secondi) del bucket che contiene il quantile q (0..1)."""
+        if not self.count:
+            return 0.0
+        need = q * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= need:
+                return min(self.max, (1 << i) / 1e6)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1e3,
+            "mean_us": self.mean * 1e6,
+            "p50_us": self.percentile(0.50) * 1e6,
+            "p95_us": self.percentile(0.95) * 1e6,
+            "p99_us": self.percentile(0.99) * 1e6,
+            "max_us": self.max * 1e6,
+            "buckets": self.buckets,
+        }
+
+class Recorder:
+    def __init__(self) -> None:
+        self.ops: Dict[str, Histogram] = {}
+
+    def histogram(self, name: str) -> Histogram:
+        h = self.ops.get(name)
+        if h is None:
+            h = self.ops[name] = Histogram()
+        return h
+
+    def reset(self) -> None:
+        self.ops.clear()
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {name: h.to_dict() for name, h in sorted(self.ops.items())}
+
+RECORDER = Recorder()
+
+Target = Tuple[Any, str]  # (modulo o classe, nome dell'attributo)
+_installed: List[Tuple[Any, str, Callable]] = []
+
+def _label(owner: Any, attr: str) -> str:
+    name = getattr(owner, "__name__", type(owner).__name__)
+    return f"{name.rsplit('.', 1)[-1]}.{attr}"
+
+def _timed(fn: Callable, hist: Histogram) -> Callable:
+    @wraps(fn)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        t0 = perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            hist.add(perf_counter() - t0)
+    return timed
+
+def install(targets: Sequence[Target], recorder: Recorder = RECORDER) -> None:
+    """Cronometra ogni `owner.attr` (una volta sola, anche se ripetuto)."""
+    done = {(id(o), a) for o, a, _ in _installed}
+    for owner, attr in targets:
+        if (id(owner), attr) in done:
+            continue
+        fn = getattr(owner, attr)
+        setattr(owner, attr, _timed(fn, recorder.histogram(_label(owner, attr))))
+        _installed.append((owner, attr, fn))
+        done.add((id(owner), attr))
+
+def uninstall() -> None:
+    """Ripristina le funzioni originali."""
+    while _installed:
+        owner, attr, fn = _installed.pop()
+        if isinstance(owner, type) and fn is getattr(super(owner, owner), attr, None):
+            delattr(owner, attr)  # era ereditata: basta togliere il wrapper
+        else:
+            setattr(owner, attr, fn)
+
+def installed() -> bool:
+    return bool(_installed)
+
+def engine_targets() -> List[Target]:
+    from .game import actions
+    from .game.journal import Journal
+    return [
+        (actions, "move"), (actions, "deal"), (actions, "undo"), (actions, "redo"),
+        (actions, "search_hint"), (Journal, "sync"),
+    ]
+
+# ---------------------- memoria della history ----------------------
+
+def history_bytes(state: GameState) -> Dict[str, int]:
+    """Record e byte (sys.getsizeof, carte completate incluse) di history e future."""
+    size = sys.getsizeof
+    total = size(state.history) + size(state.future)
+    for stack in (state.history, state.future):
+        for m in stack:
+            total += size(m)
+            if m.completed:
+                total += size(m.completed)
+                for rec in m.completed:
+                    total += size(rec) + size(rec[2])
+    return {"history": len(state.history), "future": len(state.future), "bytes": total}
+
+# ---------------------- report ----------------------
+
+def format_table(recorder: Recorder = RECORDER) -> str:
+    lines = [f"{'op':<28}{'n':>7}{'mean':>9}{'p95':>9}{'max':>9}  (µs)"]
+    for name, h in sorted(recorder.ops.items()):
+        lines.append(
+            f"{name:<28}{h.count:>7}{h.mean * 1e6:>9.0f}{h.percentile(0.95) * 1e6:>9.0f}{h.max * 1e6:>9.0f}"
+        )
+    return "\n".join(lines)
+
+def dump(path: Path, state: Optional[GameState] = None, recorder: Recorder = RECORDER, **extra: Any) -> None:
+    """Scrive in JSON istogrammi, memoria della history (se c'è `state`) e campi extra."""
+    data: Dict[str, Any] = {"ops": recorder.report()}
+    if state is not None:
+        data["memory"] = history_bytes(state)
+    data.update(extra)
+    path.write_text(json.dumps(data, indent=2) + "\n")
@@ -0,0 +1,257 @@
+import asyncio
+import json
+import math
+import secrets
+from dataclasses import dataclass, field
+from random import randrange
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .game import actions, cache
+from .game.deals import new_deal
+from .game.state import GameState
+from .stream import DiffStream, public_code
+
+# Server asyncio con protocollo JSON-lines: ogni riga è una richiesta
+#   {"op": "...", "session": "...", "id": ...}
+# e riceve una riga di risposta {"ok": true|false, "id": ..., ...}. Le sessioni sono
+# partite indipendenti; le richieste sulla stessa sessione sono serializzate da un lock,
+# quelle su sessioni diverse procedono in parallelo.
+#
+#   new    {"seed"?}                  -> {"session", "state"}
+#   move   {"src", "start", "dst"}    -> {"moved", "state"}
+#   deal / undo / redo                -> {"done", "state"}
+#   hint   {"budget_ms"?}             -> {"move": [src, start, dst] | null, "depth"}
+#   state                             -> {"state"}
+#   watch                             -> {"keyframe"}, poi righe {"event": "diff", ...}
+#   unwatch / close                   -> {}
+#
+# Chi fa `watch` riceve sulla stessa connessione un messaggio di stream.DiffStream dopo
+# ogni azione che cambia la partita (spettatori, client remoti).
+
+MAX_LINE = 1 << 16
+MAX_HINT_MS = 2000
+
+class RequestError(Exception):
+    pass
+
+@dataclass
+class Session:
+    id: str
+    state: GameState
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_used: float = field(default_factory=monotonic)
+    stream: Optional[DiffStream] = None
+    watchers: List[asyncio.StreamWriter] = field(default_factory=list)
+
+    def publish(self) -> None:
+        """Invia agli spettatori le differenze dall'ultima pubblicazione."""
+        if self.stream is None:
+            return
+        msg = self.stream.update()
+        if msg is None:
+            return
+        line = json.dumps({"event": "diff", "session": self.id, **msg}, separators=(",", ":")).encode() + b"\n"
+        for w in list(self.watchers):
+            if w.is_closing():
+                self.watchers.remove(w)
+            else:
+                w.write(line)
+
+def public_state(state: GameState) -> Dict[str, Any]:
+    """Stato visibile al giocatore: codici carta (cards.encode), 0 per le carte coperte.
+
+    Il seme della distribuzione compare solo a partita vinta: con new_deal(seed) il
+    client ricostruirebbe tutte le carte coperte.
+    """
+    won = actions.is_win(state)
+    out = {
+        "columns": [[public_code(c) for c in col] for col in state.columns],
+        "stock": len(state.stock),
+        "foundations": state.foundations,
+        "moves": state.moves,
+        "score": state.score,
+        "won": won,
+    }
+    if won:
+        out["seed"] = state.seed
+    return out
+
+def _int(req: Dict[str, Any], key: str) -> int:
+    v = req.get(key)
+    if not isinstance(v, int) or isinstance(v, bool):
+        raise RequestError(f"{key!r} must be an integer")
+    return v
+
+def _str(req: Dict[str, Any], key: str) -> str:
+    v = req.get(key)
+    if not isinstance(v, str):
+        raise RequestError(f"{key!r} must be a string")
+    return v
+
+class GameServer:
+    """Sessioni di gioco in memoria, con eviction di quelle inattive da `idle_timeout` secondi."""
+
+    def __init__(self, idle_timeout: float = 600.0, max_sessions: int = 10_000) -> None:
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions: Dict[str, Session] = {}
+        self._ops: Dict[str, Callable[[Session, Dict[str, Any]], Awaitable[Dict[str, Any]]]] = {
+            "move": self._move,
+            "deal": self._simple(actions.deal),
+            "undo": self._simple(actions.undo),
+            "redo": self._simple(actions.redo),
+            "hint": self._hint,
+            "state": self._state,
+        }
+
+    # ---------- sessioni ----------
+    def new_session(self, seed: Optional[int] = None) -> Session:
+        if len(self.sessions) >= self.max_sessions and not self.evict(lru=True):
+            raise RequestError("too many sessions")
+        sid = secrets.token_hex(8)
+        s = Session(sid, new_deal(randrange(2**32) if seed is None else seed))
+        self.sessions[sid] = s
+        return s
+
+    def evict(self, now: Optional[float] = None, lru: bool = False) -> List[str]:
+        """Rimuove le sessioni inattive (non bloccate); con `lru` almeno la meno usata."""
+        now = monotonic() if now is None else now
+        idle = [s for s in self.sessions.values() if not s.lock.locked()]
+        gone = [s.id for s in idle if now - s.last_used >= self.idle_timeout]
+        if lru and not gone and idle:
+            gone = [min(idle, key=lambda s: s.last_used).id]
+        for sid in gone:
+            del self.sessions[sid]
+        return gone
+
+    # ---------- richieste ----------
+    async def handle(self, req: Any, conn: Optional[asyncio.StreamWriter] = None) -> Dict[str, Any]:
+        """Esegue una richiesta; `conn` è la connessione che la invia (serve a `watch`)."""
+        rid = req.get("id") if isinstance(req, dict) else None
+        try:
+            if not isinstance(req, dict):
+                raise RequestError("request must be a JSON object")
+            out = await self._dispatch(req, conn)
+            out["ok"] = True
+        except RequestError as e:
+            out = {"ok": False, "error": str(e)}
+        except Exception as e:  # un bug su una richiesta non deve chiudere la connessione
+            out = {"ok": False, "error": f"internal error: {type(e).__name__}"}
+        if rid is not None:
+            out["id"] = rid
+        return out
+
+    async def _dispatch(self, req: Dict[str, Any], conn: Optional[asyncio.StreamWriter]) -> Dict[str, Any]:
+        op = _str(req, "op")
+        if op == "new":
+            seed = req.get("seed")
+            if seed is not None:
+                seed = _int(req, "seed")
+            s = self.new_session(seed)
+            return {"session": s.id, "state": public_state(s.state)}
+        fn = self._ops.get(op)
+        if fn is None and op not in ("watch", "unwatch", "close"):
+            raise RequestError(f"unknown op {op!r}")
+        sess = self.sessions.get(_str(req, "session"))
+        if op == "close":
+            if sess is not None:
+                self.sessions.pop(sess.id, None)
+            return {}
+        if sess is None:
+            raise RequestError("unknown session")
+        async with sess.lock:
+            sess.last_used = monotonic()
+            if op == "watch":
+                return self._watch(sess, conn)
+            if op == "unwatch":
+                if conn in sess.watchers:
+                    sess.watchers.remove(conn)  # type: ignore[arg-type]
+                return {}
+            out = await fn(sess, req)  # type: ignore[misc]
+            sess.publish()
+            return out
+
+    def _watch(self, sess: Session, conn: Optional[asyncio.StreamWriter]) -> Dict[str, Any]:
+        if conn is None:
+            raise RequestError("watch needs a connection")
+        if sess.stream is None:
+            sess.stream = DiffStream(sess.state)
+        else:
+            sess.publish()  # i vecchi spettatori ricevono le modifiche prima del keyframe
+        if conn not in sess.watchers:
+            sess.watchers.append(conn)
+        return {"keyframe": sess.stream.keyframe()}
+
+    async def _move(self, sess: Session, req: Dict[str, Any]) -> Dict[str, Any]:
+        moved = actions.move(sess.state, _int(req, "src"), _int(req, "start"), _int(req, "dst"))
+        return {"moved": moved, "state": public_state(sess.state)}
+
+    @staticmethod
+    def _simple(fn: Callable[[GameState], bool]) -> Callable[[Session, Dict[str, Any]], Awaitable[Dict[str, Any]]]:
+        async def op(sess: Session, req: Dict[str, Any]) -> Dict[str, Any]:
+            return {"done": fn(sess.state), "state": public_state(sess.state)}
+        return op
+
+    async def _hint(self, sess: Session, req: Dict[str, Any]) -> Dict[str, Any]:
+        budget = req.get("budget_ms", 100)
+        if (not isinstance(budget, (int, float)) or isinstance(budget, bool)
+                or not math.isfinite(budget) or budget <= 0):
+            raise RequestError("'budget_ms' must be a positive number")
+        # in un thread: la ricerca non blocca le altre sessioni (il lock tiene ferma questa)
+        res = await asyncio.to_thread(cache.search_hint, sess.state, min(budget, MAX_HINT_MS))
+        return {"move": list(res.move) if res.move else None, "depth": res.depth}
+
+    async def _state(self, sess: Session, req: Dict[str, Any]) -> Dict[str, Any]:
+        return {"state": public_state(sess.state)}
+
+    # ---------- rete ----------
+    async def client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # riga oltre MAX_LINE
+                    writer.write(b'{"ok": false, "error": "line too long"}\n')
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    req = json.loads(line)
+                except ValueError:
+                    resp: Dict[str, Any] = {"ok": False, "error": "invalid JSON"}
+                else:
+                    resp = await self.handle(req, writer)
+                writer.write(json.dumps(resp, separators=(",", ":")).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for sess in self.sessions.values():
+                if writer in sess.watchers:
+                    sess.watchers.remove(writer)
+            writer.close()
+
+    async def evict_forever(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 4))
+            self.evict()
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 7788, path: Optional[str] = None,
+    ) -> asyncio.AbstractServer:
+        """Apre il socket (Unix se c'è `path`, altrimenti TCP) senza bloccare."""
+        if path is not None:
+            return await asyncio.start_unix_server(self.client, path, limit=MAX_LINE)
+        return await asyncio.start_server(self.client, host, port, limit=MAX_LINE)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 7788, path: Optional[str] = None) -> None:
+        server = await self.start(host, port, path)
+        evictor = asyncio.create_task(self.evict_forever())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+from dataclasses import asdict, dataclass
+from multiprocessing import Pool
+from random import Random
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from .game import actions
+from .game.deals import new_deal
+from .game.state import GameState, position_hash
+
+Policy = Callable[[GameState, Random], Optional[Tuple[int, int, int]]]
+
+def hint_policy(state: GameState, rng: Random) -> Optional[Tuple[int, int, int]]:
+    """L'euristica di `actions.hint` (quella di auto_move_one)."""
+    return actions.hint(state)
+
+def random_policy(state: GameState, rng: Random) -> Optional[Tuple[int, int, int]]:
+    moves = actions.list_legal_moves(state)
+    return rng.choice(moves) if moves else None
+
+POLICIES: Dict[str, Policy] = {
+    "hint": hint_policy,
+    "random": random_policy,
+}
+
+@dataclass
+class GameResult:
+    seed: int
+    won: bool
+    moves: int
+    foundations: int
+    reason: str
+    elapsed: float
+
+def play_game(seed: int, policy: str = "hint", max_moves: int = 1000) -> GameResult:
+    """Gioca la partita `seed` fino a vittoria, blocco o `max_moves` azioni.
+
+    Se la mossa scelta riporta a una posizione già vista (la policy gira in tondo) o non
+    c'è mossa, si distribuisce dallo stock; se neanche quello è possibile la partita finisce.
+    """
+    t0 = perf_counter()
+    pick = POLICIES[policy]
+    rng = Random(seed)
+    state = new_deal(seed)
+    seen = {position_hash(state)}
+    reason = "max_moves"
+    while state.moves < max_moves:
+        if actions.is_win(state):
+            reason = "won"
+            break
+        mv = pick(state, rng)
+        if mv is not None:
+            actions.move(state, *mv)
+            h = position_hash(state)
+            if h not in seen:
+                seen.add(h)
+                continue
+            actions.undo(state)
+        if not actions.deal(state):
+            reason = "stuck"
+            break
+        seen.add(position_hash(state))
+    return GameResult(seed, actions.is_win(state), state.moves, state.foundations, reason, perf_counter() - t0)
+
+def _play(args: Tuple[int, str, int]) -> GameResult:
+    return play_game(*args)
+
+def run(
+    seeds: Iterable[int],
+    policy: str = "hint",
+    workers: Optional[int] = None,
+    max_moves: int = 1000,
+) -> List[GameResult]:
+    jobs = [(seed, policy, max_moves) for seed in seeds]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [_play(j) for j in jobs]
+    with Pool(workers) as pool:
+        return list(pool.imap_unordered(_play, jobs, chunksize=max(1, len(jobs) // (workers * 8))))
+
+def summarize(results: List[GameResult], wall: float) -> Dict[str, float]:
+    n = len(results) or 1
+    return {
+        "games": len(results),
+        "win_rate": sum(r.won for r in results) / n,
+        "avg_moves": sum(r.moves for r in results) / n,
+        "avg_foundations": sum(r.foundations for r in results) / n,
+        "games_per_sec": len(results) / wall if wall > 0 else 0.0,
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    p = argparse.ArgumentParser(prog="spider-sim", description="Self-play headless su partite con seed.")
+    p.add_argument("-n", "--games", type=int, default=100)
+    p.add_argument("--seed-start", type=int, default=0)
+    p.add_argument("--policy", choices=sorted(POLICIES), default="hint")
+    p.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1)
+    p.add_argument("--max-moves", type=int, default=1000)
+    p.add_argument("--json", action="store_true", help="stampa riepilogo e risultati in JSON")
+    args = p.parse_args(argv)
+
+    t0 = perf_counter()
+    results = run(range(args.seed_start, args.seed_start + args.games), args.policy, args.workers, args.max_moves)
+    stats = summarize(results, perf_counter() - t0)
+    if args.json:
+        print(json.dumps({"summary": stats, "games": [asdict(r) for r in sorted(results, key=lambda r: r.seed)]}))
+        return
+    print(f"games={stats['games']}  policy={args.policy}  workers={args.workers}")
+    print(f"win rate     {stats['win_rate']:.1%}")
+    print(f"avg moves    {stats['avg_moves']:.1f}")
+    print(f"avg complete {stats['avg_foundations']:.2f}")
+    print(f"games/sec    {stats['games_per_sec']:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+from typing import Any, Dict, List, Optional
+
+from .game.cards import FACE_UP
+from .game.state import GameState, column_meta
+
+# Stream di differenze per spettatori e client remoti. Dopo ogni azione `DiffStream.update`
+# produce un messaggio con solo le colonne cambiate, ognuna come (indice, carte tenute,
+# codici aggiunti): una mossa costa la run spostata più l'eventuale carta girata, non il
+# tavolo. Contatori come delta. Ogni messaggio ha un numero di sequenza; un keyframe
+# (tavolo completo) ogni `keyframe_every` messaggi, o su richiesta, riallinea chi entra
+# tardi o ha perso un messaggio.
+#
+#   keyframe: {"seq", "key": 1, "cols": [[codici]...], "stock", "f", "score", "moves"}
+#   diff:     {"seq", "cols": [[i, keep, [codici]]...], "stock"?, "f"?, "score"?, "moves"?}
+
+COUNTERS = ("stock", "f", "score", "moves")
+
+def public_code(code: int) -> int:
+    """Codice visibile a chi guarda: il codice carta per le scoperte, 0 per le coperte."""
+    return code if code & FACE_UP else 0
+
+def _counters(state: GameState) -> Dict[str, int]:
+    return {"stock": len(state.stock), "f": state.foundations, "score": state.score, "moves": state.moves}
+
+class DiffStream:
+    def __init__(self, state: GameState, keyframe_every: int = 100) -> None:
+        self.state = state
+        self.keyframe_every = keyframe_every
+        self.seq = 0
+        self._since_key = 0
+        self._sync()
+
+    def _sync(self) -> None:
+        s = self.state
+        self._cols: List[List[int]] = [[public_code(c) for c in col] for col in s.columns]
+        self._hashes = [column_meta(s, i).zhash for i in range(len(s.columns))]
+        self._counts = _counters(s)
+
+    def keyframe(self) -> Dict[str, Any]:
+        """Tavolo completo con il numero di sequenza corrente (non lo incrementa)."""
+        self._sync()
+        return {"seq": self.seq, "key": 1, "cols": [list(c) for c in self._cols], **self._counts}
+
+    def update(self) -> Optional[Dict[str, Any]]:
+        """Messaggio per le modifiche dall'ultimo update (None se non è cambiato nulla).
+        Le colonne cambiate si riconoscono dall'hash Zobrist, senza confrontare carte."""
+        s = self.state
+        cols: List[List[Any]] = []
+        for i, col in enumerate(s.columns):
+            h = column_meta(s, i).zhash
+            if h == self._hashes[i]:
+                continue
+            self._hashes[i] = h
+            old = self._cols[i]
+            new = [public_code(c) for c in col]
+            keep = 0
+            n = min(len(old), len(new))
+            while keep < n and old[keep] == new[keep]:
+                keep += 1
+            cols.append([i, keep, new[keep:]])
+            self._cols[i] = new
+        counts = _counters(s)
+        deltas = {k: counts[k] - self._counts[k] for k in COUNTERS if counts[k] != self._counts[k]}
+        self._counts = counts
+        if not cols and not deltas:
+            return None
+        self.seq += 1
+        self._since_key += 1
+        if self.keyframe_every and self._since_key >= self.keyframe_every:
+            self._since_key = 0
+            return self.keyframe()
+        return {"seq": self.seq, "cols": cols, **deltas}
+
+class DiffView:
+    """Lato client: ricostruisce il tavolo dai messaggi. Se manca un numero di sequenza
+    ignora tutto fino al prossimo keyframe (`synced` resta False nel frattempo)."""
+
+    def __init__(self) -> None:
+        self.seq = -1
+        self.synced = False
+        self.cols: List[List[int]] = []
+        self.counts: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+
+    def feed(self, msg: Dict[str, Any]) -> bool:
+        if msg.get("key"):
+            self.cols = [list(c) for c in msg["cols"]]
+            self.counts = {k: msg[k] for k in COUNTERS}
+            self.seq = msg["seq"]
+            self.synced = True
+            return True
+        if not self.synced or msg["seq"] != self.seq + 1:
+            self.synced = False
+            return False
+        for i, keep, add in msg["cols"]:
+            col = self.cols[i]
+            del col[keep:]
+            col.extend(add)
+        for k in COUNTERS:
+            self.counts[k] += msg.get(k, 0)
+        self.seq = msg["seq"]
+        return True
@@ -1,4 +1,4 @@
-from .app import SpiderApp
+from .app import main
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,25 +1,42 @@
 from __future__ import annotations
 
-from random import shuffle
+from bisect import bisect_right
+from functools import partial
+import sys
+from pathlib import Path
+from random import randrange
 from time import time
 from typing import List, Optional, Tuple
 
+from rich.segment import Segment
+from rich.style import Style
 from rich.text import Text
 from textual import on
 from textual.app import App, ComposeResult
 from textual.containers import Horizontal
 from textual.events import Click
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 from textual.widgets import Button, Footer, Header, Static
+from textual.worker import get_current_worker
 
-from ..game import actions, rules
-from ..game.cards import Card
-from ..game.state import GameState
+from .. import perf
+from ..game import actions, cache
+from ..game.archive import Archive
+from ..game.cards import FACE_UP, Card, decode
+from ..game.columns import ColumnMeta
+from ..game.deals import new_deal
+from ..game.journal import Journal, recover
+from ..game.state import DIRTY_FOUNDATIONS, DIRTY_STOCK, GameState, clone, column_meta, take_dirty
+from .plain import RANK_LABELS
 
 
 # ---------------------- helpers & theme ----------------------
 
-RANK_LABELS = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K")
 TAIL_COLOR = "#2f579c"  # colore per la run ordinata in coda
+HINT_BUDGET_MS = 300       # tempo massimo per un hint [h]
+ANALYSIS_BUDGET_MS = 1500  # tempo per l'analisi continua del pannello [a]
 
 def fmt_mmss(seconds: int) -> str:
     m, s = divmod(max(0, int(seconds)), 60)
@@ -43,107 +60,82 @@ def suit_of(c: Card) -> str:
 def base_style_for(c: Card) -> str:
     return "bold #eaeaea on #1f1f1f" if c.face_up else "dim"
 
+# stati di evidenziazione di una riga di colonna
+NORMAL, TAIL, FULL, BLOCKED, SELECTED = range(5)
+
+def _card_segment(code: int, state: int) -> Segment:
+    c = decode(code)
+    label = (RANK_LABELS[c.rank - 1] + suit_of(c)) if c.face_up and 1 <= c.rank <= 13 else "■"
+    style = base_style_for(c)
+    if state == TAIL and c.face_up:
+        style = f"bold #ffffff on {TAIL_COLOR}"
+    elif state == FULL:
+        style = "bold #d9ffd9 on #0f3d0f"
+    elif state == BLOCKED and c.face_up:
+        style = "bold #e0e0e0 on #2a2a2a"  # un po' più chiaro del bg normale
+    elif state == SELECTED:
+        style = "reverse"
+    return Segment(f" {label} ", Style.parse(style))
+
+# CARD_SEGMENTS[stato][codice carta]: tutte le combinazioni rank/seme/scoperta/stato
+CARD_SEGMENTS: Tuple[Tuple[Segment, ...], ...] = tuple(
+    tuple(_card_segment(code, state) for code in range(256)) for state in range(SELECTED + 1)
+)
+EMPTY_SEGMENT = Segment("[ ]", Style.parse("dim"))
+BLANK_STRIP = Strip([])
+
 
 # ---------------------- widgets ----------------------
 
-class ColumnWidget(Static):
-    """Colonna di carte (1 riga = 1 carta)."""
+class ColumnWidget(ScrollView):
+    """Colonna di carte (1 riga = 1 carta), disegnata con la line API: a ogni paint
+    vengono prodotte solo le righe visibili, prendendo i segmenti da CARD_SEGMENTS."""
 
     def __init__(self, idx: int):
         super().__init__(id=f"col{idx}", classes="col")
         self.idx = idx
         self.sel_from: Optional[int] = None
 
-    def render(self) -> Text:
+    def update_rows(self) -> None:
+        """Allinea l'altezza virtuale al numero di carte e ridisegna."""
+        app: SpiderApp = self.app  # type: ignore
+        self.virtual_size = Size(0, max(1, len(app.state.columns[self.idx])))
+        self.refresh()
+
+    def row_state(self, meta: ColumnMeta, i: int, face_up: bool) -> int:
+        """Evidenziazione della carta i: O(log run bloccate), senza scandire la colonna."""
+        # selezione (vince su tutto)
+        if self.sel_from is not None and i >= self.sel_from:
+            return SELECTED
+        # sequenza completa (verde)
+        full_start = meta.full_start
+        if full_start is not None and i >= full_start:
+            return FULL
+        if face_up:
+            # tail movibile (blu)
+            if i >= meta.run_start:
+                return TAIL
+            # sottosequenza bloccata (grigio chiaro); blocked è ordinata per inizio
+            k = bisect_right(meta.blocked, (i, meta.length)) - 1
+            if k >= 0 and meta.blocked[k][1] >= i:
+                return BLOCKED
+        return NORMAL
+
+    def row_segment(self, i: int) -> Optional[Segment]:
+        """Segmento della riga i della colonna (None oltre l'ultima carta)."""
         app: SpiderApp = self.app  # type: ignore
         col = app.state.columns[self.idx]
-        t = Text()
-
         if not col:
-            t.append("[ ]", style="dim")
-            return t
-
-         # --- tail discendente in coda (movibile) ---
-        run_start = len(col)
-        if col and col[-1].face_up:
-            i = len(col) - 1
-            while i > 0:
-                a, b = col[i - 1], col[i]
-                if a.face_up and b.face_up and a.rank == b.rank + 1:
-                    i -= 1
-                else:
-                    break
-            run_start = i
-
-        # --- sequenza completa K→A in coda (verde) ---
-        full_start: Optional[int] = None
-        if len(col) - run_start >= 13:
-            window = col[-13:]
-            ok = all(c.face_up for c in window) and all(
-                window[k].rank == 13 - k for k in range(13)
-            )
-            if ok:
-                full_start = len(col) - 13
-
-        # --- sottosequenze bloccate (grigio) ---
-        blocked_ranges: list[tuple[int, int]] = []
-        n = len(col)
-        i = 0
-        while i < n - 1:
-            # inizio potenziale run
-            if (
-                col[i].face_up and col[i + 1].face_up
-                and col[i].rank == col[i + 1].rank + 1
-            ):
-                start = i
-                j = i + 1
-                while (
-                    j < n - 1
-                    and col[j].face_up and col[j + 1].face_up
-                    and col[j].rank == col[j + 1].rank + 1
-                ):
-                    j += 1
-                # segment [start..j]; è "bloccata" se NON arriva in fondo
-                if j < n - 1 and (j - start + 1) >= 2:
-                    blocked_ranges.append((start, j))
-                i = j + 1
-            else:
-                i += 1
-
-        def is_blocked_index(k: int) -> bool:
-            return any(a <= k <= b for (a, b) in blocked_ranges)
-
-        # --- rendering ---
-        for i, c in enumerate(col):
-            label = (RANK_LABELS[c.rank - 1] + suit_of(c)) if c.face_up else "■"
-            style = base_style_for(c)
-
-            # tail movibile (blu)
-            if c.face_up and i >= run_start:
-                style = f"bold #ffffff on {TAIL_COLOR}"
-
-            # sequenza completa (verde)
-            if full_start is not None and i >= full_start:
-                style = "bold #d9ffd9 on #0f3d0f"
-
-            # sottosequenza bloccata (grigio chiaro) — solo se NON tail/green
-            if (
-                c.face_up
-                and is_blocked_index(i)
-                and not (i >= run_start)
-                and not (full_start is not None and i >= full_start)
-            ):
-                style = "bold #e0e0e0 on #2a2a2a"  # un po' più chiaro del bg normale
-
-            # selezione (vince su tutto)
-            if self.sel_from is not None and i >= self.sel_from:
-                style = "reverse"
-
-            t.append(f" {label} ", style=style)
-            if i < len(col) - 1:
-                t.append("\n")
+            return EMPTY_SEGMENT if i == 0 else None
+        if i >= len(col):
+            return None
+        code = col[i]
+        meta = column_meta(app.state, self.idx)
+        return CARD_SEGMENTS[self.row_state(meta, i, bool(code & FACE_UP))][code]
 
-        return t
+    def render_line(self, y: int) -> Strip:
+        seg = self.row_segment(y + int(self.scroll_offset.y))
+        return BLANK_STRIP if seg is None else Strip((seg,), seg.cell_length)
 
 
 class StockWidget(Static):
@@ -170,12 +162,20 @@ class SpiderApp(App):
         ("d", "deal", "Deal"),
         ("u", "undo", "Undo"),
         ("R", "redo", "Redo"),
+        ("h", "hint", "Hint"),
+        ("a", "toggle_analysis", "Analysis"),
+        ("p", "toggle_perf", "Perf"),
         ("q", "quit", "Quit"),
     ]
 
-    def __init__(self) -> None:
+    def __init__(self, journal_path: Optional[Path] = None, archive_path: Optional[Path] = None) -> None:
         super().__init__()
         self.state = GameState()
+        # journal append-only per il recupero dopo un crash (None = disattivato)
+        self.journal = Journal(journal_path)
+        # archivio SQLite delle partite concluse, opzionale (scrive in un thread suo)
+        self.archive = Archive(archive_path) if archive_path is not None else None
+        self._archived = False
         self.columns: List[ColumnWidget] = []
 
         # HUD
@@ -183,6 +183,12 @@ class SpiderApp(App):
         self.found = FoundWidget(id="found")
         self.hud_time = Static(id="hud_time")
         self.hud_msg = Static(id="hud_msg")
+        self.analysis = Static(id="analysis")
+        self.perf_overlay = Static(id="perf")
+
+        # hint/analisi in un worker thread: _analysis_gen scarta i risultati obsoleti
+        self._analysis_gen = 0
+        self._hint_dst: Optional[int] = None
 
         # selezione
         self.selected: Optional[Tuple[int, int]] = None  # (src_col_idx, start_index)
@@ -210,19 +216,56 @@ class SpiderApp(App):
                 colw = ColumnWidget(i)
                 self.columns.append(colw)
                 yield colw
+        yield self.analysis
+        yield self.perf_overlay
         yield Footer()
 
     # ---------- lifecycle & loop ----------
     def on_mount(self) -> None:
-        self.action_new_game()
+        self.analysis.display = False
+        self.perf_overlay.display = False
+        self.set_interval(1.0, self._update_perf)
+        if not self._resume_from_journal():
+            self.action_new_game()
         self._timer = self.set_interval(1.0, self._tick)
 
+    def _resume_from_journal(self) -> bool:
+        """Riprende l'ultima partita non conclusa registrata nel journal."""
+        if self.journal.path is None:
+            return False
+        found = recover(self.journal.path)
+        if found is None or actions.is_win(found.state):
+            return False
+        self.state = found.state
+        self.journal.resume(found)
+        self.t0 = time() - found.elapsed
+        self.last_move_ts = time()
+        self._refresh_all()
+        self.hud_msg.update(" Resumed ")
+        return True
+
     def _tick(self) -> None:
         if self.game_over:
             return
         dt = int(time() - self.t0)
         self.hud_time.update(f" ⏱ {fmt_mmss(dt)}  |  Score: {self.state.score} ")
 
+    def _update_perf(self) -> None:
+        """Overlay di debug [p]: latenze per operazione e memoria di history/future."""
+        if not self.perf_overlay.display:
+            return
+        if not perf.installed():
+            self.perf_overlay.update(" instrumentation off (run with --perf) ")
+            return
+        mem = perf.history_bytes(self.state)
+        c = cache.SHARED.stats()
+        self.perf_overlay.update(
+            perf.format_table()
+            + f"\nhistory {mem['history']}  future {mem['future']}  {mem['bytes'] / 1024:.1f} KiB"
+            + f"\ncache {c['entries']} entries  {c['bytes'] / 1024:.0f} KiB  "
+            f"hit {c['hits']}  miss {c['misses']}  evict {c['evictions']}"
+        )
+
     # ---------- victory ----------
     def _check_victory(self) -> None:
         """Se hai completato tutte le 8 fondazioni, chiudi la partita."""
@@ -234,6 +277,8 @@ class SpiderApp(App):
         dt = int(time() - self.t0)
         bonus = max(0, 1000 - dt)  # bonus finale: più veloce = più punti
         self.state.score += bonus
+        self.journal.checkpoint(self.state)
+        self.archive_game(won=True)
 
         # ferma il timer in modo compatibile con versioni diverse
         try:
@@ -255,40 +300,29 @@ class SpiderApp(App):
         self.hud_msg.update(f" 🎉 You won!  +{bonus} bonus ")
         self.hud_time.update(f" ⏱ {fmt_mmss(dt)}  |  Score: {self.state.score} ")
 
+    def archive_game(self, won: bool = False) -> None:
+        """Registra la partita corrente nell'archivio (una volta sola; ignorata se mai giocata)."""
+        if self.archive is None or self._archived or not self.state.moves:
+            return
+        self.archive.record_game(self.state, time() - self.t0, won)
+        self._archived = True
+
     # ---------- utils ----------
     def _new_game_setup(self) -> None:
-        deck: List[Card] = [Card(r) for _ in range(8) for r in range(1, 14)]  # 104 carte, 1 seme
-        shuffle(deck)
-
-        self.state.columns = [[] for _ in range(10)]
-        self.state.stock = []
-        self.state.foundations = 0
-        self.state.moves = 0
-        self.state.history.clear()
-        self.state.future.clear()
-        self.state.score = 0
-
-        # distribuzione iniziale (come Spider 1-suit)
-        for i in range(4):
-            for _ in range(6):
-                self.state.columns[i].append(deck.pop())
-        for i in range(4, 10):
-            for _ in range(5):
-                self.state.columns[i].append(deck.pop())
-        for i in range(10):
-            self.state.columns[i][-1].face_up = True
-
-        # 5 giri di deal (10 carte)
-        for _ in range(5):
-            self.state.stock.append([deck.pop() for _ in range(10)])
+        # distribuzione iniziale (come Spider 1-suit), riproducibile dal seed
+        self.state = new_deal(randrange(2**32))
+        self.journal.start(self.state)
+        self._archived = False
 
         # timer
         self.t0 = time()
         self.last_move_ts = self.t0
 
     def _refresh_all(self) -> None:
+        take_dirty(self.state)
+        self._position_changed()
         for c in self.columns:
-            c.refresh()
+            c.update_rows()
             try:
                 c.scroll_end(animate=False)
             except Exception:
@@ -301,6 +335,68 @@ class SpiderApp(App):
             self._tick()
         self._check_victory()
 
+    def _refresh_changed(self) -> None:
+        """Ridisegna solo le colonne (e stock/fondazioni) toccate dalle ultime azioni."""
+        self._position_changed()
+        for i in sorted(take_dirty(self.state)):
+            if i == DIRTY_STOCK:
+                self.stock.refresh()
+            elif i == DIRTY_FOUNDATIONS:
+                self.found.refresh()
+            elif 0 <= i < len(self.columns):
+                c = self.columns[i]
+                c.update_rows()
+                try:
+                    c.scroll_end(animate=False)
+                except Exception:
+                    pass
+
+        # aggiorna HUD e controlla vittoria
+        if not self.game_over:
+            self._tick()
+        self._check_victory()
+
+    # ---------- hint & analisi (worker thread) ----------
+    def _start_analysis(self, budget_ms: float, show_hint: bool) -> None:
+        """Analizza una copia dello stato in un worker thread (annulla l'analisi precedente)."""
+        work = partial(self._analyse, clone(self.state), self._analysis_gen, budget_ms, show_hint)
+        self.run_worker(work, name="analysis", group="analysis", exclusive=True, thread=True)
+
+    def _analyse(self, state: GameState, gen: int, budget_ms: float, show_hint: bool) -> None:
+        worker = get_current_worker()
+        res = cache.search_hint(state, budget_ms, cancel=lambda: worker.is_cancelled)
+        if not worker.is_cancelled:
+            self.call_from_thread(self._show_analysis, res, gen, show_hint)
+
+    def _show_analysis(self, res: actions.HintResult, gen: int, show_hint: bool) -> None:
+        if gen != self._analysis_gen:
+            return  # la posizione è cambiata nel frattempo
+        if show_hint:
+            if res.move is None:
+                self.hud_msg.update(" No hint ")
+            else:
+                src, _, dst = res.move
+                self._hint_dst = dst
+                self.columns[dst].add_class("-target")
+                self.hud_msg.update(f" Hint: {src + 1} → {dst + 1} ")
+        if self.analysis.display:
+            line = "  ".join(f"{a + 1}→{b + 1}" for a, _, b in res.line) or "-"
+            self.analysis.update(
+                f" depth {res.depth} · {res.nodes} nodes · {res.elapsed * 1000:.0f} ms · eval {res.value}\n"
+                f" line: {line}"
+            )
+
+    def _position_changed(self) -> None:
+        """Le analisi in corso sono obsolete: annullale (e riparti se il pannello è aperto)."""
+        self._analysis_gen += 1
+        self.workers.cancel_group(self, "analysis")
+        if self._hint_dst is not None:
+            self.columns[self._hint_dst].remove_class("-target")
+            self._hint_dst = None
+        if self.analysis.display and not self.game_over:
+            self.analysis.update(" analysing… ")
+            self._start_analysis(ANALYSIS_BUDGET_MS, False)
+
     def _hit_index(self, colw: ColumnWidget, y_click: int) -> int:
         """Converte la Y del click nell'indice di carta, considerando bordo/padding/scroll."""
         border_top = 1
@@ -318,10 +414,12 @@ class SpiderApp(App):
             src_idx, _ = self.selected
             self.columns[src_idx].sel_from = None
             self.columns[src_idx].remove_class("-selected")
+            self.columns[src_idx].refresh()
             self.selected = None
 
     # ---------- actions ----------
     def action_new_game(self) -> None:
+        self.archive_game()  # la partita in corso, se c'è, risulta abbandonata
         self._new_game_setup()
         self.game_over = False
 
@@ -348,7 +446,8 @@ class SpiderApp(App):
             return
         self._clear_selection()
         if actions.deal(self.state):
-            self._refresh_all()
+            self.journal.deal(self.state)
+            self._refresh_changed()
             self.hud_msg.update(" Deal ")
         else:
             self.hud_msg.update(" Can't deal ")
@@ -358,7 +457,8 @@ class SpiderApp(App):
             return
         self._clear_selection()
         if actions.undo(self.state):
-            self._refresh_all()
+            self.journal.undo(self.state)
+            self._refresh_changed()
             self.hud_msg.update(" Undo ")
         else:
             self.hud_msg.update(" Nothing to undo ")
@@ -368,11 +468,26 @@ class SpiderApp(App):
             return
         self._clear_selection()
         if actions.redo(self.state):
-            self._refresh_all()
+            self.journal.redo(self.state)
+            self._refresh_changed()
             self.hud_msg.update(" Redo ")
         else:
             self.hud_msg.update(" Nothing to redo ")
 
+    def action_hint(self) -> None:
+        if self.game_over:
+            return
+        self.hud_msg.update(" Thinking… ")
+        self._start_analysis(HINT_BUDGET_MS, True)
+
+    def action_toggle_analysis(self) -> None:
+        self.analysis.display = not self.analysis.display
+        self._position_changed()
+
+    def action_toggle_perf(self) -> None:
+        self.perf_overlay.display = not self.perf_overlay.display
+        self._update_perf()
+
     # ---------- UI events ----------
     @on(Button.Pressed, "#btn_new")
     def _btn_new(self) -> None:
@@ -395,7 +510,7 @@ class SpiderApp(App):
 
         # se non ho una selezione attiva, provo a selezionare una run da questa colonna
         if self.selected is None:
-            if col and rules.can_take_run(col, i):
+            if col and column_meta(self.state, colw.idx).run_start <= i:
                 colw.sel_from = i
                 colw.add_class("-selected")
                 self.selected = (colw.idx, i)
@@ -411,15 +526,69 @@ class SpiderApp(App):
             now = time()
             gained = points_for_move(now - self.last_move_ts)
             self.state.score += gained
+            self.journal.move(self.state, src_idx, start, colw.idx)
             self.last_move_ts = now
             self.hud_msg.update(f" +{gained} pts ")
             self._clear_selection()
-            self._refresh_all()
+            self._refresh_changed()
         else:
             self.hud_msg.update(" Invalid ")
             self._clear_selection()
-            self._refresh_all()
 
 
-def main() -> None:
-    SpiderApp().run()
\ No newline at end of file
+# operazioni della UI cronometrate con --perf (oltre a perf.engine_targets())
+PERF_TARGETS = [
+    (ColumnWidget, "render_lines"),
+    (SpiderApp, "_refresh_all"),
+    (SpiderApp, "_refresh_changed"),
+]
+
+def run(
+    perf_on: bool = False, profile: bool = False, perf_out: Path = Path("spider-perf.json"),
+    archive: Optional[Path] = None, journal: Optional[Path] = None,
+) -> None:
+    """Avvia la TUI; con `perf_on`/`profile` scrive il report in `perf_out` all'uscita,
+    con `archive` registra le partite concluse in quel database SQLite, con `journal`
+    registra la partita in corso per riprenderla al prossimo avvio."""
+    perf_on = perf_on or profile
+    if perf_on:
+        perf.install(perf.engine_targets() + PERF_TARGETS)
+    profiler = None
+    if profile:
+        import cProfile
+        import tracemalloc
+        tracemalloc.start()
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    app = SpiderApp(journal_path=journal, archive_path=archive)
+    try:
+        app.run()
+    finally:
+        if not app.game_over:
+            app.journal.checkpoint(app.state)  # il tempo di gioco sopravvive all'uscita
+        app.journal.close()
+        if app.archive is not None:
+            if not app.game_over:
+                app.archive_game()
+            app.archive.close()
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(perf_out.with_suffix(".prof"))
+        if perf_on:
+            extra = {}
+            if profile:
+                snap = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                extra["tracemalloc"] = {
+                    "current": current,
+                    "peak": peak,
+                    "top": [str(st) for st in snap.statistics("lineno")[:25]],
+                }
+                tracemalloc.stop()
+            perf.dump(perf_out, app.state, **extra)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Come `spider play` (le opzioni sono quelle della CLI)."""
+    from ..cli import main as cli_main
+    cli_main(["play", *(sys.argv[1:] if argv is None else argv)])
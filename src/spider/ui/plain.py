@@ -0,0 +1,114 @@
+from typing import List, Optional, TextIO
+
+from ..game import actions, cache
+from ..game.cards import FACE_UP, RANK_MASK, SUIT_MASK, SUIT_SHIFT, SUITS
+from ..game.state import GameState, column_meta
+
+# Renderer testuale (stdin/stdout) senza Textual: per terminali semplici, pipe e script.
+
+RANK_LABELS = ("A", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K")
+CELL = 5
+
+HELP = """comandi:
+  S D        sposta la run più lunga possibile dalla colonna S alla colonna D
+  S R D      sposta le carte dalla riga R della colonna S alla colonna D
+  d          distribuisce un giro dallo stock
+  u / r      undo / redo
+  h          hint
+  a [N]      autoplay per al massimo N azioni (default 1000)
+  m          hint Monte Carlo (non guarda le carte coperte) con probabilità di vittoria
+  q          esce"""
+
+def label(code: int) -> str:
+    if not code & FACE_UP:
+        return "##"
+    return RANK_LABELS[(code & RANK_MASK) - 1] + SUITS[(code & SUIT_MASK) >> SUIT_SHIFT]
+
+def render(state: GameState) -> str:
+    """Tavolo in colonne: una riga per profondità, colonne e righe numerate da 1."""
+    cols = state.columns
+    out: List[str] = ["    " + "".join(f"{i + 1:>{CELL}}" for i in range(len(cols)))]
+    for row in range(max((len(c) for c in cols), default=0)):
+        cells = []
+        for col in cols:
+            cells.append(f"{label(col[row]):>{CELL}}" if row < len(col) else " " * CELL)
+        out.append(f"{row + 1:>3} " + "".join(cells))
+    out.append(f"stock: {len(state.stock)}  completed: {state.foundations}/8  moves: {state.moves}")
+    return "\n".join(out)
+
+def move_longest(state: GameState, src: int, dst: int) -> bool:
+    """Sposta da `src` a `dst` la run movibile più lunga che può andare su `dst`."""
+    if not 0 <= src < len(state.columns):
+        return False
+    for start in range(column_meta(state, src).run_start, len(state.columns[src])):
+        if actions.move(state, src, start, dst):
+            return True
+    return False
+
+def command(state: GameState, line: str) -> Optional[str]:
+    """Esegue un comando e restituisce il messaggio da mostrare (None = uscita)."""
+    words = line.split()
+    if not words:
+        return ""
+    cmd = words[0].lower()
+    if cmd in ("q", "quit", "exit"):
+        return None
+    if cmd in ("?", "help"):
+        return HELP
+    if cmd == "d":
+        return "deal" if actions.deal(state) else "can't deal"
+    if cmd == "u":
+        return "undo" if actions.undo(state) else "nothing to undo"
+    if cmd == "r":
+        return "redo" if actions.redo(state) else "nothing to redo"
+    if cmd == "h":
+        res = cache.search_hint(state)
+        if res.move is None:
+            return "no hint"
+        src, start, dst = res.move
+        return f"hint: {src + 1} {start + 1} {dst + 1}"
+    if cmd == "a":
+        try:
+            limit = int(words[1]) if len(words) > 1 else 1000
+        except ValueError:
+            return "expected: a [N]"
+        res = cache.autoplay(state, max_moves=limit)
+        return f"autoplay: {res.moves} moves, {res.deals} deals, stopped: {res.reason}"
+    if cmd == "m":
+        from ..game.montecarlo import DEAL_MOVE, mc_hint
+        mc = mc_hint(state, samples=128)
+        if mc.move is None:
+            return "no hint"
+        what = "d" if mc.move == DEAL_MOVE else " ".join(str(x + 1) for x in mc.move)
+        best = mc.estimates[0]
+        return f"hint: {what}  (win {best.win_rate:.0%}, progress {best.mean:.2f}, {mc.samples} samples)"
+    try:
+        nums = [int(w) - 1 for w in words]
+    except ValueError:
+        return f"unknown command {words[0]!r} (? for help)"
+    if len(nums) == 2:
+        ok = move_longest(state, nums[0], nums[1])
+    elif len(nums) == 3:
+        ok = actions.move(state, nums[0], nums[1], nums[2])
+    else:
+        return "expected: S D or S R D"
+    return "ok" if ok else "invalid move"
+
+def play(state: GameState, inp: TextIO, out: TextIO) -> GameState:
+    """Loop di gioco: stampa il tavolo, legge un comando per riga fino a `q`, EOF o vittoria."""
+    out.write(render(state) + "\n")
+    while not actions.is_win(state):
+        out.write("> ")
+        out.flush()
+        line = inp.readline()
+        if not line:
+            break
+        msg = command(state, line)
+        if msg is None:
+            break
+        if msg:
+            out.write(msg + "\n")
+        out.write(render(state) + "\n")
+    if actions.is_win(state):
+        out.write("You won!\n")
+    return state
@@ -1,68 +1,202 @@
-from spider.game.cards import Card
-from spider.game.state import GameState
-from spider.game.actions import move, complete_sequences, deal, undo, redo
+from spider.game.cards import Card, pack, unpack
+from spider.game.state import GameState, Move, DEAL, DIRTY_STOCK, position_hash, take_dirty
+from spider.game.actions import move, complete_sequences, deal, undo, redo, apply, revert, list_legal_moves, iter_legal_moves, search_hint, hint, auto_move_one, autoplay
+from spider.game.deals import new_deal
+from spider.game.serialize import to_dict
 
 def test_move_ok_and_flip():
     s = GameState()
-    s.columns[0] = [Card(9, face_up=False), Card(8, face_up=True), Card(7, face_up=True)]
-    s.columns[1] = [Card(9, face_up=True)]
+    s.columns[0] = pack([Card(9, face_up=False), Card(8, face_up=True), Card(7, face_up=True)])
+    s.columns[1] = pack([Card(9, face_up=True)])
     ok = move(s, 0, 1, 1)
     assert ok
-    assert [c.rank for c in s.columns[1]] == [9, 8, 7]
-    assert len(s.columns[0]) == 1 and s.columns[0][0].face_up
+    assert [c.rank for c in unpack(s.columns[1])] == [9, 8, 7]
+    assert len(s.columns[0]) == 1 and unpack(s.columns[0])[0].face_up
 
 def test_move_reject_wrong_run():
     s = GameState()
-    s.columns[0] = [Card(9, face_up=True), Card(7, face_up=True)]
-    s.columns[1] = [Card(8, face_up=True)]
+    s.columns[0] = pack([Card(9, face_up=True), Card(7, face_up=True)])
+    s.columns[1] = pack([Card(8, face_up=True)])
     ok = move(s, 0, 0, 1)
     assert not ok
-    assert [c.rank for c in s.columns[0]] == [9, 7]
-    assert [c.rank for c in s.columns[1]] == [8]
+    assert [c.rank for c in unpack(s.columns[0])] == [9, 7]
+    assert [c.rank for c in unpack(s.columns[1])] == [8]
 
 def test_move_onto_empty_ok():
     s = GameState()
-    s.columns[0] = [Card(6, face_up=True), Card(5, face_up=True)]
-    s.columns[2] = []
+    s.columns[0] = pack([Card(6, face_up=True), Card(5, face_up=True)])
+    s.columns[2] = bytearray()
     ok = move(s, 0, 0, 2)
     assert ok
-    assert [c.rank for c in s.columns[2]] == [6, 5]
+    assert [c.rank for c in unpack(s.columns[2])] == [6, 5]
 
 def test_complete_sequence_removed_and_counted():
     s = GameState()
     seq = [Card(r, face_up=True) for r in range(13, 0, -1)]
-    s.columns[0] = [Card(9, face_up=True)] + seq
+    s.columns[0] = pack([Card(9, face_up=True)] + seq)
     removed = complete_sequences(s, 0)
     assert removed == 1
-    assert [c.rank for c in s.columns[0]] == [9]
+    assert [c.rank for c in unpack(s.columns[0])] == [9]
     assert s.foundations == 1
 
 def test_deal_blocks_on_empty_column():
     s = GameState()
-    s.columns = [[Card(5, face_up=True)]] + [[]] + [[Card(9, face_up=True)] for _ in range(8)]
-    s.stock = [[Card(1) for _ in range(10)]]
+    s.columns = [pack([Card(5, face_up=True)]), bytearray()] + [pack([Card(9, face_up=True)]) for _ in range(8)]
+    s.stock = [pack(Card(1) for _ in range(10))]
     ok = deal(s)
     assert not ok
     assert len(s.stock) == 1
 
 def test_deal_distributes_and_faces_up():
     s = GameState()
-    s.columns = [[Card(5, face_up=True)] for _ in range(10)]
-    round_cards = [Card(i) for i in range(1, 11)]
-    s.stock = [round_cards]
+    s.columns = [pack([Card(5, face_up=True)]) for _ in range(10)]
+    s.stock = [pack(Card(i) for i in range(1, 11))]
     ok = deal(s)
     assert ok
     assert len(s.stock) == 0
     for i in range(10):
-        assert s.columns[i][-1].face_up
+        assert unpack(s.columns[i])[-1].face_up
 
 def test_undo_redo_cycle():
     s = GameState()
-    s.columns[0] = [Card(9, face_up=True), Card(8, face_up=True)]
-    s.columns[1] = [Card(10, face_up=True)]
+    s.columns[0] = pack([Card(9, face_up=True), Card(8, face_up=True)])
+    s.columns[1] = pack([Card(10, face_up=True)])
     assert move(s, 0, 0, 1)  # 8 su 9
-    after_move = [c.rank for c in s.columns[1]]
+    after_move = [c.rank for c in unpack(s.columns[1])]
     assert undo(s)
-    assert [c.rank for c in s.columns[1]] == [10]
+    assert [c.rank for c in unpack(s.columns[1])] == [10]
     assert redo(s)
-    assert [c.rank for c in s.columns[1]] == after_move
+    assert [c.rank for c in unpack(s.columns[1])] == after_move
+
+def test_apply_revert_restores_flip_and_completion():
+    s = GameState()
+    s.columns[0] = pack([Card(4, face_up=False)] + [Card(r, face_up=True) for r in range(12, 0, -1)])
+    s.columns[1] = pack([Card(2, face_up=True), Card(13, face_up=True)])
+    before = to_dict(s)
+    m = apply(s, Move(0, 1, 1))
+    assert m.flipped and m.count == 12 and len(m.completed) == 1
+    assert s.foundations == 1 and [c.rank for c in unpack(s.columns[1])] == [2]
+    revert(s, m)
+    assert to_dict(s) == before
+
+def test_undo_deal_restores_stock_faces():
+    s = GameState()
+    s.columns = [pack([Card(5, face_up=True)]) for _ in range(10)]
+    s.stock = [pack(Card(i, face_up=False) for i in range(1, 11))]
+    before = to_dict(s)
+    assert deal(s)
+    assert s.history[-1].src == DEAL
+    assert undo(s)
+    assert to_dict(s) == before
+    assert redo(s)
+    assert not s.stock and s.moves == 1
+
+def _brute_force_moves(s):
+    from spider.game import rules
+    out = []
+    for si, scol in enumerate(s.columns):
+        for start in range(len(scol)):
+            if not rules.can_take_run(scol, start):
+                continue
+            for di, dcol in enumerate(s.columns):
+                if di != si and rules.can_place(dcol[-1] if dcol else None, scol[start]):
+                    out.append((si, start, di))
+    return out
+
+def test_legal_moves_match_brute_force_without_empties():
+    s = GameState()
+    s.columns = [pack(Card(r, face_up=r % 3 != 0) for r in range(13, 13 - k, -1)) for k in range(1, 11)]
+    s.columns[4] += pack([Card(9, face_up=True)])
+    assert list_legal_moves(s) == _brute_force_moves(s)
+    assert list(iter_legal_moves(s)) == list_legal_moves(s)
+
+def test_legal_moves_collapse_empty_columns():
+    s = GameState()
+    s.columns = [pack([Card(6, face_up=True), Card(5, face_up=True)]), bytearray(), bytearray(), pack([Card(7, face_up=True)])]
+    s.columns += [pack([Card(1, face_up=True)]) for _ in range(6)]
+    moves = list_legal_moves(s)
+    assert (0, 0, 3) in moves
+    assert (0, 0, 1) in moves and (0, 0, 2) not in moves
+    assert (0, 1, 1) in moves and (0, 1, 2) not in moves
+    s.stock = [pack(Card(1, face_up=False) for _ in range(10))]  # con lo stock le colonne vuote contano
+    assert list_legal_moves(s) == _brute_force_moves(s)
+
+def test_actions_report_dirty_columns():
+    s = GameState()
+    s.columns = [pack([Card(9, face_up=True)]) for _ in range(10)]
+    s.columns[2] = pack([Card(3, face_up=False), Card(8, face_up=True)])
+    s.stock = [pack(Card(1, face_up=False) for _ in range(10))]
+    assert move(s, 2, 1, 0)
+    assert take_dirty(s) == {0, 2}
+    assert take_dirty(s) == set()
+    assert deal(s)
+    assert take_dirty(s) == set(range(10)) | {DIRTY_STOCK}
+    assert undo(s) and undo(s)
+    assert take_dirty(s) == set(range(10)) | {DIRTY_STOCK}
+
+def test_search_hint_finds_two_move_completion():
+    s = GameState()
+    s.columns[0] = pack([Card(r, face_up=True) for r in range(13, 1, -1)])  # K..2
+    s.columns[1] = pack([Card(1, face_up=True), Card(9, face_up=True)])
+    s.columns[2] = pack([Card(10, face_up=True)])
+    before = to_dict(s)
+    res = search_hint(s, budget_ms=2000, max_depth=3)
+    assert res.move == (1, 1, 2) and res.depth >= 2
+    assert to_dict(s) == before and not s.history
+    for m in res.line:
+        assert move(s, *m)
+    assert s.foundations == 1
+
+def test_search_hint_cancel_and_no_moves():
+    s = GameState()
+    s.columns = [pack([Card(5, face_up=True)]) for _ in range(10)]
+    assert search_hint(s).move is None
+    s.columns[1] = pack([Card(6, face_up=True)])
+    res = search_hint(s, cancel=lambda: True)
+    assert res.move == (0, 0, 1) and res.depth == 0
+
+def test_auto_move_one_with_seen_does_not_shuttle():
+    # il 5 può andare avanti e indietro tra i due 6 all'infinito; con `seen` ogni posizione una volta sola
+    s = GameState()
+    s.columns = [pack([Card(13, face_up=True)]) for _ in range(10)]
+    s.columns[0] = pack([Card(9, face_up=True), Card(6, face_up=True)])
+    s.columns[1] = pack([Card(9, face_up=True), Card(6, face_up=True)])
+    s.columns[2] = pack([Card(13, face_up=True), Card(5, face_up=True)])
+    assert hint(s) is not None
+    seen = {position_hash(s)}
+    moves = 0
+    while auto_move_one(s, seen):
+        moves += 1
+        assert moves <= 2
+    assert moves == 2 and len(seen) == 3
+
+def test_autoplay_stops_with_reason():
+    s = new_deal(4)
+    r = autoplay(s, max_moves=5)
+    assert r.reason == "max_moves" and r.moves == 5 and s.moves == 5
+    r = autoplay(new_deal(4), max_moves=100_000, time_budget=0.0)
+    assert r.reason == "time_budget" and r.moves == 0
+
+def test_autoplay_won_stuck_blocked_stalled():
+    won = GameState()
+    won.foundations = 7
+    won.columns = [pack([Card(13)]) for _ in range(10)]
+    won.columns[0] = pack([Card(r) for r in range(13, 1, -1)])
+    won.columns[1] = pack([Card(1)])
+    r = autoplay(won)
+    assert (r.reason, r.deals) == ("won", 0) and won.foundations == 8
+    stuck = GameState()
+    stuck.columns = [pack([Card(13)]) for _ in range(10)]
+    r = autoplay(stuck)
+    assert (r.reason, r.moves) == ("stuck", 0)
+
+    def one_empty() -> GameState:
+        # stock pieno ma sempre una colonna vuota: il deal non si può fare
+        s = GameState()
+        s.columns = [bytearray()] + [pack([Card(5)]) for _ in range(9)]
+        s.stock = [pack(Card(2, face_up=False) for _ in range(10))]
+        return s
+    r = autoplay(one_empty())
+    assert r.reason == "blocked" and r.moves > 0 and r.deals == 0
+    r = autoplay(one_empty(), patience=2)
+    assert (r.reason, r.moves, r.deals) == ("stalled", 2, 0)
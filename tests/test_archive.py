@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from spider import cli
+from spider.game.archive import Archive, GameRecord, record_for
+from spider.game.deals import new_deal
+
+def _rec(seed, won, score, duration):
+    return GameRecord(seed, won, score, 100, duration, 8 if won else 3, 0.0)
+
+def test_batched_writes_and_queries(tmp_path):
+    path = tmp_path / "games.sqlite"
+    with Archive(path, batch_size=4, flush_interval=0.01) as a:
+        for r in [_rec(1, True, 900, 300.0), _rec(1, False, 200, 50.0), _rec(2, True, 1200, 100.0),
+                  _rec(3, False, 50, 10.0), _rec(None, False, 0, 5.0)]:
+            a.record(r)
+        a.flush()
+        assert a.count() == 5 and a.written == 5
+        assert [(d.seed, d.score, d.games, d.wins) for d in a.best_scores()] == [(2, 1200, 1, 1), (1, 900, 2, 1), (3, 50, 1, 0)]
+        assert a.average_win_time() == 200.0
+        assert a.win_rate() == 0.4
+        assert a.best_for(1) == _rec(1, True, 900, 300.0)
+        assert a.best_for(9) is None
+    with Archive(path) as a:  # persistente; close ha svuotato la coda
+        assert a.count() == 5
+    with pytest.raises(RuntimeError):
+        a.record(_rec(1, True, 1, 1.0))
+
+def test_record_does_not_block_on_writer(tmp_path):
+    a = Archive(tmp_path / "g.sqlite", flush_interval=0.01)
+    assert a._writer.name == "spider-archive" and a._writer is not threading.current_thread()
+    s = new_deal(5)
+    s.moves, s.score = 12, 480
+    a.record_game(s, 61.5)
+    a.close()
+    with Archive(tmp_path / "g.sqlite") as b:
+        best = b.best_for(5)
+        assert best is not None and not best.won and best.score == 480 and best.duration == 61.5
+    assert record_for(s, 1.0).won is False
+
+def test_cli_archive(tmp_path, capsys):
+    path = tmp_path / "g.sqlite"
+    assert cli.main(["archive", str(path)]) == 1
+    with Archive(path) as a:
+        a.record(_rec(7, True, 999, 120.0))
+    assert cli.main(["archive", str(path)]) == 0
+    out = capsys.readouterr().out
+    assert "1 games, win rate 100%, average time to win 120s" in out and "seed 7" in out
+    assert cli.main(["archive", str(path), "--seed", "7"]) == 0
@@ -0,0 +1,66 @@
+import random
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from spider.game import actions
+from spider.game.batch import BatchState
+from spider.game.cards import Card, pack
+from spider.game.deals import new_deal
+from spider.game.serialize import to_dict
+
+def test_batch_matches_actions_on_random_play():
+    states = [new_deal(seed) for seed in range(6)]
+    bs = BatchState.from_states(states)
+    rng = random.Random(1)
+    for _ in range(150):
+        mask = bs.legal_mask()
+        src = np.zeros(bs.size, dtype=np.intp)
+        k = np.zeros(bs.size, dtype=np.intp)
+        dst = np.zeros(bs.size, dtype=np.intp)
+        moving = np.zeros(bs.size, dtype=bool)
+        dealing = np.zeros(bs.size, dtype=bool)
+        for b, s in enumerate(states):
+            legal = actions.list_legal_moves(s)
+            assert bs.move_list(b, mask) == legal
+            if legal and rng.random() < 0.9:
+                ms, mstart, md = rng.choice(legal)
+                assert actions.move(s, ms, mstart, md)
+                src[b], k[b], dst[b], moving[b] = ms, bs.heights[b, ms] - 1 - mstart, md, True
+            else:
+                dealing[b] = actions.deal(s)
+        bs.apply_moves(src, k, dst, moving)
+        assert (bs.deal(dealing) == dealing).all()
+        for b, s in enumerate(states):
+            expected = to_dict(s)
+            got = to_dict(bs.to_state(b))
+            for key in ("columns", "stock", "foundations", "moves"):
+                assert got[key] == expected[key]
+
+def test_empty_columns_collapse_only_without_stock():
+    s, t = new_deal(0), new_deal(0)
+    s.stock = s.stock[:1]
+    t.stock = []
+    for x in (s, t):
+        x.columns = [bytearray(), bytearray()] + [pack([Card(r)]) for r in (2, 3, 5, 7, 9, 11, 12, 13)]
+    bs = BatchState.from_states([s, t])
+    assert len(actions.list_legal_moves(s)) == 19
+    assert bs.move_list(0) == actions.list_legal_moves(s)
+    assert bs.move_list(1) == actions.list_legal_moves(t)
+    assert len(bs.move_list(1)) < 19
+
+def test_batch_completes_sequence():
+    s = new_deal(0)
+    s.columns[0] = pack(Card(r) for r in range(13, 1, -1))
+    s.columns[1] = pack([Card(1)])
+    bs = BatchState.from_states([s])
+    mask = bs.legal_mask()
+    assert mask[0, 1, 0, 0]
+    bs.apply_moves(np.array([1]), np.array([0]), np.array([0]), np.array([True]))
+    assert bs.foundations[0] == 1 and bs.heights[0, 0] == 0
+
+def test_random_rollout_runs():
+    bs = BatchState.from_states([new_deal(seed) for seed in range(8)])
+    won = bs.rollout(np.random.default_rng(0), max_steps=50)
+    assert won.shape == (8,)
+    assert (bs.moves > 0).all()
@@ -0,0 +1,49 @@
+from spider.game import actions, cache
+from spider.game.cache import AnalysisCache
+from spider.game.deals import new_deal
+
+def test_undo_redo_revisits_hit_the_cache():
+    c = AnalysisCache()
+    s = new_deal(6)
+    first = cache.legal_moves(s, c)
+    assert first == actions.list_legal_moves(s)
+    assert (c.hits, c.misses) == (0, 1)
+    actions.move(s, *first[0])
+    cache.legal_moves(s, c)
+    actions.undo(s)
+    assert cache.legal_moves(s, c) == first
+    assert cache.evaluate(s, c) == actions.evaluate(s)
+    assert cache.evaluate(s, c) == actions.evaluate(s)
+    assert c.stats()["hits"] == 2 and c.stats()["misses"] == 3
+
+def test_autoplay_through_the_cache_replays_from_it():
+    c = AnalysisCache()
+    s = new_deal(4)
+    a = cache.autoplay(s, max_moves=30, cache=c)
+    assert a == actions.autoplay(new_deal(4), max_moves=30)._replace(elapsed=a.elapsed)
+    misses = c.misses
+    while actions.undo(s):
+        pass
+    b = cache.autoplay(s, max_moves=30, cache=c)
+    assert b._replace(elapsed=0) == a._replace(elapsed=0)
+    assert c.misses == misses and c.hits >= 30
+
+def test_lru_eviction_respects_byte_budget():
+    value = tuple(range(20))
+    c = AnalysisCache(max_bytes=3 * (cache.sizeof(value) + 64))
+    for k in (1, 2, 3):
+        c.put("x", k, value)
+    assert c.get("x", 1) == value  # 1 torna la più recente
+    c.put("x", 4, value)
+    assert c.get("x", 2) is None and c.get("x", 1) == value
+    assert len(c) == 3 and c.evictions == 1 and c.bytes <= c.max_bytes
+    c.put("x", 5, tuple(range(10_000)))  # più grande dell'intera cache: non entra
+    assert c.get("x", 5) is None and len(c) == 3
+
+def test_search_hint_reused_when_complete():
+    c = AnalysisCache()
+    s = new_deal(2)
+    a = cache.search_hint(s, 50, c, max_depth=1)
+    assert a.complete
+    b = cache.search_hint(s, 50, c, max_depth=1)
+    assert b is a and c.hits == 1
@@ -0,0 +1,19 @@
+import pytest
+
+from spider.game.cards import Card, encode, decode, pack, unpack, FACE_UP
+
+def test_encode_decode_roundtrip():
+    for card in (Card(1), Card(13, "♥", False), Card(10, "♣", True)):
+        assert decode(encode(card)) == card
+    assert encode(Card(7, face_up=True)) & FACE_UP
+
+def test_encode_rejects_unknown_suit():
+    with pytest.raises(ValueError):
+        encode(Card(3, "x"))
+
+def test_pack_unpack_columns():
+    col = [Card(9, face_up=False), Card(8, "♦"), Card(13, "♣")]
+    codes = pack(col)
+    assert isinstance(codes, bytearray) and len(codes) == 3
+    assert list(codes) == [encode(c) for c in col]
+    assert unpack(codes) == col
@@ -0,0 +1,66 @@
+import io
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from spider import cli
+from spider.game.cards import Card, pack, unpack
+from spider.game.state import GameState
+from spider.game.deals import new_deal
+from spider.game.serialize import save
+from spider.ui import plain
+
+SRC = str(Path(__file__).resolve().parent.parent / "src")
+
+def test_plain_play_commands():
+    s = new_deal(3)
+    out = io.StringIO()
+    plain.play(s, io.StringIO("d\nu\nr\nh\nfoo\nq\n"), out)
+    text = out.getvalue()
+    assert "deal" in text and "undo" in text and "redo" in text and "hint: " in text
+    assert "unknown command" in text
+    assert s.moves == 1 and len(s.stock) == 4
+
+def test_move_longest_takes_longest_fitting_run():
+    s = GameState()
+    s.columns[0] = pack([Card(9, face_up=False), Card(8), Card(7), Card(6)])
+    s.columns[1] = pack([Card(7)])
+    s.columns[2] = pack([Card(9)])
+    assert plain.move_longest(s, 0, 1)
+    assert [c.rank for c in unpack(s.columns[1])] == [7, 6]
+    assert plain.move_longest(s, 0, 2)
+    assert [c.rank for c in unpack(s.columns[2])] == [9, 8, 7] and unpack(s.columns[0])[0].face_up
+    assert not plain.move_longest(s, 3, 0)
+
+def test_cli_stats_and_solve(tmp_path, capsys):
+    path = tmp_path / "g.json"
+    save(new_deal(4), path)
+    assert cli.main(["stats", str(path)]) == 0
+    assert "hidden cards 44" in capsys.readouterr().out
+    assert cli.main(["solve", str(path), "--max-nodes", "200"]) == 1
+    assert capsys.readouterr().out.startswith("budget")
+
+def test_headless_import_skips_textual():
+    # il tempo d'import (IMPORT_BUDGET_MS) lo misura benchmarks/run.py: qui solo cosa si importa
+    code = (
+        "import sys, json\n"
+        "import spider.cli, spider.game.actions, spider.ui.plain\n"
+        "print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in ('textual', 'rich'))))"
+    )
+    env = dict(os.environ, PYTHONPATH=SRC)
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    assert json.loads(out.stdout) == []
+
+def test_plain_autoplay_command():
+    s = new_deal(3)
+    assert plain.command(s, "a 7") == "autoplay: 7 moves, 0 deals, stopped: max_moves"
+    assert plain.command(s, "a x") == "expected: a [N]"
+
+def test_play_journal_options(tmp_path, monkeypatch):
+    monkeypatch.setenv("SPIDER_JOURNAL", str(tmp_path / "j.bin"))
+    args = cli.parser().parse_args(["play", "--no-journal"])
+    assert args.no_journal and args.journal is None
+    args = cli.parser().parse_args(["play", "--journal", str(tmp_path / "x.bin")])
+    assert args.journal == tmp_path / "x.bin"
@@ -0,0 +1,37 @@
+import pytest
+
+from spider.game import corpus
+from spider.game.corpus import Corpus, DealStats, write_index
+from spider.game.solver import BUDGET, SOLVED
+
+def test_build_and_lookup(tmp_path):
+    path = tmp_path / "deals.idx"
+    with corpus.build(range(4, 8), path, max_nodes=3000, workers=1) as c:
+        assert len(c) == 4
+        assert sum(c.size_of(name) for name in corpus.CLASSES) == 4
+        e = c.find(4)
+        assert e is not None and e.status == SOLVED and e.length > 0 and e.difficulty == "easy"
+        assert c.find(6).status == BUDGET and c.find(6).difficulty == "unknown"
+        assert c.find(99) is None
+        assert c.pick("unknown", 0) == c.pick("unknown", c.size_of("unknown"))
+        with pytest.raises(LookupError):
+            c.pick("unsolvable", 0)
+
+def test_classes_are_contiguous_and_sorted(tmp_path):
+    stats = [DealStats(seed, SOLVED, 10, nodes, 1.0) for seed, nodes in zip(range(20, 0, -1), range(100, 2100, 100))]
+    stats.append(DealStats(50, BUDGET, 0, 5000, 9.0))
+    path = tmp_path / "d.idx"
+    write_index(stats, path)
+    with Corpus(path) as c:
+        assert [c.size_of(n) for n in corpus.CLASSES] == [6, 5, 5, 4, 0, 1]
+        records = [c.record(i) for i in range(len(c))]
+        assert [corpus.CLASSES.index(r.difficulty) for r in records] == sorted(corpus.CLASSES.index(r.difficulty) for r in records)
+        hard = [r.seed for r in records if r.difficulty == "hard"]
+        assert hard == sorted(hard)
+        assert all(c.find(s.seed).nodes == s.nodes for s in stats)
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "x.idx"
+    path.write_bytes(b"JUNK" + bytes(64))
+    with pytest.raises(ValueError):
+        Corpus(path)
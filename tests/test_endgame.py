@@ -0,0 +1,103 @@
+import pytest
+
+from spider.game import actions, solver
+from spider.game.cards import Card, pack
+from spider.game.endgame import LOST, EndgameDB, ident, is_endgame, node_check, node_hash, node_of, solve_distances
+from spider.game.state import GameState, canonical_hash
+
+def _run(hi, lo):
+    return pack(Card(r) for r in range(hi, lo - 1, -1))
+
+def _two_moves() -> GameState:
+    # K..8 | 6..A | 7: due mosse alla vittoria (il 7 sul re, poi 6..A sul 7, o viceversa)
+    s = GameState()
+    s.foundations = 7
+    s.columns[3] = _run(13, 8)
+    s.columns[5] = _run(6, 1)
+    s.columns[8] = _run(7, 7)
+    return s
+
+@pytest.fixture
+def db():
+    d = EndgameDB()
+    actions.set_endgame(d)
+    yield d
+    actions.set_endgame(None)
+
+def test_node_hash_matches_canonical_hash():
+    s = _two_moves()
+    assert is_endgame(s) and node_hash(node_of(s)) == canonical_hash(s)
+    s.columns.reverse()
+    assert node_hash(node_of(s)) == canonical_hash(_two_moves())
+    s.columns[0] = pack([Card(3, face_up=False)])
+    assert not is_endgame(s)
+
+def test_distances_and_optimal_line():
+    db = EndgameDB()
+    s = _two_moves()
+    assert db.lookup(s) is None
+    assert db.distance(s) == 2 and db.lookup(s) == 2
+    line = db.line(s)
+    assert len(line) == 2
+    for m in line:
+        assert actions.move(s, *m)
+    assert actions.is_win(s)
+
+def test_lost_positions_and_budget():
+    s = GameState()
+    s.foundations = 7
+    s.columns[0] = pack([Card(5)])
+    s.columns[1] = pack([Card(3)])
+    assert solve_distances(s) == {canonical_hash(s): (node_check(node_of(s)), LOST)}
+    db = EndgameDB(max_nodes=1)
+    assert db.distance(_two_moves()) is None and db.best_move(_two_moves()) is None
+    assert ident(_two_moves()) in db.unknown
+
+def test_hash_collision_is_not_a_distance(tmp_path):
+    s = _two_moves()
+    h, check = ident(s)
+    db = EndgameDB()
+    db.new[h] = (check ^ 1, 5)  # altra posizione con lo stesso canonical_hash
+    assert db.lookup(s) is None
+    path = tmp_path / "endgame.db"
+    db.save(path)
+    with EndgameDB(path, max_nodes=0) as db:
+        assert db.lookup(s) is None and db.distance(s) is None
+
+def test_persistent_memory_mapped(tmp_path):
+    path = tmp_path / "endgame.db"
+    with EndgameDB(path) as db:
+        db.distance(_two_moves())
+        n = len(db.new)
+        db.save()
+        assert db.count == n and not db.new
+    with EndgameDB(path, max_nodes=0) as db:  # solo lookup: nessuna ricerca possibile
+        assert db.lookup(_two_moves()) == 2
+        assert len(db.line(_two_moves())) == 2
+    path.write_bytes(b"XXXX" + bytes(8))
+    with pytest.raises(ValueError):
+        EndgameDB(path)
+
+def test_engine_uses_database(db):
+    s = _two_moves()
+    assert actions.hint(s) == db.best_move(s)
+    res = actions.search_hint(s)
+    assert res.complete and len(res.line) == 2
+    r = solver.solve(s)
+    assert r.solved and actions.is_win(solver.replay(s, r.line))
+    out = actions.autoplay(s)
+    assert out.reason == "won" and out.moves == 2
+    lost = GameState()
+    lost.foundations = 7
+    lost.columns[0] = pack([Card(5)])
+    lost.columns[1] = pack([Card(4)])
+    lost.columns[2] = pack([Card(2)])
+    assert actions.autoplay(lost).reason == "lost"
+
+def test_cli_endgame_build(tmp_path, capsys):
+    from spider import cli
+    path = tmp_path / "eg.db"
+    assert cli.main(["endgame", "build", str(path), "--seeds", "8:9", "--solve-nodes", "20000", "--max-nodes", "20000"]) == 0
+    assert "positions" in capsys.readouterr().out
+    with EndgameDB(path) as db:
+        assert db.count > 0
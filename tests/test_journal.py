@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+from spider.game import actions, journal as journal_mod
+from spider.game.deals import new_deal
+from spider.game.journal import Journal, replay, recover
+from spider.game.serialize import to_bytes, to_dict
+
+def _play(journal: Journal, seed: int, steps: int):
+    s = new_deal(seed)
+    journal.start(s)
+    rng = random.Random(seed)
+    boards = [to_dict(s)]
+    for _ in range(steps):
+        r = rng.random()
+        moves = actions.list_legal_moves(s)
+        if r < 0.1 and actions.undo(s):
+            journal.undo(s)
+        elif r < 0.15 and actions.redo(s):
+            journal.redo(s)
+        elif moves and r < 0.9:
+            mv = rng.choice(moves)
+            assert actions.move(s, *mv)
+            s.score += 1
+            journal.move(s, *mv)
+        elif actions.deal(s):
+            journal.deal(s)
+        else:
+            continue
+        boards.append(to_dict(s))
+    return s, boards
+
+def test_replay_to_any_action_uses_checkpoints(tmp_path):
+    path = tmp_path / "j.bin"
+    j = Journal(path, checkpoint_every=7)
+    s, boards = _play(j, 11, 60)
+    j.close()
+    for n in (0, 1, 6, 7, 8, 30, len(boards) - 1):
+        assert to_dict(replay(path, n)) == boards[n]
+    assert to_dict(replay(path)) == to_dict(s)
+
+def test_recover_ignores_truncated_tail_and_resumes(tmp_path):
+    path = tmp_path / "j.bin"
+    j = Journal(path, checkpoint_every=0)
+    s, boards = _play(j, 4, 20)
+    j.close()
+    with open(path, "ab") as f:
+        f.write(b"\x02\x07\x00")  # record a metà
+    found = recover(path)
+    state = found.state
+    assert found.actions == len(boards) - 1
+    assert to_dict(state) == to_dict(s)
+    j.resume(found)
+    assert actions.undo(state)
+    j.undo(state)
+    j.close()
+    assert to_dict(replay(path)) == to_dict(state)
+
+def test_checkpoint_keeps_elapsed_time_across_resume(tmp_path, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(journal_mod, "monotonic", lambda: now[0])
+    path = tmp_path / "j.bin"
+    j = Journal(path, checkpoint_every=0)
+    s = new_deal(2)
+    j.start(s)
+    now[0] += 90
+    j.checkpoint(s)
+    j.close()
+    found = recover(path)
+    assert found.elapsed == 90
+    now[0] += 1000  # tempo a gioco chiuso: non conta
+    j.resume(found)
+    now[0] += 30
+    assert j.elapsed() == 120
+    j.checkpoint(s)
+    j.close()
+    assert recover(path).elapsed == 120
+
+def test_journal_without_path_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.setenv("SPIDER_JOURNAL", str(tmp_path / "env.bin"))
+    assert journal_mod.default_path() == tmp_path / "env.bin"
+    j = Journal(None)
+    s = new_deal(1)
+    j.start(s)
+    assert actions.deal(s)
+    j.deal(s)
+    j.checkpoint(s)
+    j.close()
+    assert list(tmp_path.iterdir()) == []
+
+def test_checkpoints_are_deltas_and_history_survives_resume(tmp_path):
+    path = tmp_path / "j.bin"
+    j = Journal(path, checkpoint_every=10)
+    s, _ = _play(j, 7, 400)
+    j.close()
+    data = path.read_bytes()
+    records, _ = journal_mod.scan(data)
+    deltas = [r for r in records if r.kind == journal_mod.DELTA]
+    assert len(deltas) >= 30
+    # ogni checkpoint porta la posizione e poche voci di history, non tutta la partita
+    assert max(r.size for r in deltas) < 3 * len(to_bytes(s, history=False))
+    t = replay(path)
+    assert to_dict(t) == to_dict(s) and t.history == s.history and t.future == s.future
+    found = recover(path)
+    j.resume(found)
+    state = found.state
+    for _ in range(25):
+        assert actions.undo(state)
+        j.undo(state)
+    for _ in range(5):
+        assert actions.redo(state)
+        j.redo(state)
+    j.checkpoint(state)
+    mv = actions.list_legal_moves(state)[0]
+    assert actions.move(state, *mv)
+    j.move(state, *mv)
+    j.checkpoint(state)
+    j.close()
+    t = replay(path)
+    assert to_dict(t) == to_dict(state) and t.history == state.history and t.future == state.future
+
+def test_legacy_full_checkpoint_is_still_read(tmp_path):
+    path = tmp_path / "j.bin"
+    j = Journal(path, checkpoint_every=0)
+    s, _ = _play(j, 3, 30)
+    payload = journal_mod._CHECKPOINT.pack(j.actions, 5.0) + to_bytes(s, history=True)
+    j._write(journal_mod.CHECKPOINT, payload)
+    assert actions.undo(s)
+    j.undo(s)
+    j.close()
+    found = recover(path)
+    assert found.elapsed == 5.0
+    assert to_dict(found.state) == to_dict(s) and found.state.history == s.history
+
+def test_fsync_runs_off_the_caller_thread(tmp_path, monkeypatch):
+    threads = []
+    real = journal_mod.os.fsync
+    monkeypatch.setattr(journal_mod.os, "fsync", lambda fd: (threads.append(threading.current_thread()), real(fd)))
+    j = Journal(tmp_path / "j.bin", sync_every=4)
+    _play(j, 5, 40)
+    for _ in range(200):
+        if threads:
+            break
+        time.sleep(0.01)
+    j.close()
+    assert len(threads) >= 2
+    assert all(t is not threading.main_thread() for t in threads[:-1])
+    assert threads[-1] is threading.main_thread()  # l'ultimo, alla chiusura
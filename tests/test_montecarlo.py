@@ -0,0 +1,40 @@
+from collections import Counter
+from random import Random
+
+from spider.game import actions
+from spider.game.cards import FACE_UP
+from spider.game.deals import new_deal
+from spider.game.montecarlo import DEAL_MOVE, MoveEstimate, _separated, candidate_moves, determinize, mc_hint
+from spider.game.serialize import to_dict
+
+def _hidden(s):
+    return [c for col in s.columns for c in col if not c & FACE_UP] + [c for pile in s.stock for c in pile]
+
+def test_determinize_keeps_visible_cards_and_unseen_multiset():
+    s = new_deal(7)
+    actions.deal(s)
+    before = to_dict(s)
+    d = determinize(s, Random(1))
+    assert to_dict(s) == before
+    for a, b in zip(s.columns, d.columns):
+        assert len(a) == len(b)
+        assert [c for c in a if c & FACE_UP] == [c for c in b if c & FACE_UP]
+        assert [c & FACE_UP for c in a] == [c & FACE_UP for c in b]
+    assert Counter(_hidden(s)) == Counter(_hidden(d))
+    assert _hidden(s) != _hidden(d)
+
+def test_mc_hint_picks_a_candidate_reproducibly():
+    s = new_deal(4)
+    before = to_dict(s)
+    a = mc_hint(s, samples=8, workers=1, chunk=4, max_steps=30, seed=3)
+    b = mc_hint(s, samples=8, workers=1, chunk=4, max_steps=30, seed=3)
+    assert to_dict(s) == before
+    assert a.move in candidate_moves(s) and DEAL_MOVE in candidate_moves(s)
+    assert a.samples == 8 and len(a.estimates) == len(candidate_moves(s))
+    assert [e.progress for e in a.estimates] == [e.progress for e in b.estimates]
+    assert 0.0 <= a.win_probability <= 1.0
+
+def test_separation_rule():
+    clear = [MoveEstimate((0, 0, 1), 200, 0, 160.0), MoveEstimate((1, 0, 2), 200, 0, 40.0)]
+    close = [MoveEstimate((0, 0, 1), 200, 0, 100.0), MoveEstimate((1, 0, 2), 200, 0, 96.0)]
+    assert _separated(clear, 2.0) and not _separated(close, 2.0)
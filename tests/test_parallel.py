@@ -0,0 +1,37 @@
+from spider.game.actions import is_win
+from spider.game.parallel import SharedTable, parallel_solve
+from spider.game.deals import new_deal
+from spider.game.solver import replay, solve, BUDGET, SOLVED
+from tests.test_solver import _near_win
+
+def test_shared_table_membership():
+    t = SharedTable(1 << 4)
+    try:
+        assert 17 not in t
+        t.add(17)
+        t.add(33)  # stesso slot iniziale: va in probing
+        assert 17 in t and 33 in t
+        assert len(t) == 2
+    finally:
+        t.close()
+
+def test_parallel_solve_matches_single():
+    s = _near_win()
+    r = parallel_solve(s, workers=2, table_slots=1 << 12)
+    assert r.status == SOLVED
+    assert is_win(replay(s, r.line))
+
+def test_idle_workers_get_donated_subtrees():
+    s = new_deal(8)
+    r = parallel_solve(s, workers=2, max_nodes=None, time_limit=30, table_slots=1 << 18, tasks_per_worker=0)
+    assert r.status == SOLVED and is_win(replay(s, r.line))
+    assert r.tasks > 1  # partita da un solo sottoalbero: gli altri sono stati donati
+
+def test_solve_donates_unexplored_siblings():
+    s = new_deal(3)
+    given = []
+    r = solve(s, max_nodes=1500, wanted=lambda: True, donate=given.append)
+    assert given and r.status == BUDGET
+    for prefix in given:
+        replay(s, prefix)  # ogni prefisso è una linea giocabile dalla radice
+    assert len({tuple((m.src, m.start, m.dst) for m in p) for p in given}) == len(given)
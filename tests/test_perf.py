@@ -0,0 +1,45 @@
+import json
+
+from spider import perf
+from spider.game import actions
+from spider.game.deals import new_deal
+
+def test_histogram_percentiles():
+    h = perf.Histogram()
+    for us in [1, 2, 3, 5, 9, 100, 1000]:
+        h.add(us / 1e6)
+    assert h.count == 7 and abs(h.max - 1e-3) < 1e-12
+    assert h.percentile(0.5) <= h.percentile(0.95) <= h.max
+    assert h.percentile(0.5) * 1e6 <= 8
+
+def test_install_counts_calls_and_uninstall_restores():
+    rec = perf.Recorder()
+    original = actions.deal
+    perf.install([(actions, "deal"), (actions, "undo")], rec)
+    try:
+        s = new_deal(1)
+        actions.deal(s)
+        actions.deal(s)
+        actions.undo(s)
+        ops = rec.report()
+        assert ops["actions.deal"]["count"] == 2
+        assert ops["actions.undo"]["count"] == 1
+    finally:
+        perf.uninstall()
+    assert actions.deal is original and not perf.installed()
+
+def test_history_bytes_and_dump(tmp_path):
+    s = new_deal(2)
+    empty = perf.history_bytes(s)
+    while actions.deal(s):
+        pass
+    actions.undo(s)
+    mem = perf.history_bytes(s)
+    assert mem["history"] == len(s.history) and mem["future"] == 1
+    assert mem["bytes"] > empty["bytes"]
+    rec = perf.Recorder()
+    rec.histogram("x").add(0.001)
+    out = tmp_path / "perf.json"
+    perf.dump(out, s, rec, note="ok")
+    data = json.loads(out.read_text())
+    assert data["ops"]["x"]["count"] == 1 and data["memory"] == mem and data["note"] == "ok"
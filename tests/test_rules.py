@@ -1,23 +1,35 @@
-from spider.game.cards import Card
-from spider.game.rules import is_descending_run, can_take_run, can_place
+from spider.game.cards import Card, encode, pack
+from spider.game.rules import is_descending_run, can_take_run, can_place, run_start, complete_seq_window
 
 def test_is_descending_run_ok():
-    run = [Card(8), Card(7), Card(6)]
+    run = pack([Card(8), Card(7), Card(6)])
     assert is_descending_run(run)
 
 def test_is_descending_run_break():
-    run = [Card(8), Card(6)]
+    run = pack([Card(8), Card(6)])
     assert not is_descending_run(run)
 
 def test_can_take_run_start_hidden():
-    col = [Card(9, face_up=False), Card(8), Card(7)]
+    col = pack([Card(9, face_up=False), Card(8), Card(7)])
     assert not can_take_run(col, 0)
 
 def test_can_take_run_ok_from_middle():
-    col = [Card(10), Card(9), Card(8), Card(7)]
+    col = pack([Card(10), Card(9), Card(8), Card(7)])
     assert can_take_run(col, 1)
 
 def test_can_place_rules():
-    assert can_place(Card(7), Card(6))
-    assert not can_place(Card(7), Card(8))
-    assert can_place(None, Card(13))
+    assert can_place(encode(Card(7)), encode(Card(6)))
+    assert not can_place(encode(Card(7)), encode(Card(8)))
+    assert not can_place(encode(Card(7, face_up=False)), encode(Card(6)))
+    assert can_place(None, encode(Card(13)))
+
+def test_run_start_and_complete_window():
+    full = pack(Card(r) for r in range(13, 0, -1))
+    assert run_start(bytearray()) == 0
+    assert run_start(pack([Card(5), Card(9, face_up=False)])) == 2
+    assert run_start(pack([Card(9, face_up=False), Card(8), Card(7), Card(3)])) == 3
+    assert run_start(pack([Card(9, face_up=False), Card(8), Card(7)])) == 1
+    assert complete_seq_window(full) == (0, 13)
+    assert complete_seq_window(pack([Card(4, face_up=False)]) + full) == (1, 14)
+    assert complete_seq_window(full[1:]) is None
+    assert complete_seq_window(full[:6] + pack([Card(7, face_up=False)]) + full[7:]) is None
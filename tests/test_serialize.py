@@ -0,0 +1,62 @@
+import random
+import pytest
+from spider.game import actions
+from spider.game.deals import new_deal
+from spider.game.serialize import (
+    to_dict, from_dict, to_bytes, from_bytes, save, load, MAGIC,
+)
+
+def _played(seed: int, steps: int = 120):
+    s = new_deal(seed)
+    rng = random.Random(seed)
+    for _ in range(steps):
+        moves = actions.list_legal_moves(s)
+        if moves and rng.random() < 0.85:
+            actions.move(s, *rng.choice(moves))
+        elif not actions.deal(s):
+            break
+    for _ in range(5):
+        actions.undo(s)
+    return s
+
+def test_binary_roundtrip_keeps_history():
+    s = _played(3)
+    data = to_bytes(s)
+    assert data.startswith(MAGIC)
+    t = from_bytes(data)
+    assert to_dict(t) == to_dict(s)
+    assert t.history == s.history and t.future == s.future
+    while actions.undo(t):
+        assert actions.undo(s)
+        assert to_dict(t) == to_dict(s)
+    assert to_dict(t) == to_dict(new_deal(3))
+
+def test_binary_is_smaller_and_load_autodetects(tmp_path):
+    s = _played(5)
+    save(s, tmp_path / "g.json")
+    save(s, tmp_path / "g.bin", binary=True, history=False)
+    assert (tmp_path / "g.bin").stat().st_size * 10 < (tmp_path / "g.json").stat().st_size
+    assert to_dict(load(tmp_path / "g.bin")) == to_dict(load(tmp_path / "g.json"))
+
+@pytest.mark.parametrize("card", [
+    {"r": 5, "s": "x"}, {"r": 5, "s": ["♠"]}, {"r": 0}, {"r": 14}, {"r": "5"}, {"r": 5, "u": 1},
+])
+def test_from_dict_rejects_bad_cards(card):
+    data = to_dict(new_deal(2))
+    data["columns"][4].append(card)
+    with pytest.raises(ValueError):
+        from_dict(data)
+
+def test_truncated_or_corrupt_binary_is_a_value_error():
+    data = to_bytes(_played(4))
+    for cut in range(0, len(data), 7):
+        with pytest.raises(ValueError):
+            from_bytes(data[:cut])
+    bad = bytearray(data)
+    bad[-3] ^= 0xFF
+    with pytest.raises(ValueError):
+        from_bytes(bytes(bad))
+    fresh = to_bytes(new_deal(4), history=False)
+    head = 25 + 1                                  # header + lunghezza della prima colonna
+    with pytest.raises(ValueError, match="card code"):
+        from_bytes(fresh[:head] + bytes([0x0E]) + fresh[head + 1:])
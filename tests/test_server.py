@@ -0,0 +1,108 @@
+import asyncio
+import json
+
+from spider.game import actions
+from spider.game.deals import new_deal
+from spider.server import GameServer, public_state
+from spider.stream import DiffView
+
+def test_sessions_are_independent_and_validated():
+    async def run():
+        srv = GameServer()
+        a = await srv.handle({"op": "new", "seed": 5, "id": 1})
+        b = await srv.handle({"op": "new", "seed": 5})
+        assert a["ok"] and a["id"] == 1 and a["state"] == public_state(new_deal(5))
+        d = await srv.handle({"op": "deal", "session": a["session"]})
+        assert d["done"] and d["state"]["stock"] == 4
+        assert (await srv.handle({"op": "state", "session": b["session"]}))["state"]["stock"] == 5
+        assert (await srv.handle({"op": "undo", "session": a["session"]}))["state"]["stock"] == 5
+        bad = await srv.handle({"op": "move", "session": a["session"], "src": "x", "start": 0, "dst": 1})
+        assert not bad["ok"] and "src" in bad["error"]
+        assert not (await srv.handle({"op": "state", "session": "nope"}))["ok"]
+        assert not (await srv.handle({"op": "fly"}))["ok"]
+        for bad_budget in (float("nan"), float("inf"), True, -1, "50"):
+            r = await srv.handle({"op": "hint", "session": b["session"], "budget_ms": bad_budget})
+            assert not r["ok"] and "budget_ms" in r["error"]
+        h = await srv.handle({"op": "hint", "session": b["session"], "budget_ms": 50})
+        assert h["ok"] and tuple(h["move"]) in actions.list_legal_moves(new_deal(5))
+    asyncio.run(run())
+
+def test_hidden_cards_are_masked():
+    st = public_state(new_deal(1))
+    assert all(code == 0 for col in st["columns"] for code in col[:-1])
+    assert all(col[-1] & 0x80 for col in st["columns"])
+    assert "seed" not in st
+
+def test_idle_sessions_are_evicted_but_not_while_locked():
+    async def run():
+        srv = GameServer(idle_timeout=10, max_sessions=2)
+        a = srv.new_session(1)
+        b = srv.new_session(2)
+        await a.lock.acquire()
+        assert srv.evict(now=a.last_used + 11) == [b.id]
+        a.lock.release()
+        c = srv.new_session(3)
+        d = srv.new_session(4)  # pieno: si libera la meno usata
+        assert set(srv.sessions) == {c.id, d.id}
+    asyncio.run(run())
+
+def test_json_lines_over_unix_socket(tmp_path):
+    async def run():
+        srv = GameServer()
+        path = str(tmp_path / "s.sock")
+        server = await srv.start(path=path)
+        async with server:
+            reader, writer = await asyncio.open_unix_connection(path)
+            async def call(req):
+                writer.write((req if isinstance(req, str) else json.dumps(req)).encode() + b"\n")
+                await writer.drain()
+                return json.loads(await reader.readline())
+            new = await call({"op": "new", "seed": 9})
+            sid = new["session"]
+            legal = actions.list_legal_moves(new_deal(9))
+            r = await call({"op": "move", "session": sid, "src": legal[0][0], "start": legal[0][1], "dst": legal[0][2]})
+            assert r["ok"] and r["moved"] and r["state"]["moves"] == 1
+            assert (await call("not json"))["error"] == "invalid JSON"
+            # JSON valido ma con tipi sbagliati: risposta d'errore, la connessione resta aperta
+            bad = await call({"op": "state", "session": [1]})
+            assert not bad["ok"] and "session" in bad["error"]
+            assert not (await call({"op": ["x"], "id": 7}))["ok"]
+            assert (await call({"op": "state", "session": sid}))["state"]["moves"] == 1
+            assert (await call({"op": "close", "session": sid}))["ok"] and sid not in srv.sessions
+            writer.close()
+    asyncio.run(run())
+
+def test_watchers_receive_diffs(tmp_path):
+    async def run():
+        srv = GameServer()
+        path = str(tmp_path / "w.sock")
+        server = await srv.start(path=path)
+        async with server:
+            r1, w1 = await asyncio.open_unix_connection(path)
+            r2, w2 = await asyncio.open_unix_connection(path)
+            async def call(r, w, req):
+                w.write(json.dumps(req).encode() + b"\n")
+                await w.drain()
+                return json.loads(await r.readline())
+            sid = (await call(r1, w1, {"op": "new", "seed": 2}))["session"]
+            view = DiffView()
+            assert view.feed((await call(r2, w2, {"op": "watch", "session": sid}))["keyframe"])
+            await call(r1, w1, {"op": "deal", "session": sid})
+            event = json.loads(await r2.readline())
+            assert event["event"] == "diff" and view.feed(event)
+            state = (await call(r1, w1, {"op": "state", "session": sid}))["state"]
+            assert view.cols == state["columns"] and view.counts["stock"] == state["stock"]
+            w1.close()
+            w2.close()
+    asyncio.run(run())
+
+def test_unexpected_errors_are_reported_not_raised():
+    async def run():
+        srv = GameServer()
+        sid = srv.new_session(3).id
+        async def boom(sess, req):
+            raise KeyError("x")
+        srv._ops["state"] = boom
+        out = await srv.handle({"op": "state", "session": sid, "id": 4})
+        assert out == {"ok": False, "error": "internal error: KeyError", "id": 4}
+    asyncio.run(run())
@@ -0,0 +1,24 @@
+from spider.game.cards import FACE_UP
+from spider.game.deals import new_deal
+from spider.game.serialize import to_dict
+from spider.sim import play_game, run, summarize
+
+def test_new_deal_layout_and_determinism():
+    s = new_deal(42)
+    assert [len(c) for c in s.columns] == [6] * 4 + [5] * 6
+    assert all(c[-1] & FACE_UP and not any(x & FACE_UP for x in c[:-1]) for c in s.columns)
+    assert len(s.stock) == 5 and all(len(p) == 10 for p in s.stock)
+    assert to_dict(new_deal(42)) == to_dict(s)
+    assert to_dict(new_deal(43)) != to_dict(s)
+
+def test_play_game_terminates_and_is_reproducible():
+    a = play_game(3, "hint", max_moves=200)
+    b = play_game(3, "hint", max_moves=200)
+    assert a.reason in ("won", "stuck", "max_moves")
+    assert (a.moves, a.foundations, a.reason) == (b.moves, b.foundations, b.reason)
+
+def test_run_summary_single_worker():
+    results = run(range(4), "random", workers=1, max_moves=100)
+    stats = summarize(results, 1.0)
+    assert stats["games"] == 4
+    assert 0.0 <= stats["win_rate"] <= 1.0
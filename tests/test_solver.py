@@ -0,0 +1,78 @@
+import random
+
+from spider.game import actions
+from spider.game.cards import FACE_UP, Card, pack
+from spider.game.state import GameState, clone, position_hash
+from spider.game.actions import is_win
+from spider.game.solver import solve, replay, SOLVED, UNSOLVABLE, BUDGET
+
+def _near_win() -> GameState:
+    s = GameState()
+    s.foundations = 7
+    s.columns[0] = pack([Card(r) for r in range(13, 8, -1)])
+    s.columns[1] = pack([Card(5, face_up=False)] + [Card(r) for r in range(8, 5, -1)])
+    s.columns[2] = pack([Card(r) for r in range(4, 0, -1)])
+    return s
+
+def test_solve_finds_winning_line():
+    s = _near_win()
+    r = solve(s)
+    assert r.status == SOLVED
+    assert is_win(replay(s, r.line))
+    assert s.foundations == 7  # lo stato originale non viene toccato
+
+def test_solve_reports_unsolvable_when_exhausted():
+    s = GameState()
+    s.foundations = 7
+    s.columns[0] = pack([Card(13), Card(12)])
+    s.columns[1] = pack([Card(10)])
+    r = solve(s)
+    assert r.status == UNSOLVABLE
+
+def test_solve_respects_node_budget():
+    s = _near_win()
+    s.foundations = 0
+    s.stock = [pack(Card(r % 13 + 1, face_up=False) for r in range(10)) for _ in range(2)]
+    r = solve(s, max_nodes=5)
+    assert r.status == BUDGET and r.nodes == 5
+
+def _brute_force_solvable(s, seen):
+    """Visita esaustiva di tutte le mosse legali (rules) e del deal, senza potature."""
+    from tests.test_actions import _brute_force_moves
+    if is_win(s):
+        return True
+    h = position_hash(s)
+    if h in seen:
+        return False
+    seen.add(h)
+    for m in _brute_force_moves(s):
+        t = clone(s)
+        actions.move(t, *m)
+        if _brute_force_solvable(t, seen):
+            return True
+    t = clone(s)
+    return actions.deal(t) and _brute_force_solvable(t, seen)
+
+def _small_with_stock(seed: int) -> GameState:
+    # 4 colonne, un giro di stock da 4 carte, una sola sequenza K..A da completare
+    rng = random.Random(seed)
+    ranks = list(range(1, 14))
+    rng.shuffle(ranks)
+    s = GameState()
+    s.foundations = 7
+    s.stock = [pack(Card(r, face_up=False) for r in ranks[:4])]
+    s.columns = [bytearray() for _ in range(4)]
+    for i, r in enumerate(ranks[4:]):
+        s.columns[i if i < 4 else rng.randrange(4)] += pack([Card(r, face_up=rng.random() < 0.7)])
+    for col in s.columns:
+        col[-1] |= FACE_UP
+    return s
+
+def test_solve_matches_brute_force_with_stock():
+    # con lo stock conta quale colonna è vuota: niente colonne vuote "equivalenti"
+    # (61..178: dichiarate UNSOLVABLE a torto quando le potature valevano anche con lo stock)
+    for seed in [61, 74, 104, 150, 178, *range(30)]:
+        s = _small_with_stock(seed)
+        r = solve(s, max_nodes=None)
+        assert (r.status == SOLVED) == _brute_force_solvable(clone(s), set()), seed
+        assert r.status in (SOLVED, UNSOLVABLE)
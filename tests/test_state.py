@@ -0,0 +1,79 @@
+import random
+from spider.game.cards import FACE_UP, Card, pack
+from spider.game.state import GameState, Move, clone, position_hash, canonical_hash, canonical_hash_after
+from spider.game.columns import scan
+from spider.game.actions import apply, revert, move, deal, undo, redo, list_legal_moves
+
+def _random_state(rng: random.Random) -> GameState:
+    deck = [r for _ in range(8) for r in range(1, 14)]
+    rng.shuffle(deck)
+    s = GameState()
+    for i in range(10):
+        s.columns[i] = bytearray(deck.pop() for _ in range(6 if i < 4 else 5))
+        s.columns[i][-1] |= FACE_UP
+    s.stock = [bytearray(deck.pop() for _ in range(10)) for _ in range(5)]
+    return s
+
+def _assert_meta_fresh(s: GameState) -> None:
+    for i, col in enumerate(s.columns):
+        m = s.meta[i]
+        assert m is not None and m.is_valid_for(col)
+        ref = scan(col)
+        assert (m.run_start, m.hidden, m.blocked, m.full_start) == (ref.run_start, ref.hidden, ref.blocked, ref.full_start)
+
+def test_scan_blocked_and_tail():
+    col = pack([Card(9, face_up=False), Card(8), Card(7), Card(3), Card(6), Card(5), Card(4)])
+    m = scan(col)
+    assert m.hidden == 1
+    assert m.run_start == 4 and m.tail_len == 3
+    assert m.blocked == [(1, 2)]
+
+def test_meta_tracks_random_play():
+    rng = random.Random(7)
+    for _ in range(5):
+        s = _random_state(rng)
+        list_legal_moves(s)
+        for _ in range(300):
+            moves = list_legal_moves(s)
+            r = rng.random()
+            if r < 0.15:
+                undo(s)
+            elif r < 0.25:
+                redo(s)
+            elif moves and r < 0.9:
+                move(s, *rng.choice(moves))
+            else:
+                deal(s)
+            _assert_meta_fresh(s)
+            assert position_hash(s) == position_hash(clone(s))
+            assert canonical_hash(s) == canonical_hash(clone(s))
+
+def test_canonical_hash_ignores_column_order_only_without_stock():
+    s = GameState()
+    s.columns[0] = pack([Card(9, face_up=False), Card(4)])
+    s.columns[3] = pack([Card(7)])
+    t = clone(s)
+    t.columns[0], t.columns[5] = t.columns[5], t.columns[0]
+    assert position_hash(s) != position_hash(t)
+    assert canonical_hash(s) == canonical_hash(t)
+    s.stock = [pack(Card(1, face_up=False) for _ in range(10))]
+    t.stock = [bytearray(s.stock[0])]
+    assert canonical_hash(s) != canonical_hash(t)
+
+def test_canonical_hash_after_matches_apply():
+    rng = random.Random(11)
+    for k in range(6):
+        s = _random_state(rng)
+        if k % 2:
+            s.stock.clear()
+        for _ in range(100):
+            for mv in list_legal_moves(s):
+                h = canonical_hash_after(s, *mv)
+                rec = apply(s, Move(*mv))
+                assert h is None or h == canonical_hash(s)
+                revert(s, rec)
+            moves = list_legal_moves(s)
+            if moves and rng.random() < 0.9:
+                move(s, *rng.choice(moves))
+            elif not deal(s):
+                break
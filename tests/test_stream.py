@@ -0,0 +1,50 @@
+import json
+import random
+
+from spider.game import actions
+from spider.game.deals import new_deal
+from spider.stream import DiffStream, DiffView, public_code
+
+def _board(state):
+    return [[public_code(c) for c in col] for col in state.columns]
+
+def test_view_follows_random_play_with_undo_redo():
+    s = new_deal(11)
+    stream = DiffStream(s, keyframe_every=25)
+    view = DiffView()
+    assert view.feed(stream.keyframe())
+    rng = random.Random(11)
+    for _ in range(300):
+        r = rng.random()
+        moves = actions.list_legal_moves(s)
+        if r < 0.15:
+            actions.undo(s)
+        elif r < 0.25:
+            actions.redo(s)
+        elif moves and r < 0.95:
+            actions.move(s, *rng.choice(moves))
+        else:
+            actions.deal(s)
+        msg = stream.update()
+        if msg is not None:
+            assert view.feed(json.loads(json.dumps(msg)))
+        assert view.cols == _board(s)
+        assert view.counts == {"stock": len(s.stock), "f": s.foundations, "score": s.score, "moves": s.moves}
+
+def test_move_diff_is_small_and_gap_waits_for_keyframe():
+    s = new_deal(3)
+    stream = DiffStream(s, keyframe_every=0)
+    key = stream.keyframe()
+    src, start, dst = actions.list_legal_moves(s)[0]
+    actions.move(s, src, start, dst)
+    msg = stream.update()
+    assert msg["seq"] == 1 and msg["moves"] == 1 and "stock" not in msg
+    assert sorted(c[0] for c in msg["cols"]) == sorted({src, dst})
+    assert len(json.dumps(msg)) < len(json.dumps(key)) / 4
+    assert stream.update() is None
+
+    late = DiffView()
+    assert not late.feed(msg)  # nessun keyframe ancora
+    actions.deal(s)
+    assert not late.feed(stream.update())
+    assert late.feed(stream.keyframe()) and late.cols == _board(s)